@@ -34,16 +34,23 @@ class Uname(Tool):
         self, force_run: bool = False, no_error_log: bool = False
     ) -> UnameResult:
         self.initialize()
-        cmd_result = self.run(
-            "-vrio", force_run=force_run, no_error_log=no_error_log, no_info_log=True
-        )
+        output = None if force_run else self.node.facts.get().uname
+        if output is None:
+            cmd_result = self.run(
+                "-vrio",
+                force_run=force_run,
+                no_error_log=no_error_log,
+                no_info_log=True,
+            )
+            if cmd_result.exit_code == 0:
+                output = cmd_result.stdout
 
-        if cmd_result.exit_code != 0:
+        if output is None:
             result = UnameResult(False, "", "", "", "")
         else:
-            match_result = self._key_info_pattern.fullmatch(cmd_result.stdout)
+            match_result = self._key_info_pattern.fullmatch(output)
             if not match_result:
-                raise LisaException(f"no result matched, stdout: '{cmd_result.stdout}'")
+                raise LisaException(f"no result matched, stdout: '{output}'")
             result = UnameResult(
                 has_result=True,
                 kernel_version=match_result.group("kernel_version"),
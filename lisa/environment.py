@@ -9,7 +9,7 @@ from dataclasses import dataclass, field
 from enum import Enum
 from functools import partial
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Optional
 
 from dataclasses_json import dataclass_json
 from marshmallow import validate
@@ -81,6 +81,12 @@ class EnvironmentSpace(search_space.RequirementMixin):
             self.nodes, o.nodes
         )
 
+    def _get_key(self) -> Optional[Hashable]:
+        nodes_key = search_space.get_key(self.nodes)
+        if nodes_key is None:
+            return None
+        return (self.topology, nodes_key)
+
     def check(self, capability: Any) -> search_space.ResultReason:
         assert isinstance(capability, EnvironmentSpace), f"actual: {type(capability)}"
         result = search_space.ResultReason()
@@ -105,6 +111,15 @@ class EnvironmentSpace(search_space.RequirementMixin):
 
         return result
 
+    def match(self, capability: Any) -> bool:
+        assert isinstance(capability, EnvironmentSpace), f"actual: {type(capability)}"
+        if not capability.nodes or len(self.nodes) > len(capability.nodes):
+            return False
+        for index, current_req in enumerate(self.nodes):
+            if not search_space.match(current_req, capability.nodes[index]):
+                return False
+        return True
+
     def _generate_min_capability(self, capability: Any) -> Any:
         env = EnvironmentSpace(topology=self.topology)
         assert isinstance(capability, EnvironmentSpace), f"actual: {type(capability)}"
@@ -3,10 +3,27 @@
 
 from __future__ import annotations
 
+import inspect
+import os
 import pathlib
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
 from hashlib import sha256
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type, TypeVar, Union, cast
+from random import randint
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
 from lisa.util import InitializableMixin, LisaException, constants
 from lisa.util.logger import get_logger
@@ -19,6 +36,9 @@ if TYPE_CHECKING:
 
 T = TypeVar("T")
 
+# max threads to install independent tools on a node at the same time.
+MAX_INSTALL_CONCURRENCY = 4
+
 
 class Tool(ABC, InitializableMixin):
     """
@@ -180,8 +200,7 @@ class Tool(ABC, InitializableMixin):
         # check dependencies
         if self.dependencies:
             self._log.info("installing dependencies")
-        for dependency in self.dependencies:
-            self.node.tools[dependency]
+            self.node.tools.resolve(self.dependencies)
         return self._install()
 
     def run_async(
@@ -251,6 +270,64 @@ class Tool(ABC, InitializableMixin):
         assert self.node.working_path, "working path is not initialized"
         return self.node.working_path.joinpath(constants.PATH_TOOL, self.name)
 
+    def get_build_cache_path(self, platform_dependent: bool = True) -> pathlib.Path:
+        """
+        compose a path on the controller, which caches built files of the tool. So
+        other nodes don't need to build it again. If the built files depend on the
+        platform, the path includes the distro, release, kernel and architecture.
+        """
+        cache_path = constants.CACHE_PATH.joinpath(constants.PATH_TOOL, self.name)
+        if platform_dependent:
+            result = self.node.execute("uname -rm", no_info_log=True)
+            os_version = self.node.os.os_version
+            platform_key = constants.NORMALIZE_PATTERN.sub(
+                "_", f"{os_version.vendor}_{os_version.release}_{result.stdout}"
+            )
+            cache_path = cache_path.joinpath(platform_key.lower())
+        return cache_path
+
+    def restore_build_cache(
+        self,
+        file_names: List[str],
+        node_path: pathlib.PurePath,
+        platform_dependent: bool = True,
+    ) -> bool:
+        """
+        copy cached files to the node path. Return False, if any file isn't cached.
+        """
+        cache_path = self.get_build_cache_path(platform_dependent)
+        if not all(cache_path.joinpath(x).exists() for x in file_names):
+            return False
+        for file_name in file_names:
+            file_path = node_path.joinpath(file_name)
+            self.node.shell.copy(cache_path.joinpath(file_name), file_path)
+            self.node.shell.chmod(file_path, 0o755)
+        self._log.debug(f"restored {file_names} from build cache '{cache_path}'")
+        return True
+
+    def save_build_cache(
+        self,
+        file_names: List[str],
+        node_path: pathlib.PurePath,
+        platform_dependent: bool = True,
+    ) -> None:
+        """
+        copy built files from the node path back to the controller. It's the best
+        effort, a failure doesn't fail the installation.
+        """
+        try:
+            cache_path = self.get_build_cache_path(platform_dependent)
+            cache_path.mkdir(parents=True, exist_ok=True)
+            for file_name in file_names:
+                # other nodes may save the same file, so copy to a temp file, and
+                # replace atomically.
+                temp_path = cache_path.joinpath(f"{file_name}.{randint(0, 10000)}")
+                self.node.shell.copy_back(node_path.joinpath(file_name), temp_path)
+                os.replace(temp_path, cache_path.joinpath(file_name))
+            self._log.debug(f"saved {file_names} to build cache '{cache_path}'")
+        except Exception as identifier:
+            self._log.debug(f"failed on saving build cache: {identifier}")
+
     def __call__(
         self,
         parameters: str = "",
@@ -443,6 +520,12 @@ class Tools:
     def __init__(self, node: Node) -> None:
         self._node = node
         self._cache: Dict[str, Tool] = dict()
+        # each tool has its own lock, so concurrent requests of the same tool wait
+        # for the first one, instead of installing it again.
+        self._lock = threading.Lock()
+        self._tool_locks: Dict[str, threading.Lock] = dict()
+        # existence of commands, which are checked by probe together.
+        self._probed_commands: Dict[str, bool] = dict()
 
     def __getattr__(self, key: str) -> Tool:
         """
@@ -470,43 +553,221 @@ class Tools:
             tool_key = tool_type.__name__.lower()
         tool = self._cache.get(tool_key)
         if tool is None:
-            # the Tool is not installed on current node, try to install it.
-            tool_log = get_logger("tool", tool_key, self._node.log)
-            tool_log.debug(f"initializing tool [{tool_key}]")
+            with self._get_tool_lock(tool_key):
+                # check again, it may be installed by another thread.
+                tool = self._cache.get(tool_key)
+                if tool is None:
+                    tool = self._create_tool(tool_type, tool_key)
+                    self._cache[tool_key] = tool
+        return cast(T, tool)
 
-            if isinstance(tool_type, CustomScriptBuilder):
-                tool = tool_type.build(self._node)
-            elif isinstance(tool_type, str):
-                raise LisaException(
-                    f"{tool_type} cannot be found. "
-                    f"short usage need to get with type before get with name."
+    def probe(self) -> None:
+        """
+        Check all known tools in one command, when the node is connected. So getting
+        a tool doesn't need a round trip to check if it exists. Only tools with the
+        default check are probed, others have their own logic to check.
+        """
+        commands: List[str] = []
+        for tool_type in self._get_probed_tool_types(Tool.__subclasses__()):
+            try:
+                # Create a temp object, it doesn't query.
+                tool = tool_type.create(self._node)
+                if type(tool)._check_exists is not Tool._check_exists:
+                    continue
+                command = tool.command
+            except Exception as identifier:
+                # some commands are set in initialize, they are checked by tools.
+                # Probing is an optimization, so it doesn't fail on any tool.
+                self._node.log.debug(
+                    f"skipped probing tool {tool_type.__name__}: {identifier}"
                 )
-            else:
-                cast_tool_type = cast(Type[Tool], tool_type)
-                tool = cast_tool_type.create(self._node)
-
-            tool.initialize()
-
-            if not tool.exists:
-                tool_log.debug(f"'{tool.name}' not installed")
-                if tool.can_install:
-                    tool_log.debug(f"{tool.name} is installing")
-                    timer = create_timer()
-                    is_success = tool.install()
-                    if not is_success:
-                        raise LisaException(
-                            f"install '{tool.name}' failed. After installed, "
-                            f"it cannot be detected."
-                        )
-                    tool_log.debug(f"installed in {timer}")
-                else:
+                continue
+            if command and command not in commands and " " not in command:
+                commands.append(command)
+        if not commands:
+            return
+
+        if self._node.is_posix:
+            probe_command = (
+                f"for cmd in {' '.join(commands)}; do "
+                f'command -v "$cmd" >/dev/null 2>&1 && echo "$cmd"; done; true'
+            )
+        else:
+            probe_command = (
+                f"for %c in ({' '.join(commands)}) do "
+                f"@where %c >nul 2>&1 && echo %c"
+            )
+        result = self._node.execute(probe_command, shell=True, no_info_log=True)
+        existing = set(result.stdout.split())
+        with self._lock:
+            for command in commands:
+                self._probed_commands[command] = command in existing
+        self._node.log.debug(
+            f"probed {len(commands)} tools, {len(existing)} of them exist."
+        )
+
+    @property
+    def probed_commands(self) -> Dict[str, bool]:
+        with self._lock:
+            return dict(self._probed_commands)
+
+    def load_probed_commands(self, probed_commands: Dict[str, bool]) -> None:
+        """
+        Use probed results of a previous run, instead of probing again. Commands
+        may be installed after the previous run, so only existing commands are
+        loaded, and missing ones are checked again when they are used.
+        """
+        with self._lock:
+            self._probed_commands.update(
+                {key: value for key, value in probed_commands.items() if value}
+            )
+
+    def resolve(self, tool_types: Iterable[Type[Tool]]) -> None:
+        """
+        Check and install tools with all their dependencies. The dependencies are
+        resolved as a DAG, so independent branches are installed concurrently. For
+        example, Git and Make of Ntttcp are installed at the same time, and then
+        Ntttcp is installed after both are ready.
+        """
+        pending = [
+            (tool_type, dependencies)
+            for tool_type, dependencies in self._sort_by_dependencies(tool_types)
+            if tool_type.__name__.lower() not in self._cache
+        ]
+        if not pending:
+            return
+
+        futures: Dict[str, Future[Any]] = dict()
+        with ThreadPoolExecutor(
+            max_workers=min(len(pending), MAX_INSTALL_CONCURRENCY)
+        ) as pool:
+            # tasks are submitted in topological order, so a waiting task always
+            # depends on tasks, which are started already or completed.
+            for tool_type, dependencies in pending:
+                dependency_futures = [
+                    futures[key] for key in dependencies if key in futures
+                ]
+                futures[tool_type.__name__.lower()] = pool.submit(
+                    self._install_after, tool_type, dependency_futures
+                )
+            # raise the first exception, if any tool failed.
+            for future in futures.values():
+                future.result()
+
+    def _get_tool_lock(self, tool_key: str) -> threading.Lock:
+        with self._lock:
+            tool_lock = self._tool_locks.get(tool_key)
+            if tool_lock is None:
+                tool_lock = threading.Lock()
+                self._tool_locks[tool_key] = tool_lock
+        return tool_lock
+
+    def _get_probed_tool_types(self, tool_types: List[Type[Tool]]) -> List[Type[Tool]]:
+        results: List[Type[Tool]] = []
+        for sub_type in tool_types:
+            # scripts are copied to node, so they don't need to be probed.
+            if issubclass(sub_type, CustomScript):
+                continue
+            if not inspect.isabstract(sub_type):
+                results.append(sub_type)
+            results.extend(self._get_probed_tool_types(sub_type.__subclasses__()))
+        return results
+
+    def _install_after(
+        self, tool_type: Type[Tool], dependency_futures: List[Future[Any]]
+    ) -> None:
+        for future in dependency_futures:
+            # if a dependency failed, the exception is raised here, and current
+            # tool won't be installed.
+            future.result()
+        self[tool_type]
+
+    def _sort_by_dependencies(
+        self, tool_types: Iterable[Type[Tool]]
+    ) -> List[Tuple[Type[Tool], List[str]]]:
+        """
+        return tool types and keys of their dependencies in topological order.
+        """
+        results: List[Tuple[Type[Tool], List[str]]] = []
+        visited: Dict[str, bool] = dict()
+
+        def _visit(tool_type: Type[Tool], path: List[str]) -> None:
+            tool_key = tool_type.__name__.lower()
+            if tool_key in visited:
+                if not visited[tool_key]:
                     raise LisaException(
-                        f"cannot find [{tool.name}] on [{self._node.name}], "
-                        f"{self._node.os.__class__.__name__}, "
-                        f"Remote({self._node.is_remote}) "
-                        f"and installation of [{tool.name}] isn't enabled in lisa."
+                        f"found circle dependency: {' -> '.join(path + [tool_key])}"
                     )
+                return
+            visited[tool_key] = False
+            tool = self._cache.get(tool_key)
+            if tool is None:
+                # Create a temp object to get dependencies, it doesn't query.
+                tool = tool_type.create(self._node)
+            dependencies = tool.dependencies
+            for dependency in dependencies:
+                _visit(dependency, path + [tool_key])
+            visited[tool_key] = True
+            results.append((tool_type, [x.__name__.lower() for x in dependencies]))
+
+        for tool_type in tool_types:
+            _visit(tool_type, [])
+        return results
+
+    def _create_tool(
+        self, tool_type: Union[Type[T], CustomScriptBuilder, str], tool_key: str
+    ) -> Tool:
+        # the Tool is not installed on current node, try to install it.
+        tool_log = get_logger("tool", tool_key, self._node.log)
+        tool_log.debug(f"initializing tool [{tool_key}]")
+
+        if isinstance(tool_type, CustomScriptBuilder):
+            tool: Tool = tool_type.build(self._node)
+        elif isinstance(tool_type, str):
+            raise LisaException(
+                f"{tool_type} cannot be found. "
+                f"short usage need to get with type before get with name."
+            )
+        else:
+            cast_tool_type = cast(Type[Tool], tool_type)
+            tool = cast_tool_type.create(self._node)
+
+        tool.initialize()
+
+        if (
+            tool._exists is None
+            and type(tool)._check_exists is Tool._check_exists
+            and tool.command in self._probed_commands
+        ):
+            tool._exists = self._probed_commands[tool.command]
+
+        if not tool.exists:
+            tool_log.debug(f"'{tool.name}' not installed")
+            if tool.can_install:
+                tool_log.debug(f"{tool.name} is installing")
+                timer = create_timer()
+                is_success = tool.install()
+                if not is_success:
+                    raise LisaException(
+                        f"install '{tool.name}' failed. After installed, "
+                        f"it cannot be detected."
+                    )
+                tool_log.debug(f"installed in {timer}")
+                # packages of the tool may provide other commands, so the probed
+                # missing commands need to be checked again.
+                with self._lock:
+                    self._probed_commands = {
+                        key: value
+                        for key, value in self._probed_commands.items()
+                        if value
+                    }
             else:
-                tool_log.debug("installed already")
-            self._cache[tool_key] = tool
-        return cast(T, tool)
+                raise LisaException(
+                    f"cannot find [{tool.name}] on [{self._node.name}], "
+                    f"{self._node.os.__class__.__name__}, "
+                    f"Remote({self._node.is_remote}) "
+                    f"and installation of [{tool.name}] isn't enabled in lisa."
+                )
+        else:
+            tool_log.debug("installed already")
+        return tool
@@ -0,0 +1,209 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from dataclasses_json import dataclass_json
+
+from lisa.util import constants
+from lisa.util.logger import get_logger
+from lisa.util.perf_timer import create_timer
+
+if TYPE_CHECKING:
+    from lisa.node import Node
+
+
+@dataclass_json()
+@dataclass
+class NodeFacts:
+    """
+    Outputs of inventory commands, which are collected in one round trip. None means
+    the command failed or isn't available, so tools need to run it by themselves.
+    """
+
+    # output of lscpu
+    lscpu: Optional[str] = None
+    # output of lspci -m
+    lspci: Optional[str] = None
+    # output of lsvmbus -vv
+    lsvmbus: Optional[str] = None
+    # output of uname -vrio
+    uname: Optional[str] = None
+    # 1 or 2, the generation of Hyper-V VM.
+    vm_generation: Optional[str] = None
+    # output of waagent -version
+    waagent: Optional[str] = None
+    # content of /etc/os-release
+    os_release: Optional[str] = None
+    # the boot id and modified time of /etc/os-release, they are used to validate
+    # the persisted snapshot.
+    boot_id: Optional[str] = None
+    os_release_mtime: Optional[str] = None
+    # expanded $HOME
+    home: Optional[str] = None
+    # output of command -v sudo
+    sudo: Optional[str] = None
+
+
+@dataclass_json()
+@dataclass
+class NodeSnapshot:
+    """
+    Discovered information of a node, it's persisted for static nodes, so next runs
+    don't need to discover them again.
+    """
+
+    os_type: str = ""
+    probed_commands: Dict[str, bool] = field(default_factory=dict)
+    facts: NodeFacts = field(default_factory=NodeFacts)
+
+
+class Facts:
+    """
+    Collect facts of a node in one scripted round trip, and cache them. Tools
+    consult the facts firstly, and run commands only if the facts are not
+    available, or they are forced to run.
+    """
+
+    # the command to collect each field of NodeFacts.
+    _commands: Dict[str, str] = {
+        "lscpu": "lscpu",
+        "lspci": "lspci -m",
+        "lsvmbus": "lsvmbus -vv",
+        "uname": "uname -vrio",
+        "vm_generation": "if [ -d /sys/firmware/efi ]; then echo 2; else echo 1; fi",
+        "waagent": "waagent -version || /usr/sbin/waagent -version || "
+        "python3 /usr/sbin/waagent -version",
+        "os_release": "cat /etc/os-release",
+        "boot_id": "cat /proc/sys/kernel/random/boot_id",
+        "os_release_mtime": "stat -c %Y /etc/os-release",
+        "home": "echo $HOME",
+        "sudo": "command -v sudo",
+    }
+    __fact_pattern = re.compile(
+        r"<<<lisa-fact-begin:(?P<name>\w+)>>>\r?\n(?P<output>.*?)"
+        r"<<<lisa-fact-end:(?P=name):(?P<exit_code>\d+)>>>",
+        re.DOTALL,
+    )
+
+    def __init__(self, node: Node) -> None:
+        self._node = node
+        self._log = get_logger("facts", parent=node.log)
+        self._facts: Optional[NodeFacts] = None
+        self._lock = threading.Lock()
+        # If it's True, facts are persisted under runtime/cache, and loaded in next
+        # runs. It's set by platforms, which have static nodes.
+        self.is_persisted = False
+
+    def get(self) -> NodeFacts:
+        """
+        Return cached facts, collect them if they are not collected yet.
+        """
+        # the node collects facts in initialization, so initialize it out of lock.
+        self._node.initialize()
+        with self._lock:
+            if self._facts is None:
+                self._facts = self._collect()
+            return self._facts
+
+    def refresh(self) -> NodeFacts:
+        """
+        Collect facts again, for example, after the kernel or packages changed.
+        """
+        self._node.initialize()
+        with self._lock:
+            self._facts = self._collect()
+            return self._facts
+
+    def invalidate(self) -> None:
+        """
+        The facts are collected again on next get.
+        """
+        with self._lock:
+            self._facts = None
+
+    def load_snapshot(self) -> Optional[NodeSnapshot]:
+        """
+        Load the persisted snapshot, and validate it by the boot id and the modified
+        time of /etc/os-release. If they are not changed, the node doesn't need to
+        be discovered again.
+        """
+        snapshot_path = self._get_snapshot_path()
+        if not snapshot_path or not snapshot_path.exists():
+            return None
+        try:
+            with open(snapshot_path, "r") as f:
+                loaded_data: Dict[str, Any] = json.load(f)
+            snapshot: NodeSnapshot = NodeSnapshot.schema().load(  # type:ignore
+                loaded_data
+            )
+            result = self._node.execute(
+                f"{self._commands['boot_id']} && {self._commands['os_release_mtime']}",
+                shell=True,
+                no_error_log=True,
+            )
+            current = result.stdout.split()
+            expected = [snapshot.facts.boot_id, snapshot.facts.os_release_mtime]
+            if result.exit_code != 0 or current != expected:
+                self._log.debug(f"snapshot is outdated, {current} != {expected}")
+                return None
+        except Exception as identifier:
+            self._log.debug(f"error on loading snapshot: {identifier}")
+            return None
+
+        with self._lock:
+            self._facts = snapshot.facts
+        self._log.debug(f"loaded snapshot from '{snapshot_path}'")
+        return snapshot
+
+    def save_snapshot(self, os_type: str, probed_commands: Dict[str, bool]) -> None:
+        snapshot_path = self._get_snapshot_path()
+        facts = self.get()
+        if not snapshot_path or not facts.boot_id or not facts.os_release_mtime:
+            # it cannot be validated, so don't persist it.
+            return
+        snapshot = NodeSnapshot(
+            os_type=os_type, probed_commands=probed_commands, facts=facts
+        )
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(snapshot_path, "w") as f:
+            json.dump(snapshot.to_dict(), f)  # type: ignore
+        self._log.debug(f"saved snapshot to '{snapshot_path}'")
+
+    def _get_snapshot_path(self) -> Optional[Path]:
+        fingerprint = self._node.shell.host_key_fingerprint
+        if not self.is_persisted or not fingerprint:
+            return None
+        name = constants.NORMALIZE_PATTERN.sub("_", f"{self._node}_{fingerprint[:16]}")
+        return constants.CACHE_PATH.joinpath("nodes", f"{name}.json")
+
+    def _collect(self) -> NodeFacts:
+        facts = NodeFacts()
+        if not self._node.is_posix:
+            # the script works on posix only, tools run commands on Windows.
+            return facts
+
+        script = ""
+        for name, command in self._commands.items():
+            script += (
+                f"echo '<<<lisa-fact-begin:{name}>>>'; "
+                f"{{ {command}; }} 2>/dev/null; "
+                f'echo "<<<lisa-fact-end:{name}:$?>>>"; '
+            )
+        timer = create_timer()
+        result = self._node.execute(script, shell=True, no_info_log=True)
+
+        names = [x.name for x in fields(NodeFacts)]
+        for matched in self.__fact_pattern.finditer(result.stdout):
+            name = matched.group("name")
+            if name in names and matched.group("exit_code") == "0":
+                setattr(facts, name, matched.group("output").strip())
+        self._log.debug(f"collected facts in {timer}")
+        return facts
@@ -2,8 +2,9 @@
 # Licensed under the MIT license.
 
 import re
+from bisect import bisect_right
 from pathlib import Path
-from typing import Any, List, Optional, Pattern
+from typing import Any, Dict, List, Optional, Pattern, Tuple
 
 from lisa.feature import Feature
 from lisa.util import (
@@ -47,30 +48,58 @@ class SerialConsole(Feature):
         """
         raise NotImplementedError()
 
+    def _get_console_log_from(
+        self, saved_path: Optional[Path], offset: int
+    ) -> Tuple[int, bytes]:
+        """
+        Return the offset and the content of the log after the offset. Override it,
+        if the platform can download a part of the log. If the log is recreated, or
+        the platform doesn't support it, return the whole log with offset 0.
+        """
+        return 0, self._get_console_log(saved_path=saved_path)
+
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
-        self._cached_console_log: Optional[bytes] = None
+        # the log is cached in downloaded chunks, so it's not copied on appending,
+        # and only new chunks are decoded on scanning. It's None, if the log is not
+        # downloaded yet.
+        self._cached_chunks: Optional[List[bytes]] = None
+        self._cached_chunk_offsets: List[int] = []
+        self._cached_size = 0
+        self._is_outdated = False
+        self._reset_scanned_results()
+
+    def _reset_scanned_results(self) -> None:
+        # the scanned length and results of panic patterns and ignorable patterns.
+        self._panic_scanned_length = 0
+        self._panic_candidates: List[List[str]] = [[]] * len(self.panic_patterns)
+        self._ignored_candidates: List[List[str]] = [[]] * len(
+            self.panic_ignorable_patterns
+        )
+        # the scanned length and the latest result of each pattern.
+        self._matched_results: Dict[Pattern[str], Tuple[int, str]] = dict()
 
     def enabled(self) -> bool:
         # most platform support shutdown
         return True
 
     def invalidate_cache(self) -> None:
-        # sometime, if the serial log accessed too early, it may be empty.
-        # invalidate it for next run.
+        # sometime, if the serial log accessed too early, it may be empty or
+        # partial. The new content is downloaded in next run.
         self._node.log.debug(
             f"invalidate serial log cache, current size: "
-            f"{len(self._cached_console_log) if self._cached_console_log else None}"
+            f"{self._cached_size if self._cached_chunks is not None else None}"
         )
-        self._cached_console_log = None
+        self._is_outdated = True
 
     def get_matched_str(self, pattern: Pattern[str]) -> str:
+        self._update_console_log(saved_path=None, force_run=False)
+        scanned_length, result = self._matched_results.get(pattern, (0, ""))
+        lines, last_line, scanned_length = self._get_unscanned(scanned_length)
         # first_match is False, since serial log may log multiple reboots. take
         # latest result.
-        result = get_matched_str(
-            self.get_console_log(),
-            pattern,
-            first_match=False,
-        )
+        result = get_matched_str(lines, pattern, first_match=False) or result
+        self._matched_results[pattern] = (scanned_length, result)
+        result = get_matched_str(last_line, pattern, first_match=False) or result
         # prevent the log is not ready, invalidata it for next capture.
         if not result:
             self._node.log.debug(
@@ -85,53 +114,126 @@ class SerialConsole(Feature):
     def get_console_log(
         self, saved_path: Optional[Path] = None, force_run: bool = False
     ) -> str:
-        if saved_path:
-            saved_path = saved_path.joinpath(get_datetime_path())
-            saved_path.mkdir()
-
-        if self._cached_console_log is None or force_run:
-            self._node.log.debug("downloading serial log...")
-            log_path = self._node.local_log_path / get_datetime_path()
-            log_path.mkdir(parents=True, exist_ok=True)
-
-            self._cached_console_log = self._get_console_log(saved_path=log_path)
-            self._node.log.debug(
-                f"downloaded serial log size: {len(self._cached_console_log)}"
-            )
-            # anyway save to node log_path for each time it's real queried
-            log_file_name = log_path / NAME_SERIAL_CONSOLE_LOG
-            with open(log_file_name, mode="wb") as f:
-                f.write(self._cached_console_log)
-        else:
-            self._node.log.debug("load cached serial log")
-
-        if saved_path:
-            # save it again, if it's asked to save.
-            log_file_name = saved_path / NAME_SERIAL_CONSOLE_LOG
-            with open(log_file_name, mode="wb") as f:
-                f.write(self._cached_console_log)
-
-        return self._cached_console_log.decode("utf-8", errors="ignore")
+        self._update_console_log(saved_path=saved_path, force_run=force_run)
+        return self._get_cached_log(0).decode("utf-8", errors="ignore")
 
     def check_panic(
         self, saved_path: Optional[Path], stage: str = "", force_run: bool = False
     ) -> None:
         self._node.log.debug("checking panic in serial log...")
-        content: str = self.get_console_log(saved_path=saved_path, force_run=force_run)
+        self._update_console_log(saved_path=saved_path, force_run=force_run)
+        # only the new content is scanned. The first matched line of each pattern
+        # is kept, like scanning the whole log.
+        lines, last_line, self._panic_scanned_length = self._get_unscanned(
+            self._panic_scanned_length
+        )
+        self._panic_candidates = self._find_patterns(
+            lines, self.panic_patterns, self._panic_candidates
+        )
+        self._ignored_candidates = self._find_patterns(
+            lines, self.panic_ignorable_patterns, self._ignored_candidates
+        )
         ignored_candidates = [
             x
-            for sublist in find_patterns_in_lines(
-                content, self.panic_ignorable_patterns
+            for sublist in self._find_patterns(
+                last_line, self.panic_ignorable_patterns, self._ignored_candidates
             )
             for x in sublist
             if x
         ]
         panics = [
             x
-            for sublist in find_patterns_in_lines(content, self.panic_patterns)
+            for sublist in self._find_patterns(
+                last_line, self.panic_patterns, self._panic_candidates
+            )
             for x in sublist
             if x and x not in ignored_candidates
         ]
 
         if panics:
             raise LisaException(f"{stage} found panic in serial log: {panics}")
+
+    def _get_unscanned(self, scanned_length: int) -> Tuple[str, str, int]:
+        """
+        Return completed lines and the last line after the scanned length, and the
+        new scanned length. The last line may be not completed, so it's not counted
+        in the scanned length, and it's scanned again next time.
+        """
+        log = self._get_cached_log(scanned_length)
+        end = log.rfind(b"\n") + 1
+        return (
+            log[:end].decode("utf-8", errors="ignore"),
+            log[end:].decode("utf-8", errors="ignore"),
+            scanned_length + end,
+        )
+
+    def _update_console_log(self, saved_path: Optional[Path], force_run: bool) -> None:
+        if saved_path:
+            saved_path = saved_path.joinpath(get_datetime_path())
+            saved_path.mkdir()
+
+        if self._cached_chunks is None or self._is_outdated or force_run:
+            self._node.log.debug("downloading serial log...")
+            log_path = self._node.local_log_path / get_datetime_path()
+            log_path.mkdir(parents=True, exist_ok=True)
+
+            # only the content after cached log is downloaded, and appended.
+            offset, content = self._get_console_log_from(
+                saved_path=log_path, offset=self._cached_size
+            )
+            if (
+                offset == 0
+                and self._cached_size
+                and content.startswith(self._get_cached_log(0))
+            ):
+                # the whole log is downloaded, but only new content is appended.
+                offset, content = self._cached_size, content[self._cached_size :]
+            if self._cached_chunks is not None and offset == self._cached_size:
+                mode = "ab"
+            else:
+                if self._cached_chunks is not None:
+                    self._node.log.debug("serial log is recreated, scan it again.")
+                mode = "wb"
+                self._cached_chunks = []
+                self._cached_chunk_offsets = []
+                self._cached_size = 0
+                self._reset_scanned_results()
+            if content:
+                self._cached_chunks.append(content)
+                self._cached_chunk_offsets.append(self._cached_size)
+                self._cached_size += len(content)
+            self._is_outdated = False
+            self._node.log.debug(
+                f"downloaded serial log size: {len(content)}, "
+                f"total size: {self._cached_size}"
+            )
+            # anyway save to node log_path for each time it's real queried
+            log_file_name = self._node.local_log_path / NAME_SERIAL_CONSOLE_LOG
+            with open(log_file_name, mode=mode) as f:
+                f.write(content)
+        else:
+            self._node.log.debug("load cached serial log")
+
+        if saved_path:
+            # save it again, if it's asked to save.
+            log_file_name = saved_path / NAME_SERIAL_CONSOLE_LOG
+            with open(log_file_name, mode="wb") as f:
+                for chunk in self._cached_chunks:
+                    f.write(chunk)
+
+    def _get_cached_log(self, start: int) -> bytes:
+        # only chunks after the start are joined.
+        if not self._cached_chunks:
+            return b""
+        index = max(bisect_right(self._cached_chunk_offsets, start) - 1, 0)
+        log = b"".join(self._cached_chunks[index:])
+        return log[start - self._cached_chunk_offsets[index] :]
+
+    def _find_patterns(
+        self, lines: str, patterns: List[Pattern[str]], results: List[List[str]]
+    ) -> List[List[str]]:
+        # find patterns, which are not found in previous results.
+        return [
+            result if result else find_patterns_in_lines(lines, [pattern])[0]
+            for pattern, result in zip(patterns, results)
+        ]
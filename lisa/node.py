@@ -3,12 +3,14 @@
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path, PurePath, PurePosixPath, PureWindowsPath
 from random import randint
 from typing import Any, Iterable, List, Optional, Type, TypeVar, Union, cast
 
 from lisa import schema
 from lisa.executable import Tools
+from lisa.facts import Facts
 from lisa.feature import Features
 from lisa.operating_system import OperatingSystem
 from lisa.tools import Echo, Reboot
@@ -26,6 +28,9 @@ from lisa.util.shell import ConnectionInfo, LocalShell, Shell, SshShell
 
 T = TypeVar("T")
 
+# max threads to initialize nodes of an environment at the same time.
+MAX_INITIALIZE_CONCURRENCY = 8
+
 
 class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixin):
     _factory: Optional[subclasses.Factory[Node]] = None
@@ -51,6 +56,7 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
         # the path uses remotely
         node_id = str(self.index) if self.index >= 0 else ""
         self.log = get_logger(logger_name, node_id)
+        self.facts = Facts(self)
 
         # The working path will be created in remote node, when it's used.
         self._working_path: Optional[PurePath] = None
@@ -80,6 +86,8 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
         self.initialize()
 
         # check if sudo supported
+        if self.is_posix and self._support_sudo is None and self.facts.get().sudo:
+            self._support_sudo = True
         if self.is_posix and self._support_sudo is None:
             process = self._execute("command -v sudo", shell=True, no_info_log=True)
             result = process.wait_result(10)
@@ -214,7 +222,26 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
         self.log.info(f"initializing node '{self.name}' {self}")
         self.shell.initialize()
-        self.os: OperatingSystem = OperatingSystem.create(self)
+        snapshot = self.facts.load_snapshot()
+        if snapshot:
+            # the node isn't changed since last run, so reuse the discovered info.
+            self.os: OperatingSystem = OperatingSystem.create(
+                self, type_name=snapshot.os_type
+            )
+            self.tools.load_probed_commands(snapshot.probed_commands)
+            return
+
+        self.os = OperatingSystem.create(self)
+        self.tools.probe()
+        self.facts.get()
+        try:
+            self.facts.save_snapshot(
+                os_type=self.os.__class__.__name__,
+                probed_commands=self.tools.probed_commands,
+            )
+        except Exception as identifier:
+            # it's ok to discover again in next run.
+            self.log.debug(f"error on saving snapshot: {identifier}")
 
     def _execute(
         self,
@@ -349,11 +376,16 @@ class RemoteNode(Node):
             constants.PATH_REMOTE_ROOT, constants.RUN_LOGIC_PATH
         ).as_posix()
 
+        # PurePath is more reasonable here, but spurplus doesn't support it.
+        home = self.facts.get().home
+        if self.is_posix and home:
+            # $HOME is collected in facts, so it doesn't need to expand again.
+            return PurePosixPath(working_path.replace("$HOME", home, 1))
+
         # expand environment variables in path
         echo = self.tools[Echo]
         result = echo.run(working_path, shell=True)
 
-        # PurePath is more reasonable here, but spurplus doesn't support it.
         if self.is_posix:
             result_path: PurePath = PurePosixPath(result.stdout)
         else:
@@ -448,8 +480,33 @@ class Nodes:
             yield node
 
     def initialize(self) -> None:
-        for node in self._list:
-            node.initialize()
+        """
+        Nodes are connected and initialized concurrently, so it costs the time of the
+        slowest node, instead of the sum of all nodes. All nodes are waited, and
+        errors of failed nodes are raised together.
+        """
+        if len(self._list) <= 1:
+            for node in self._list:
+                node.initialize()
+            return
+
+        errors: List[str] = []
+        first_error: Optional[Exception] = None
+        with ThreadPoolExecutor(
+            max_workers=min(len(self._list), MAX_INITIALIZE_CONCURRENCY)
+        ) as pool:
+            futures = [(node, pool.submit(node.initialize)) for node in self._list]
+            for node, future in futures:
+                try:
+                    future.result()
+                except Exception as identifier:
+                    errors.append(f"node[{node.index}] '{node.name}': {identifier}")
+                    first_error = first_error or identifier
+        if errors:
+            raise LisaException(
+                f"failed to initialize {len(errors)} of {len(self._list)} nodes. "
+                f"{'; '.join(errors)}"
+            ) from first_error
 
     def close(self) -> None:
         for node in self._list:
@@ -2,13 +2,26 @@
 # Licensed under the MIT license.
 
 import re
+import threading
 from dataclasses import dataclass
 from functools import partial
-from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Pattern, Type, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Pattern,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 from lisa.base_tools.wget import Wget
 from lisa.executable import Tool
-from lisa.util import BaseClassMixin, LisaException, get_matched_str
+from lisa.util import BaseClassMixin, LisaException, constants, get_matched_str
 from lisa.util.logger import get_logger
 from lisa.util.subclasses import Factory
 
@@ -37,6 +50,15 @@ class OsVersion:
         return self.vendor
 
 
+@dataclass
+class PackageRequest:
+    # a request of installing packages, it's queued and merged with other requests.
+    packages: List[str]
+    signed: bool = True
+    completed: bool = False
+    error: Optional[Exception] = None
+
+
 class OperatingSystem:
     __lsb_release_pattern = re.compile(r"^Description:[ \t]+([\w]+)[ ]+$", re.M)
     __os_release_pattern_name = re.compile(
@@ -48,8 +70,33 @@ class OperatingSystem:
     __debian_issue_pattern = re.compile(r"^([^ ]+) ?.*$")
     __release_pattern = re.compile(r"^DISTRIB_ID='?([^ \n']+).*$", re.M)
     __suse_release_pattern = re.compile(r"^(SUSE).*$", re.M)
+    __detect_marker_pattern = re.compile(r"^<<<lisa-detect:([\w-]+)>>>\r?$")
+    # name and command of sources to detect the distro. All of them are run in one
+    # command, and split by markers.
+    __detect_commands: List[Tuple[str, str]] = [
+        ("lsb_release", "lsb_release -d"),
+        ("os_release", "cat /etc/os-release"),
+        # for RedHat, CentOS 6.x
+        ("redhat_release", "cat /etc/redhat-release"),
+        # for FreeBSD
+        ("uname", "uname"),
+        # for Debian
+        ("issue", "cat /etc/issue"),
+        # note, cat /etc/*release doesn't work in some images, so try them one by
+        # one. try best for other distros, like Sapphire
+        ("release", "cat /etc/release"),
+        # try best for other distros, like VeloCloud
+        ("lsb-release", "cat /etc/lsb-release"),
+        # try best for some suse derives, like netiq
+        ("suse_release", "cat /etc/SuSE-release"),
+    ]
 
     __posix_factory: Optional[Factory[Any]] = None
+    # name patterns of posix types, they are compiled once, and matched by order.
+    __posix_patterns: List[Tuple[Type["Posix"], Pattern[str]]] = []
+    # detected types by host key fingerprint. When a node reconnects, for example,
+    # after reboot, the detection is skipped.
+    __detected_types: Dict[str, Type["Posix"]] = {}
 
     def __init__(self, node: "Node", is_posix: bool) -> None:
         super().__init__()
@@ -59,7 +106,11 @@ class OperatingSystem:
         self._os_version: Optional[OsVersion] = None
 
     @classmethod
-    def create(cls, node: "Node") -> Any:
+    def create(cls, node: "Node", type_name: str = "") -> Any:
+        """
+        Detect and create the OS of the node. If type_name is specified, for example,
+        it's loaded from a persisted snapshot, the detection is skipped.
+        """
         log = _get_init_logger(parent=node.log)
         result: Optional[OperatingSystem] = None
 
@@ -67,28 +118,40 @@ class OperatingSystem:
         if node.shell.is_posix:
             # delay create factory to make sure it's late than loading extensions
             if cls.__posix_factory is None:
-                cls.__posix_factory = Factory[Posix](Posix)
-                cls.__posix_factory.initialize()
-            # cast type for easy to use
-            posix_factory: Factory[Posix] = cls.__posix_factory
+                posix_factory = Factory[Posix](Posix)
+                posix_factory.initialize()
+                posix_patterns: List[Tuple[Type[Posix], Pattern[str]]] = []
+                for sub_type in posix_factory.values():
+                    posix_type: Type[Posix] = sub_type
+                    posix_patterns.append((posix_type, posix_type.name_pattern()))
+                cls.__posix_patterns = posix_patterns
+                cls.__posix_factory = posix_factory
+
+            fingerprint = node.shell.host_key_fingerprint
+            detected_type = cls.__detected_types.get(fingerprint)
+            if type_name:
+                detected_info = f"type name {type_name}"
+                result = cls.__posix_factory.create_by_type_name(type_name, node=node)
+            elif fingerprint and detected_type:
+                detected_info = f"host key fingerprint {fingerprint}"
+                result = detected_type(node)
 
-            matched = False
             os_infos: List[str] = []
-            for os_info_item in cls._get_detect_string(node):
-                if os_info_item:
-                    os_infos.append(os_info_item)
-                    for sub_type in posix_factory.values():
-                        posix_type: Type[Posix] = sub_type
-                        pattern = posix_type.name_pattern()
-                        if pattern.findall(os_info_item):
-                            detected_info = os_info_item
-                            result = posix_type(node)
-                            matched = True
+            if not result:
+                for os_info_item in cls._get_detect_string(node):
+                    if os_info_item:
+                        os_infos.append(os_info_item)
+                        for posix_type, pattern in cls.__posix_patterns:
+                            if pattern.findall(os_info_item):
+                                detected_info = os_info_item
+                                result = posix_type(node)
+                                break
+                        if result:
                             break
-                    if matched:
-                        break
+                if result and fingerprint:
+                    cls.__detected_types[fingerprint] = posix_type
 
-            if not os_infos:
+            if not result and not os_infos:
                 raise LisaException(
                     "unknown posix distro, no os info found. "
                     "it may cause by not support basic commands like `cat`"
@@ -123,40 +186,44 @@ class OperatingSystem:
     @classmethod
     def _get_detect_string(cls, node: Any) -> Iterable[str]:
         typed_node: Node = node
-        cmd_result = typed_node.execute(cmd="lsb_release -d", no_error_log=True)
-        yield get_matched_str(cmd_result.stdout, cls.__lsb_release_pattern)
+        # the output may not end with a new line, so a marker starts a new line.
+        command = "".join(
+            f"echo; echo '<<<lisa-detect:{name}>>>'; {detect_command} 2>/dev/null; "
+            for name, detect_command in cls.__detect_commands
+        )
+        cmd_result = typed_node.execute(cmd=command, shell=True, no_error_log=True)
+        outputs: Dict[str, List[str]] = {}
+        lines: List[str] = []
+        for line in cmd_result.stdout.splitlines():
+            matched = cls.__detect_marker_pattern.match(line)
+            if matched:
+                lines = []
+                outputs[matched.group(1)] = lines
+            else:
+                lines.append(line)
 
-        cmd_result = typed_node.execute(cmd="cat /etc/os-release", no_error_log=True)
-        yield get_matched_str(cmd_result.stdout, cls.__os_release_pattern_name)
-        yield get_matched_str(cmd_result.stdout, cls.__os_release_pattern_id)
+        def _get_output(name: str) -> str:
+            return "\n".join(outputs.get(name, [])).strip()
 
-        # for RedHat, CentOS 6.x
-        cmd_result = typed_node.execute(
-            cmd="cat /etc/redhat-release", no_error_log=True
-        )
-        yield get_matched_str(cmd_result.stdout, cls.__redhat_release_pattern_header)
-        yield get_matched_str(cmd_result.stdout, cls.__redhat_release_pattern_bracket)
+        yield get_matched_str(_get_output("lsb_release"), cls.__lsb_release_pattern)
 
-        # for FreeBSD
-        cmd_result = typed_node.execute(cmd="uname", no_error_log=True)
-        yield cmd_result.stdout
+        os_release = _get_output("os_release")
+        yield get_matched_str(os_release, cls.__os_release_pattern_name)
+        yield get_matched_str(os_release, cls.__os_release_pattern_id)
 
-        # for Debian
-        cmd_result = typed_node.execute(cmd="cat /etc/issue", no_error_log=True)
-        yield get_matched_str(cmd_result.stdout, cls.__debian_issue_pattern)
+        redhat_release = _get_output("redhat_release")
+        yield get_matched_str(redhat_release, cls.__redhat_release_pattern_header)
+        yield get_matched_str(redhat_release, cls.__redhat_release_pattern_bracket)
 
-        # note, cat /etc/*release doesn't work in some images, so try them one by one
-        # try best for other distros, like Sapphire
-        cmd_result = typed_node.execute(cmd="cat /etc/release", no_error_log=True)
-        yield get_matched_str(cmd_result.stdout, cls.__release_pattern)
+        yield _get_output("uname")
 
-        # try best for other distros, like VeloCloud
-        cmd_result = typed_node.execute(cmd="cat /etc/lsb-release", no_error_log=True)
-        yield get_matched_str(cmd_result.stdout, cls.__release_pattern)
+        yield get_matched_str(_get_output("issue"), cls.__debian_issue_pattern)
 
-        # try best for some suse derives, like netiq
-        cmd_result = typed_node.execute(cmd="cat /etc/SuSE-release", no_error_log=True)
-        yield get_matched_str(cmd_result.stdout, cls.__suse_release_pattern)
+        yield get_matched_str(_get_output("release"), cls.__release_pattern)
+
+        yield get_matched_str(_get_output("lsb-release"), cls.__release_pattern)
+
+        yield get_matched_str(_get_output("suse_release"), cls.__suse_release_pattern)
 
     def _get_os_version(self) -> OsVersion:
         raise NotImplementedError
@@ -208,9 +275,30 @@ class Posix(OperatingSystem, BaseClassMixin):
     # This regex gets the codename for the ditsro
     __distro_codename_pattern = re.compile(r"^.*\(([^)]+)")
 
+    # When packages are not found, the saved metadata may be stale. If the output
+    # of installation matches these patterns, the metadata is refreshed and the
+    # installation is retried.
+    _package_missing_patterns: List[Pattern[str]] = []
+    _package_metadata_stamp = (
+        f"$HOME/{constants.PATH_REMOTE_ROOT}/package_metadata_refreshed"
+    )
+
     def __init__(self, node: Any) -> None:
         super().__init__(node, is_posix=True)
         self._first_time_installation: bool = True
+        self._is_package_metadata_refreshed: bool = False
+        # packages installed by LISA, they are not installed again.
+        self._installed_packages: Set[str] = set()
+        # tools may be installed concurrently, but package managers hold a lock
+        # on the node. So requests are queued, and the queued requests are merged
+        # into one package manager invocation, when the running one completed.
+        self._package_requests: List[PackageRequest] = []
+        self._package_condition = threading.Condition()
+        self._is_installing_packages: bool = False
+
+    @property
+    def package_metadata_ttl(self) -> int:
+        return int(self._node.runbook.package_metadata_ttl)
 
     @classmethod
     def type_name(cls) -> str:
@@ -235,14 +323,19 @@ class Posix(OperatingSystem, BaseClassMixin):
     def _get_os_version(self) -> OsVersion:
         os_version = OsVersion("")
         # try to set OsVersion from info in /etc/os-release.
-        cmd_result = self._node.execute(cmd="cat /etc/os-release", no_error_log=True)
-        if cmd_result.exit_code != 0:
-            raise LisaException(
-                "Error in running command 'cat /etc/os-release'"
-                f"exit_code: {cmd_result.exit_code} stderr: {cmd_result.stderr}"
+        os_release = self._node.facts.get().os_release
+        if os_release is None:
+            cmd_result = self._node.execute(
+                cmd="cat /etc/os-release", no_error_log=True
             )
+            if cmd_result.exit_code != 0:
+                raise LisaException(
+                    "Error in running command 'cat /etc/os-release'"
+                    f"exit_code: {cmd_result.exit_code} stderr: {cmd_result.stderr}"
+                )
+            os_release = cmd_result.stdout
 
-        for row in cmd_result.stdout.splitlines():
+        for row in os_release.splitlines():
             os_release_info = self.__os_info_pattern.match(row)
             if not os_release_info:
                 continue
@@ -286,11 +379,48 @@ class Posix(OperatingSystem, BaseClassMixin):
         assert isinstance(packages, list), f"actual:{type(packages)}"
         for item in packages:
             package_names.append(self.__resolve_package_name(item))
-        if self._first_time_installation:
-            self._first_time_installation = False
-            self._initialize_package_installation()
 
-        self._install_packages(package_names, signed)
+        request = PackageRequest(packages=package_names, signed=signed)
+        queued_requests: List[PackageRequest] = []
+        with self._package_condition:
+            self._package_requests.append(request)
+            while not request.completed and self._is_installing_packages:
+                self._package_condition.wait()
+            if not request.completed:
+                # no running installation, so current thread installs all queued
+                # requests, and other requesters wait on it.
+                self._is_installing_packages = True
+                queued_requests = self._package_requests
+                self._package_requests = []
+
+        if queued_requests:
+            try:
+                self._install_package_requests(queued_requests)
+            finally:
+                with self._package_condition:
+                    for queued_request in queued_requests:
+                        queued_request.completed = True
+                    self._is_installing_packages = False
+                    self._package_condition.notify_all()
+
+        if request.error:
+            raise request.error
+
+    def prefetch_packages(
+        self,
+        packages: Union[str, Tool, Type[Tool], List[Union[str, Tool, Type[Tool]]]],
+        signed: bool = True,
+    ) -> None:
+        """
+        Install all packages, which are needed by a test suite, in one package
+        manager invocation. It can be called in before_suite, so that tools find
+        packages installed already. It's the best effort, if it fails, the tools
+        install and report errors on their packages again.
+        """
+        try:
+            self.install_packages(packages, signed)
+        except Exception as identifier:
+            self._log.debug(f"failed on prefetching packages: {identifier}")
 
     def package_exists(
         self, package: Union[str, Tool, Type[Tool]], signed: bool = True
@@ -305,6 +435,110 @@ class Posix(OperatingSystem, BaseClassMixin):
     def update_packages(self, packages: Union[str, Tool, Type[Tool]]) -> None:
         raise NotImplementedError
 
+    def _install_package_requests(self, requests: List[PackageRequest]) -> None:
+        try:
+            if self._first_time_installation:
+                self._first_time_installation = False
+                self._refresh_package_metadata()
+        except Exception as identifier:
+            for request in requests:
+                request.error = identifier
+            return
+
+        for signed in [True, False]:
+            signed_requests = [x for x in requests if x.signed == signed]
+            if not signed_requests:
+                continue
+            try:
+                self._install_merged_packages(signed_requests, signed)
+            except Exception as identifier:
+                if len(signed_requests) == 1:
+                    signed_requests[0].error = identifier
+                    continue
+                # install one by one, so the error is raised to the right requester.
+                self._log.debug(
+                    f"failed on merged installation, retry one by one: {identifier}"
+                )
+                for request in signed_requests:
+                    try:
+                        self._install_merged_packages([request], signed)
+                    except Exception as request_identifier:
+                        request.error = request_identifier
+
+    def _install_merged_packages(
+        self, requests: List[PackageRequest], signed: bool
+    ) -> None:
+        package_names: List[str] = []
+        for request in requests:
+            for package_name in request.packages:
+                if (
+                    package_name not in self._installed_packages
+                    and package_name not in package_names
+                ):
+                    package_names.append(package_name)
+        if not package_names:
+            self._log.debug("all packages are installed already.")
+            return
+
+        try:
+            self._install_packages(package_names, signed)
+        except LisaException as identifier:
+            if self._is_package_metadata_refreshed or not any(
+                pattern.search(str(identifier))
+                for pattern in self._package_missing_patterns
+            ):
+                raise identifier
+            self._log.debug(
+                "packages are not found with the saved metadata, "
+                f"refresh it and retry: {identifier}"
+            )
+            self._refresh_package_metadata(force=True)
+            self._install_packages(package_names, signed)
+        self._installed_packages.update(package_names)
+
+    def _refresh_package_metadata(self, force: bool = False) -> None:
+        if (
+            type(self)._initialize_package_installation
+            is Posix._initialize_package_installation
+        ):
+            # nothing to refresh on this os.
+            return
+
+        if not force and self.package_metadata_ttl > 0:
+            age = self._get_package_metadata_age()
+            if age is not None and 0 <= age < self.package_metadata_ttl:
+                self._log.debug(
+                    f"package metadata is refreshed {age} seconds ago, skip it."
+                )
+                return
+
+        self._initialize_package_installation()
+        self._is_package_metadata_refreshed = True
+        self._save_package_metadata_time()
+
+    def _get_package_metadata_age(self) -> Optional[int]:
+        # calculate on the node, so it's not impacted by the clock of controller.
+        result = self._node.execute(
+            f"test -f {self._package_metadata_stamp} && "
+            f"echo $(( $(date +%s) - $(cat {self._package_metadata_stamp}) ))",
+            shell=True,
+            no_error_log=True,
+        )
+        if result.exit_code != 0:
+            return None
+        try:
+            return int(result.stdout)
+        except ValueError:
+            return None
+
+    def _save_package_metadata_time(self) -> None:
+        self._node.execute(
+            f"mkdir -p $HOME/{constants.PATH_REMOTE_ROOT} && "
+            f"date +%s > {self._package_metadata_stamp}",
+            shell=True,
+            no_error_log=True,
+        )
+
     def __resolve_package_name(self, package: Union[str, Tool, Type[Tool]]) -> str:
         """
         A package can be a string or a tool or a type of tool.
@@ -336,6 +570,10 @@ class Debian(Linux):
     __lsb_os_info_pattern = re.compile(
         r"^(?P<name>.*):(\s+)(?P<value>.*?)?$", re.MULTILINE
     )
+    _package_missing_patterns = [
+        re.compile(r"Unable to locate package"),
+        re.compile(r"has no installation candidate"),
+    ]
 
     @classmethod
     def name_pattern(cls) -> Pattern[str]:
@@ -358,7 +596,7 @@ class Debian(Linux):
         if install_result.exit_code != 0:
             raise LisaException(
                 f"Failed to install {packages}. exit_code: {install_result.exit_code}"
-                f"stderr: {install_result.stderr}"
+                f" stdout: {install_result.stdout} stderr: {install_result.stderr}"
             )
 
     def _package_exists(self, package: str, signed: bool = True) -> bool:
@@ -410,6 +648,10 @@ class OpenBSD(BSD):
 
 class Fedora(Linux):
     __fedora_release_pattern_version = re.compile(r"^.*release\s+([0-9\.]+).*$")
+    _package_missing_patterns = [
+        re.compile(r"No match for argument"),
+        re.compile(r"No package .* available"),
+    ]
 
     @classmethod
     def name_pattern(cls) -> Pattern[str]:
@@ -425,8 +667,8 @@ class Fedora(Linux):
         install_result = self._node.execute(command, sudo=True)
         if install_result.exit_code != 0:
             raise LisaException(
-                f"Failed to install {packages}. exit_code: {install_result.exit_code} "
-                f"stderr: {install_result.stderr}"
+                f"Failed to install {packages}. exit_code: {install_result.exit_code}"
+                f" stdout: {install_result.stdout} stderr: {install_result.stderr}"
             )
         else:
             self._log.debug(f"{packages} is/are installed successfully.")
@@ -477,6 +719,11 @@ class Redhat(Fedora):
     __rhui_error_pattern = re.compile(
         r"([\w\W]*?)SSL peer rejected your certificate as expired.*", re.MULTILINE
     )
+    # The certificate is fixed on refreshing metadata. If the refresh is skipped
+    # by the TTL, the installation fails with it, and then it's refreshed.
+    _package_missing_patterns = Fedora._package_missing_patterns + [
+        re.compile(r"SSL peer rejected your certificate as expired")
+    ]
 
     @classmethod
     def name_pattern(cls) -> Pattern[str]:
@@ -489,17 +736,20 @@ class Redhat(Fedora):
         # redhat rhel 7-lvm 7.7.2019102813 Basic_A1 cost 2371.568 seconds
         # redhat rhel 8.1 8.1.2020020415 Basic_A0 cost 2409.116 seconds
         cmd_result = self._node.execute("yum -y update", sudo=True, timeout=3600)
-        # we will hit expired RHUI client certificate issue on old RHEL VM image
-        # use below solution to resolve it
-        # refer https://docs.microsoft.com/en-us/azure/virtual-machines/workloads/redhat/redhat-rhui#azure-rhui-infrastructure # noqa: E501
         if cmd_result.exit_code != 0 and self.__rhui_error_pattern.match(
             cmd_result.stdout
         ):
-            cmd_result = self._node.execute(
-                "yum update -y --disablerepo='*' --enablerepo='*microsoft*' ",
-                sudo=True,
-                timeout=3600,
-            )
+            self._fix_package_installation()
+
+    def _fix_package_installation(self) -> None:
+        # we will hit expired RHUI client certificate issue on old RHEL VM image
+        # use below solution to resolve it.
+        # refer https://docs.microsoft.com/en-us/azure/virtual-machines/workloads/redhat/redhat-rhui#azure-rhui-infrastructure # noqa: E501
+        self._node.execute(
+            "yum update -y --disablerepo='*' --enablerepo='*microsoft*' ",
+            sudo=True,
+            timeout=3600,
+        )
 
     def _install_packages(
         self, packages: Union[List[str]], signed: bool = True
@@ -517,8 +767,8 @@ class Redhat(Fedora):
             self._log.debug(f"{packages} is/are installed successfully.")
         else:
             raise LisaException(
-                f"Failed to install {packages}. exit_code: {install_result.exit_code} "
-                f"stderr: {install_result.stderr}"
+                f"Failed to install {packages}. exit_code: {install_result.exit_code}"
+                f" stdout: {install_result.stdout} stderr: {install_result.stderr}"
             )
 
     def _package_exists(self, package: str, signed: bool = True) -> bool:
@@ -574,6 +824,11 @@ class CoreOs(Redhat):
 
 
 class Suse(Linux):
+    _package_missing_patterns = [
+        re.compile(r"No provider of '.*' found"),
+        re.compile(r"not found in package names"),
+    ]
+
     @classmethod
     def name_pattern(cls) -> Pattern[str]:
         return re.compile("^SLES|SUSE|sles|sle-hpc|sle_hpc|opensuse-leap$")
@@ -591,7 +846,7 @@ class Suse(Linux):
         if install_result.exit_code in (1, 100):
             raise LisaException(
                 f"Failed to install {packages}. exit_code: {install_result.exit_code}"
-                f"stderr: {install_result.stderr}"
+                f" stdout: {install_result.stdout} stderr: {install_result.stderr}"
             )
         elif install_result.exit_code == 0:
             self._log.debug(f"{packages} is/are installed successfully.")
@@ -3,7 +3,7 @@
 
 import copy
 from functools import partial
-from typing import Any, Callable, List, Optional, cast
+from typing import Any, Callable, List, Optional, Set, cast
 
 from lisa import notifier, schema, search_space
 from lisa.action import ActionStatus
@@ -34,6 +34,8 @@ class LisaRunner(BaseRunner):
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
         super()._initialize(*args, **kwargs)
         self._is_prepared = False
+        # names of environments, which wait for resource released by others.
+        self._waiting_environments: Set[str] = set()
 
         # select test cases
         selected_test_cases = select_testcases(filters=self._runbook.testcase)
@@ -80,14 +82,24 @@ class LisaRunner(BaseRunner):
         if delete_task:
             return delete_task
 
+        if self._waiting_environments and not any(
+            x.is_in_use for x in self.environments
+        ):
+            # nothing is running, so no more resource is released by waiting. Try
+            # to deploy them again.
+            self._waiting_environments.clear()
+
         if available_results and available_environments:
             can_run_results = self._get_same_priority_results(available_results)
 
             # it means there are test cases and environment, so it needs to
             # schedule task.
             for environment in available_environments:
-                if environment.is_in_use:
-                    # skip in used environments
+                if (
+                    environment.is_in_use
+                    or environment.name in self._waiting_environments
+                ):
+                    # skip in used or waiting environments
                     continue
 
                 environment_results = self._get_runnable_test_results(
@@ -266,13 +278,21 @@ class LisaRunner(BaseRunner):
                 environment.status == EnvironmentStatus.Deployed
             ), f"actual: {environment.status}"
         except WaitMoreResourceError as identifier:
-            self._log.info(
-                f"[{environment.name}] waiting for more resource: "
-                f"{identifier}, skip assigning case"
-            )
-            self._skip_test_results(
-                test_results, additional_reason="no more resource to deploy"
-            )
+            if any(x.is_in_use for x in self.environments if x is not environment):
+                # other environments may release resource, so cases wait for it.
+                self._log.info(
+                    f"[{environment.name}] waiting for more resource: "
+                    f"{identifier}, deploy again after other environments deleted"
+                )
+                self._waiting_environments.add(environment.name)
+            else:
+                self._log.info(
+                    f"[{environment.name}] waiting for more resource: "
+                    f"{identifier}, skip assigning case"
+                )
+                self._skip_test_results(
+                    test_results, additional_reason="no more resource to deploy"
+                )
         except Exception as identifier:
             self._attach_failed_environment_to_result(
                 environment=environment,
@@ -335,6 +355,8 @@ class LisaRunner(BaseRunner):
             self.platform.delete_environment(environment)
         else:
             environment.status = EnvironmentStatus.Deleted
+        # resource may be released, so waiting environments can try again.
+        self._waiting_environments.clear()
 
     def _get_same_priority_results(
         self, test_results: List[TestResult]
@@ -543,8 +565,8 @@ class LisaRunner(BaseRunner):
 
             # check if there is platform requirement on test case
             if test_req.platform_type and len(test_req.platform_type) > 0:
-                check_result = test_req.platform_type.check(platform_type_set)
-                if not check_result.result:
+                if not test_req.platform_type.match(platform_type_set):
+                    check_result = test_req.platform_type.check(platform_type_set)
                     test_result.set_status(TestStatus.SKIPPED, check_result.reasons)
 
             if test_result.can_run:
@@ -379,8 +379,8 @@ class RunnerTestCase(TestCase):
 
     def test_deploy_no_more_resource(self) -> None:
         # platform may see no more resource, like no azure quota.
-        # cases skipped due to this.
-        # In future, will add retry on wait more resource.
+        # cases skipped due to this, because no other environment can release
+        # resource.
         platform_schema = test_platform.MockPlatformSchema()
         platform_schema.wait_more_resource_error = True
         generate_cases_metadata()
@@ -411,6 +411,57 @@ class RunnerTestCase(TestCase):
             test_results=test_results,
         )
 
+    def test_deploy_after_resource_released(self) -> None:
+        # only one environment can be deployed at the same time. Others wait for
+        # it, instead of being skipped, and they are deployed after it's deleted.
+        platform_schema = test_platform.MockPlatformSchema()
+        platform_schema.max_deployed_count = 1
+        generate_cases_metadata()
+        env_runbook = generate_env_runbook()
+        runner = generate_runner(
+            env_runbook, case_use_new_env=True, platform_schema=platform_schema
+        )
+        runner.initialize()
+
+        # deploy the first environment, and hold the task to run a case on it.
+        test_results: List[TestResult] = []
+        running_task = None
+        while True:
+            task = runner.fetch_task()
+            if not task:
+                break
+            first_environment = runner.environments[0]
+            if (
+                not running_task
+                and first_environment.status == EnvironmentStatus.Deployed
+                and first_environment.is_in_use
+            ):
+                running_task = task
+                continue
+            test_results.extend(task())
+        assert running_task
+        self.assertSetEqual(
+            {"generated_1", "generated_2"}, runner._waiting_environments
+        )
+        self.assertListEqual([], test_results)
+
+        # the environment is released, so waiting ones are deployed one by one.
+        test_results.extend(running_task())
+        test_results.extend(self._run_all_tests(runner))
+        self.verify_env_results(
+            expected_prepared=["generated_0", "generated_1", "generated_2"],
+            expected_deployed_envs=["generated_0", "generated_1", "generated_2"],
+            expected_deleted_envs=["generated_0", "generated_1", "generated_2"],
+            runner=runner,
+        )
+        self.verify_test_results(
+            expected_test_order=["mock_ut1", "mock_ut2", "mock_ut3"],
+            expected_envs=["generated_0", "generated_1", "generated_2"],
+            expected_status=[TestStatus.PASSED, TestStatus.PASSED, TestStatus.PASSED],
+            expected_message=["", "", ""],
+            test_results=test_results,
+        )
+
     def test_skipped_on_suite_failure(self) -> None:
         # First two tests were skipped because the setup is made to fail.
         test_testsuite.fail_on_before_suite = True
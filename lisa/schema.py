@@ -4,7 +4,18 @@
 import copy
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Type, TypeVar, Union, cast
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
 from dataclasses_json import (
     CatchAll,
@@ -418,6 +429,26 @@ class NodeSpace(search_space.RequirementMixin, TypedSchema, ExtendableSchemaMixi
             f"{super().__repr__()}"
         )
 
+    def _get_key(self) -> Optional[Hashable]:
+        keys: List[Hashable] = [self.type, self.name, self.is_default, self.artifact]
+        for value in [
+            self.node_count,
+            self.core_count,
+            self.memory_mb,
+            self.disk_count,
+            self.nic_count,
+            self.gpu_count,
+            self.features,
+            self.excluded_features,
+        ]:
+            value_key = search_space.get_key(value)
+            if value_key is None:
+                return None
+            keys.append(value_key)
+        # extended runbook is copied to min capability, so it's a part of key.
+        keys.append(ExtendableSchemaMixin.__repr__(self))
+        return tuple(keys)
+
     def check(self, capability: Any) -> search_space.ResultReason:
         result = search_space.ResultReason()
         if capability is None:
@@ -488,6 +519,36 @@ class NodeSpace(search_space.RequirementMixin, TypedSchema, ExtendableSchemaMixi
 
         return result
 
+    def match(self, capability: Any) -> bool:
+        assert isinstance(capability, NodeSpace), f"actual: {type(capability)}"
+        if (
+            not capability.node_count
+            or not capability.core_count
+            or not capability.memory_mb
+            or not capability.disk_count
+            or not capability.nic_count
+        ):
+            return False
+
+        if isinstance(self.node_count, int) and isinstance(capability.node_count, int):
+            if self.node_count > capability.node_count:
+                return False
+        elif not search_space.match_countspace(self.node_count, capability.node_count):
+            return False
+
+        if not (
+            search_space.match_countspace(self.core_count, capability.core_count)
+            and search_space.match_countspace(self.memory_mb, capability.memory_mb)
+            and search_space.match_countspace(self.disk_count, capability.disk_count)
+            and search_space.match_countspace(self.nic_count, capability.nic_count)
+            and search_space.match_countspace(self.gpu_count, capability.gpu_count)
+            and search_space.match(self.features, capability.features)
+        ):
+            return False
+        if self.excluded_features:
+            return self.excluded_features.match(capability.features)
+        return True
+
     def expand_by_node_count(self) -> List[Any]:
         # expand node count in requirement to one,
         # so that's easy to compare equalization later.
@@ -575,6 +636,12 @@ class Node(TypedSchema):
     capability: Capability = field(default_factory=Capability)
     name: str = ""
     is_default: bool = field(default=False)
+    # The metadata of package manager isn't refreshed again in the TTL (seconds),
+    # even across runs. The time of last refresh is saved on the node. Set it to 0
+    # to refresh in each run.
+    package_metadata_ttl: int = field(
+        default=24 * 60 * 60, metadata=metadata(validate=validate.Range(min=0))
+    )
 
     delay_parsed: CatchAll = field(default_factory=dict)  # type: ignore
 
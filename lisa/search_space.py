@@ -1,10 +1,25 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import copy
 import sys
+import threading
 from abc import abstractmethod
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Any, Iterable, List, Optional, Set, TypeVar, Union
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
 
 from dataclasses_json import dataclass_json
 
@@ -12,6 +27,12 @@ from lisa.util import LisaException
 
 T = TypeVar("T")
 
+# max count of memoized results of generate_min_capability. Results of check are
+# not memoized, since building keys costs as much as checking.
+MEMO_MAX_SIZE = 4096
+
+_MISSING = object()
+
 
 @dataclass
 class ResultReason:
@@ -48,31 +69,139 @@ class ResultReason:
             self.add_reason(reason, name)
 
 
+class _Memo:
+    """
+    A bounded LRU memo, it's shared by threads.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self._max_size = max_size
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            value = self._items.get(key, _MISSING)
+            if value is not _MISSING:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_min_capability_memo = _Memo(MEMO_MAX_SIZE)
+
+
+def get_key(value: Any) -> Optional[Hashable]:
+    """
+    Return a canonical hashable key of a search space value. Equal values have the
+    same key, no matter how they are created. None means the value cannot be keyed,
+    so results of it are not memoized.
+
+    The key is built on every call, instead of cached on the value. So if a value is
+    changed after it's hashed, it gets a new key, and the memoized result of the old
+    value is not returned.
+    """
+    if value is None:
+        return ()
+    if isinstance(value, int):
+        return value
+    if isinstance(value, list):
+        keys: List[Hashable] = []
+        for item in value:
+            item_key = get_key(item)
+            if item_key is None:
+                return None
+            keys.append(item_key)
+        return (list, tuple(keys))
+    if isinstance(value, RequirementMixin):
+        value_key = value._get_key()
+        if value_key is None:
+            return None
+        return (type(value), value_key)
+    return None
+
+
+def _get_pair_key(requirement: Any, capability: Any) -> Optional[Tuple[Any, Any]]:
+    requirement_key = get_key(requirement)
+    if requirement_key is None:
+        return None
+    capability_key = get_key(capability)
+    if capability_key is None:
+        return None
+    return (requirement_key, capability_key)
+
+
+def clear_memo() -> None:
+    _min_capability_memo.clear()
+
+
 class RequirementMixin:
     @abstractmethod
     def check(self, capability: Any) -> ResultReason:
         raise NotImplementedError()
 
+    def _get_key(self) -> Optional[Hashable]:
+        """
+        Return a hashable tuple of all fields, which affect results. The default
+        None means results are not memoized.
+        """
+        return None
+
+    def match(self, capability: Any) -> bool:
+        """
+        It's the same as check, but returns bool only. Subclasses override it to
+        skip building reasons, as it's called many times on scheduling. Call check
+        to get reasons, when they need to be shown or recorded.
+        """
+        return self.check(capability).result
+
     @abstractmethod
     def _generate_min_capability(self, capability: Any) -> Any:
         raise NotImplementedError()
 
     def generate_min_capability(self, capability: Any) -> Any:
-        check_result = self.check(capability)
-        if not check_result.result:
+        key = _get_pair_key(self, capability)
+        if key is not None:
+            cached = _min_capability_memo.get(key)
+            if cached is not _MISSING:
+                # the result may be modified by caller, so return a copy.
+                return copy.deepcopy(cached)
+
+        if not self.match(capability):
+            check_result = self.check(capability)
             raise LisaException(
                 "cannot get min value, capability doesn't support requirement:"
                 f"{check_result.reasons}"
             )
-        return self._generate_min_capability(capability)
+        result = self._generate_min_capability(capability)
+        if key is not None:
+            _min_capability_memo.set(key, copy.deepcopy(result))
+        return result
 
 
 T_SEARCH_SPACE = TypeVar("T_SEARCH_SPACE", bound=RequirementMixin)
 
 
 @dataclass_json()
-@dataclass
+@dataclass(frozen=True)
 class IntRange(RequirementMixin):
+    """
+    It's immutable, so same ranges are shared on loading from runbook or cache.
+    """
+
     min: int = 0
     max: int = field(default=sys.maxsize)
     max_inclusive: bool = True
@@ -94,6 +223,9 @@ class IntRange(RequirementMixin):
             max_inclusive = "(inc)" if self.max_inclusive else "(exc)"
         return f"[{self.min},{max_value}{max_inclusive}]"
 
+    def _get_key(self) -> Optional[Hashable]:
+        return (self.min, self.max, self.max_inclusive)
+
     def check(self, capability: Any) -> ResultReason:
         result = ResultReason()
         if capability is None:
@@ -150,6 +282,28 @@ class IntRange(RequirementMixin):
 
         return result
 
+    def match(self, capability: Any) -> bool:
+        if capability is None:
+            return False
+        if isinstance(capability, IntRange):
+            return not (
+                capability.max < self.min
+                or (capability.max == self.min and not capability.max_inclusive)
+                or capability.min > self.max
+                or (capability.min == self.max and not self.max_inclusive)
+            )
+        if isinstance(capability, int):
+            return not (
+                capability < self.min
+                or capability > self.max
+                or (capability == self.max and not self.max_inclusive)
+            )
+        assert isinstance(capability, list), f"actual: {type(capability)}"
+        for cap_item in capability:
+            if self.match(cap_item):
+                return True
+        return False
+
     def _generate_min_capability(self, capability: Any) -> int:
         if isinstance(capability, int):
             result: int = capability
@@ -162,8 +316,7 @@ class IntRange(RequirementMixin):
             assert isinstance(capability, list), f"actual: {type(capability)}"
             result = self.max if self.max_inclusive else self.max - 1
             for cap_item in capability:
-                temp_result = self.check(cap_item)
-                if temp_result.result:
+                if self.match(cap_item):
                     temp_min = self.generate_min_capability(cap_item)
                     result = min(temp_min, result)
 
@@ -172,6 +325,14 @@ class IntRange(RequirementMixin):
 
 CountSpace = Union[int, List[IntRange], IntRange, None]
 
+# loaded ranges, they are shared by search spaces, since IntRange is immutable.
+_shared_int_ranges: Dict[IntRange, IntRange] = {}
+
+
+def _load_int_range(data: Any) -> IntRange:
+    loaded: IntRange = IntRange.schema().load(data)  # type: ignore
+    return _shared_int_ranges.setdefault(loaded, loaded)
+
 
 def decode_count_space(data: Any) -> Any:
     """
@@ -185,13 +346,13 @@ def decode_count_space(data: Any) -> Any:
         decoded_data = []
         for item in data:
             if isinstance(item, dict):
-                decoded_data.append(IntRange.schema().load(item))  # type: ignore
+                decoded_data.append(_load_int_range(item))
             else:
                 assert isinstance(item, IntRange), f"actual: {type(item)}"
                 decoded_data.append(item)
     else:
         assert isinstance(data, dict), f"actual: {type(data)}"
-        decoded_data = IntRange.schema().load(data)  # type: ignore
+        decoded_data = _load_int_range(data)
     return decoded_data
 
 
@@ -200,8 +361,7 @@ def _one_of_matched(requirement: Any, capabilities: List[Any]) -> ResultReason:
     supported = False
     assert isinstance(requirement, RequirementMixin), f"actual: {type(requirement)}"
     for cap_item in capabilities:
-        temp_result = requirement.check(cap_item)
-        if temp_result.result:
+        if requirement.match(cap_item):
             supported = True
             break
     if not supported:
@@ -236,6 +396,20 @@ class SetSpace(RequirementMixin, Set[T]):
     def __post_init__(self, *args: Any, **kwargs: Any) -> None:
         self.update(self.items)
 
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "SetSpace[T]":
+        # set content is not restored by the default deepcopy, because items are
+        # added in __init__.
+        return SetSpace(
+            is_allow_set=self.is_allow_set, items=copy.deepcopy(self.items, memo)
+        )
+
+    def _get_key(self) -> Optional[Hashable]:
+        try:
+            return (self.is_allow_set, frozenset(self))
+        except TypeError:
+            # items are not hashable
+            return None
+
     def check(self, capability: Any) -> ResultReason:
         result = ResultReason()
         if self.is_allow_set and len(self) > 0 and not capability:
@@ -269,6 +443,15 @@ class SetSpace(RequirementMixin, Set[T]):
                     result.add_reason(f"requirements excludes {names}")
         return result
 
+    def match(self, capability: Any) -> bool:
+        assert isinstance(capability, SetSpace), f"actual: {type(capability)}"
+        assert capability.is_allow_set, "capability must be allow set"
+        if self.is_allow_set:
+            if len(self) > 0 and not capability:
+                return False
+            return capability.issuperset(self)
+        return self.isdisjoint(capability)
+
     def _generate_min_capability(self, capability: Any) -> Optional[Set[T]]:
         result = None
         if self.is_allow_set and len(self) > 0:
@@ -277,12 +460,21 @@ class SetSpace(RequirementMixin, Set[T]):
         return result
 
     def add(self, element: T) -> None:
+        element = _intern(element)
         super().add(element)
         self.items.append(element)
 
     def update(self, *s: Iterable[T]) -> None:
-        super().update(*s)
-        self.items.extend(*s)
+        # feature names are repeated in thousands of capabilities, so intern them.
+        interned = [_intern(x) for items in s for x in items]
+        super().update(interned)
+        self.items.extend(interned)
+
+
+def _intern(item: T) -> T:
+    if isinstance(item, str):
+        return cast(T, sys.intern(item))
+    return item
 
 
 def decode_set_space(data: Any) -> Any:
@@ -313,17 +505,14 @@ def check_countspace(requirement: CountSpace, capability: CountSpace) -> ResultR
                             f"capability: {capability}"
                         )
                 elif isinstance(capability, IntRange):
-                    temp_result = capability.check(requirement)
-                    if not temp_result.result:
+                    if not capability.match(requirement):
                         result.add_reason(
                             "requirement is a number, capability should include it, "
                             f"but requirement: {requirement}, capability: {capability}"
                         )
                 else:
                     assert isinstance(capability, list), f"actual: {type(capability)}"
-                    temp_requirement = IntRange(min=requirement, max=requirement)
-                    temp_result = _one_of_matched(temp_requirement, capability)
-                    if not temp_result.result:
+                    if not _match_number(requirement, capability):
                         result.add_reason(
                             f"requirement is a number, no capability matched, "
                             f"requirement: {requirement}, capability: {capability}"
@@ -335,9 +524,9 @@ def check_countspace(requirement: CountSpace, capability: CountSpace) -> ResultR
 
                 supported = False
                 for req_item in requirement:
-                    temp_result = req_item.check(capability)
-                    if temp_result.result:
+                    if req_item.match(capability):
                         supported = True
+                        break
                 if not supported:
                     result.add_reason(
                         "no capability matches requirement, "
@@ -346,11 +535,46 @@ def check_countspace(requirement: CountSpace, capability: CountSpace) -> ResultR
     return result
 
 
+def match_countspace(requirement: CountSpace, capability: CountSpace) -> bool:
+    """
+    It's the same as check_countspace, but returns bool only.
+    """
+    if requirement is None:
+        return True
+    if capability is None:
+        return False
+    if isinstance(requirement, int):
+        if isinstance(capability, int):
+            return requirement == capability
+        if isinstance(capability, IntRange):
+            return capability.match(requirement)
+        assert isinstance(capability, list), f"actual: {type(capability)}"
+        return _match_number(requirement, capability)
+    if isinstance(requirement, IntRange):
+        return requirement.match(capability)
+    assert isinstance(requirement, list), f"actual: {type(requirement)}"
+    for req_item in requirement:
+        if req_item.match(capability):
+            return True
+    return False
+
+
+def _match_number(requirement: int, capabilities: List[IntRange]) -> bool:
+    # it's the same as checking IntRange(min=requirement, max=requirement) with
+    # each capability, but no temp IntRange is created.
+    for cap_item in capabilities:
+        if isinstance(cap_item, int):
+            if cap_item == requirement:
+                return True
+        elif cap_item.match(requirement):
+            return True
+    return False
+
+
 def generate_min_capability_countspace(
     requirement: CountSpace, capability: CountSpace
 ) -> int:
-    check_result = check_countspace(requirement, capability)
-    if not check_result.result:
+    if not match_countspace(requirement, capability):
         raise LisaException(
             "cannot get min value, capability doesn't support requirement"
         )
@@ -368,8 +592,7 @@ def generate_min_capability_countspace(
         assert isinstance(requirement, list), f"actual: {type(requirement)}"
         result = sys.maxsize
         for req_item in requirement:
-            temp_result = req_item.check(capability)
-            if temp_result.result:
+            if req_item.match(capability):
                 temp_min = req_item.generate_min_capability(capability)
                 result = min(result, temp_min)
 
@@ -389,9 +612,9 @@ def check(
         elif isinstance(requirement, (list)):
             supported = False
             for req_item in requirement:
-                temp_result = req_item.check(capability)
-                if temp_result.result:
+                if req_item.match(capability):
                     supported = True
+                    break
             if not supported:
                 result.add_reason(
                     "no capability meet any of requirement, "
@@ -402,12 +625,30 @@ def check(
     return result
 
 
+def match(
+    requirement: Union[T_SEARCH_SPACE, List[T_SEARCH_SPACE], None],
+    capability: Union[T_SEARCH_SPACE, List[T_SEARCH_SPACE], None],
+) -> bool:
+    """
+    It's the same as check, but returns bool only.
+    """
+    if requirement is None:
+        return True
+    if capability is None:
+        return False
+    if isinstance(requirement, list):
+        for req_item in requirement:
+            if req_item.match(capability):
+                return True
+        return False
+    return requirement.match(capability)
+
+
 def generate_min_capability(
     requirement: Union[T_SEARCH_SPACE, List[T_SEARCH_SPACE], None],
     capability: Union[T_SEARCH_SPACE, List[T_SEARCH_SPACE], None],
 ) -> Any:
-    check_result = check(requirement, capability)
-    if not check_result.result:
+    if not match(requirement, capability):
         raise LisaException(
             "cannot get min value, capability doesn't support requirement"
         )
@@ -419,8 +660,7 @@ def generate_min_capability(
     if isinstance(requirement, list):
         result = None
         for req_item in requirement:
-            temp_result = req_item.check(capability)
-            if temp_result.result:
+            if req_item.match(capability):
                 temp_min = req_item.generate_min_capability(capability)
                 if result is None:
                     result = temp_min
@@ -0,0 +1,106 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import sys
+from typing import Dict, Iterator, List, Tuple
+
+from lisa import schema, search_space
+
+# the bounds of a count space, which are used to filter candidates roughly.
+_UNBOUNDED: Tuple[int, int] = (0, sys.maxsize)
+
+
+def _get_bounds(space: search_space.CountSpace) -> Tuple[int, int]:
+    """
+    Return the min and max value, which the count space may contain. The bounds are
+    loose, so it never drops a matched one.
+    """
+    if isinstance(space, int):
+        return (space, space)
+    if isinstance(space, search_space.IntRange):
+        return (space.min, space.max)
+    if isinstance(space, list) and space:
+        bounds = [_get_bounds(x) for x in space]
+        return (min(x[0] for x in bounds), max(x[1] for x in bounds))
+    return _UNBOUNDED
+
+
+class CapabilityTable:
+    """
+    Columnar view of capabilities in a location. Each count is stored in its own
+    column of bounds, and features are stored as bitmasks. A requirement is matched
+    by comparing numbers column by column firstly, and only the candidates, which
+    survived, are checked by the full search space match.
+    """
+
+    # names of count columns. The node count isn't here, because each capability
+    # of vm size is a single node.
+    _count_names = ["core_count", "memory_mb", "disk_count", "nic_count", "gpu_count"]
+
+    def __init__(self, capabilities: List[schema.NodeSpace]) -> None:
+        self._capabilities = capabilities
+        self._feature_bits: Dict[str, int] = {}
+        self._feature_masks: List[int] = []
+        self._columns: List[Tuple[List[int], List[int]]] = []
+
+        for name in self._count_names:
+            bounds = [_get_bounds(getattr(x, name)) for x in capabilities]
+            self._columns.append(([x[0] for x in bounds], [x[1] for x in bounds]))
+
+        for capability in capabilities:
+            mask = 0
+            for feature in capability.features or []:
+                mask |= self._get_feature_bit(feature)
+            self._feature_masks.append(mask)
+
+    def __len__(self) -> int:
+        return len(self._capabilities)
+
+    def search(self, requirement: schema.NodeSpace) -> Iterator[int]:
+        """
+        Yield indexes of capabilities, which match the requirement, by the original
+        order.
+        """
+        candidates: List[int] = list(range(len(self._capabilities)))
+        for name, (cap_mins, cap_maxs) in zip(self._count_names, self._columns):
+            req_min, req_max = _get_bounds(getattr(requirement, name))
+            if (req_min, req_max) == _UNBOUNDED:
+                continue
+            # ranges of requirement and capability must overlap.
+            candidates = [
+                x
+                for x in candidates
+                if cap_maxs[x] >= req_min and cap_mins[x] <= req_max
+            ]
+
+        required_mask = 0
+        if requirement.features:
+            for feature in requirement.features:
+                feature_bit = self._feature_bits.get(feature)
+                if feature_bit is None:
+                    # no capability supports it.
+                    return
+                required_mask |= feature_bit
+        excluded_mask = 0
+        if requirement.excluded_features:
+            for feature in requirement.excluded_features:
+                excluded_mask |= self._feature_bits.get(feature, 0)
+        if required_mask or excluded_mask:
+            masks = self._feature_masks
+            candidates = [
+                x
+                for x in candidates
+                if masks[x] & required_mask == required_mask
+                and not masks[x] & excluded_mask
+            ]
+
+        for index in candidates:
+            if requirement.match(self._capabilities[index]):
+                yield index
+
+    def _get_feature_bit(self, feature: str) -> int:
+        feature_bit = self._feature_bits.get(feature)
+        if feature_bit is None:
+            feature_bit = 1 << len(self._feature_bits)
+            self._feature_bits[feature] = feature_bit
+        return feature_bit
@@ -1,31 +1,58 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import json
 import re
+import threading
 from dataclasses import InitVar, dataclass, field
-from typing import TYPE_CHECKING, Any, Dict, Optional, Union
-
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
+
+import requests
+from azure.core.pipeline.transport import RequestsTransport
 from azure.identity import DefaultAzureCredential
 from azure.mgmt.compute import ComputeManagementClient  # type: ignore
 from azure.mgmt.marketplaceordering import MarketplaceOrderingAgreements  # type: ignore
 from azure.mgmt.network import NetworkManagementClient  # type: ignore
+from azure.mgmt.resource import SubscriptionClient  # type: ignore
 from azure.mgmt.storage import StorageManagementClient  # type: ignore
 from azure.mgmt.storage.models import Sku, StorageAccountCreateParameters  # type:ignore
 from azure.storage.blob import BlobServiceClient, ContainerClient  # type: ignore
 from dataclasses_json import dataclass_json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from lisa import schema
 from lisa.environment import Environment
 from lisa.node import Node
 from lisa.util import LisaException
-from lisa.util.logger import Logger
+from lisa.util.logger import Logger, get_logger
 from lisa.util.parallel import check_cancelled
 
+from .governor import ConcurrencyGovernor, GovernorPolicy
+
 if TYPE_CHECKING:
     from .platform_ import AzurePlatform
 
 AZURE = "azure"
 AZURE_SHARED_RG_NAME = "lisa_shared_resource"
+# connections to keep alive for each host. Environments are deployed and tested
+# concurrently, so it's bigger than the default 10 of requests.
+AZURE_CONNECTION_POOL_SIZE = 64
+
+T = TypeVar("T")
 
 
 @dataclass
@@ -144,27 +171,134 @@ class AzureNodeSchema:
         return result
 
 
+class AzureClients:
+    """
+    Management clients of a platform. Each type of client is created once, and all
+    of them share one transport. So threads reuse kept-alive connections, instead of
+    negotiating TLS for each new client. Requests of all clients are governed
+    together, so they slow down, when Azure throttles them.
+    """
+
+    def __init__(
+        self, credential: DefaultAzureCredential, subscription_id: str
+    ) -> None:
+        self._credential = credential
+        self._subscription_id = subscription_id
+        self._clients: Dict[Type[Any], Any] = dict()
+        self._lock = threading.Lock()
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=AZURE_CONNECTION_POOL_SIZE,
+            pool_maxsize=AZURE_CONNECTION_POOL_SIZE,
+            # retries are handled by the pipeline of Azure SDK.
+            max_retries=Retry(total=False, redirect=False, raise_on_status=False),
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        # the session isn't owned by the transport, so it's not closed, if any
+        # client is closed.
+        self._transport = RequestsTransport(session=session, session_owner=False)
+        self.governor = ConcurrencyGovernor(
+            log=get_logger("governor", AZURE), max_window=AZURE_CONNECTION_POOL_SIZE
+        )
+
+    def get(self, client_type: Type[T]) -> T:
+        with self._lock:
+            client = self._clients.get(client_type)
+            if client is None:
+                kwargs: Dict[str, Any] = {
+                    "credential": self._credential,
+                    "transport": self._transport,
+                    "per_retry_policies": [GovernorPolicy(self.governor)],
+                }
+                if client_type is not SubscriptionClient:
+                    kwargs["subscription_id"] = self._subscription_id
+                client = client_type(**kwargs)  # type: ignore
+                self._clients[client_type] = client
+        return cast(T, client)
+
+
+class ResolutionCache:
+    """
+    Cache resolved values by keys in a json file, they expire after the ttl. If
+    multiple threads resolve the same key, the value is resolved only once, and
+    others wait and use it.
+    """
+
+    def __init__(self, path: Path, ttl: timedelta) -> None:
+        self._path = path
+        self._ttl = ttl
+        self._entries: Optional[Dict[str, Tuple[datetime, Any]]] = None
+        self._key_locks: Dict[str, threading.Lock] = dict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, resolve: Callable[[], Any]) -> Any:
+        """
+        The value must be serializable by json.
+        """
+        found, value = self._get_entry(key)
+        if found:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # check again, it may be resolved by another thread.
+            found, value = self._get_entry(key)
+            if not found:
+                value = resolve()
+                with self._lock:
+                    assert self._entries is not None
+                    self._entries[key] = (datetime.now(), value)
+                    self._save()
+        return value
+
+    def _get_entry(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            entry = self._entries.get(key)
+        if entry and datetime.now() - entry[0] < self._ttl:
+            return True, entry[1]
+        return False, None
+
+    def _load(self) -> Dict[str, Tuple[datetime, Any]]:
+        entries: Dict[str, Tuple[datetime, Any]] = dict()
+        if self._path.exists():
+            try:
+                with open(self._path, "r") as f:
+                    loaded_data: Dict[str, Any] = json.load(f)
+                for key, (updated_time, value) in loaded_data.items():
+                    entries[key] = (datetime.fromisoformat(updated_time), value)
+            except Exception:
+                # it's a cache, so ignore broken content.
+                entries = dict()
+        return entries
+
+    def _save(self) -> None:
+        # it's called in the lock. Expired entries are dropped.
+        assert self._entries is not None
+        expired_time = datetime.now() - self._ttl
+        saved_data = {
+            key: [updated_time.isoformat(), value]
+            for key, (updated_time, value) in self._entries.items()
+            if updated_time > expired_time
+        }
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._path, "w") as f:
+            json.dump(saved_data, f)
+
+
 def get_compute_client(platform: "AzurePlatform") -> ComputeManagementClient:
-    return ComputeManagementClient(
-        credential=platform.credential,
-        subscription_id=platform.subscription_id,
-    )
+    return platform.clients.get(ComputeManagementClient)
 
 
-def get_network_client(platform: "AzurePlatform") -> ComputeManagementClient:
-    return NetworkManagementClient(
-        credential=platform.credential,
-        subscription_id=platform.subscription_id,
-    )
+def get_network_client(platform: "AzurePlatform") -> NetworkManagementClient:
+    return platform.clients.get(NetworkManagementClient)
 
 
-def get_storage_client(
-    credential: DefaultAzureCredential, subscription_id: str
-) -> ComputeManagementClient:
-    return StorageManagementClient(
-        credential=credential,
-        subscription_id=subscription_id,
-    )
+def get_storage_client(platform: "AzurePlatform") -> StorageManagementClient:
+    return platform.clients.get(StorageManagementClient)
 
 
 def get_storage_account_name(subscription_id: str, location: str) -> str:
@@ -176,10 +310,7 @@ def get_storage_account_name(subscription_id: str, location: str) -> str:
 def get_marketplace_ordering_client(
     platform: "AzurePlatform",
 ) -> MarketplaceOrderingAgreements:
-    return MarketplaceOrderingAgreements(
-        credential=platform.credential,
-        subscription_id=platform.subscription_id,
-    )
+    return platform.clients.get(MarketplaceOrderingAgreements)
 
 
 def get_node_context(node: Node) -> NodeContext:
@@ -211,8 +342,7 @@ def get_or_create_storage_container(
 
 
 def check_or_create_storage_account(
-    credential: DefaultAzureCredential,
-    subscription_id: str,
+    platform: "AzurePlatform",
     account_name: str,
     resource_group_name: str,
     location: str,
@@ -223,7 +353,7 @@ def check_or_create_storage_account(
     # is too big, Azure may not able to delete deployment script on time. so there
     # will be error like below
     # Creating the deployment 'name' would exceed the quota of '800'.
-    storage_client = get_storage_client(credential, subscription_id)
+    storage_client = get_storage_client(platform)
     try:
         storage_client.storage_accounts.get_properties(
             account_name=account_name,
@@ -1,9 +1,10 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
-
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, List, Optional
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
 
 import requests
 from assertpy import assert_that
@@ -13,7 +14,7 @@ from lisa.features.gpu import ComputeSDK
 from lisa.node import Node
 from lisa.operating_system import CentOs, Redhat, Suse, Ubuntu
 from lisa.sut_orchestrator.azure.common import AZURE, AzureNodeSchema
-from lisa.util import LisaException
+from lisa.util import LisaException, get_matched_str
 
 if TYPE_CHECKING:
     from .platform_ import AzurePlatform
@@ -25,6 +26,10 @@ from .common import (
     wait_operation,
 )
 
+# the total size in Content-Range header of a response, like "bytes */1024".
+CONTENT_RANGE_SIZE_PATTERN = re.compile(r"/(\d+)$")
+BLOB_CREATION_TIME_HEADER = "x-ms-creation-time"
+
 
 class AzureFeatureMixin:
     def _initialize_information(self, node: Node) -> None:
@@ -63,8 +68,16 @@ class SerialConsole(AzureFeatureMixin, features.SerialConsole):
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
         super()._initialize(*args, **kwargs)
         self._initialize_information(self._node)
+        # the creation time of the log blob, it's changed if the log is recreated.
+        self._log_creation_time = ""
 
     def _get_console_log(self, saved_path: Optional[Path]) -> bytes:
+        _, content = self._get_console_log_from(saved_path=saved_path, offset=0)
+        return content
+
+    def _get_console_log_from(
+        self, saved_path: Optional[Path], offset: int
+    ) -> Tuple[int, bytes]:
         platform: AzurePlatform = self._platform  # type: ignore
         compute_client = get_compute_client(platform)
         diagnostic_data = (
@@ -80,9 +93,35 @@ class SerialConsole(AzureFeatureMixin, features.SerialConsole):
             with open(screenshot_name, mode="wb") as f:
                 f.write(screenshot_response.content)
 
-        log_response = requests.get(diagnostic_data.serial_console_log_blob_uri)
+        log_uri = diagnostic_data.serial_console_log_blob_uri
+        if offset:
+            # download new content only by the range request. The ETag of the blob
+            # is changed on each append, so the creation time is used to detect a
+            # recreated log, which may be longer than the offset.
+            log_response = requests.get(log_uri, headers={"Range": f"bytes={offset}-"})
+            creation_time = log_response.headers.get(BLOB_CREATION_TIME_HEADER, "")
+            if creation_time and creation_time != self._log_creation_time:
+                self._log.debug(
+                    f"serial log is created at {creation_time}, "
+                    f"not {self._log_creation_time}, download it again."
+                )
+            elif log_response.status_code == 206:
+                return offset, log_response.content
+            elif log_response.status_code == 416:
+                # the range is not satisfiable, the header is like "bytes */1024".
+                total_size = get_matched_str(
+                    log_response.headers.get("Content-Range", ""),
+                    CONTENT_RANGE_SIZE_PATTERN,
+                )
+                if total_size and int(total_size) == offset:
+                    return offset, b""
+                # the log is shorter, so it's recreated.
 
-        return log_response.content
+        log_response = requests.get(log_uri)
+        self._log_creation_time = log_response.headers.get(
+            BLOB_CREATION_TIME_HEADER, ""
+        )
+        return 0, log_response.content
 
 
 class Gpu(AzureFeatureMixin, features.Gpu):
@@ -127,15 +166,9 @@ class Sriov(AzureFeatureMixin, features.Sriov):
     def _switch(self, enable: bool) -> None:
         azure_platform: AzurePlatform = self._platform  # type: ignore
         network_client = get_network_client(azure_platform)
-        compute_client = get_compute_client(azure_platform)
-        vm = compute_client.virtual_machines.get(
-            self._resource_group_name, self._node.name
-        )
-        for nic in vm.network_profile.network_interfaces:
-            # get nic name from nic id
-            # /subscriptions/[subid]/resourceGroups/[rgname]/providers
-            # /Microsoft.Network/networkInterfaces/[nicname]
-            nic_name = nic.id.split("/")[-1]
+        nic_names, _ = self._get_nic_names()
+
+        def _update(nic_name: str) -> Any:
             updated_nic = network_client.network_interfaces.get(
                 self._resource_group_name, nic_name
             )
@@ -145,42 +178,74 @@ class Sriov(AzureFeatureMixin, features.Sriov):
                     f"status [{updated_nic.enable_accelerated_networking}] is "
                     f"consistent with set status [{enable}], no need to update."
                 )
-            else:
-                self._log.debug(
-                    f"network interface {nic_name}'s accelerated networking default "
-                    f"status [{updated_nic.enable_accelerated_networking}], "
-                    f"now set its status into [{enable}]."
-                )
-                updated_nic.enable_accelerated_networking = enable
-                network_client.network_interfaces.begin_create_or_update(
-                    self._resource_group_name, updated_nic.name, updated_nic
-                )
-                updated_nic = network_client.network_interfaces.get(
-                    self._resource_group_name, nic_name
-                )
-                assert_that(updated_nic.enable_accelerated_networking).described_as(
-                    f"fail to set network interface {nic_name}'s accelerated "
-                    f"networking into status [{enable}]"
-                ).is_equal_to(enable)
+                return None
+            self._log.debug(
+                f"network interface {nic_name}'s accelerated networking default "
+                f"status [{updated_nic.enable_accelerated_networking}], "
+                f"now set its status into [{enable}]."
+            )
+            updated_nic.enable_accelerated_networking = enable
+            return network_client.network_interfaces.begin_create_or_update(
+                self._resource_group_name, updated_nic.name, updated_nic
+            )
+
+        # start updates of all nics together, and then wait them.
+        with ThreadPoolExecutor(max_workers=len(nic_names)) as pool:
+            futures = [pool.submit(_update, nic_name) for nic_name in nic_names]
+        operations: List[Tuple[str, Any]] = []
+        error: Optional[Exception] = None
+        for nic_name, future in zip(nic_names, futures):
+            try:
+                operation = future.result()
+            except Exception as identifier:
+                error = error or identifier
+                continue
+            if operation:
+                operations.append((nic_name, operation))
+        # wait started updates, even if others fail to start. So nics are not
+        # updated in background, after the error is raised.
+        for nic_name, operation in operations:
+            wait_operation(operation)
+        if error:
+            raise error
+        for nic_name, operation in operations:
+            # the result of operation is the updated nic, so no need to get it.
+            updated_nic = operation.result()
+            assert_that(updated_nic.enable_accelerated_networking).described_as(
+                f"fail to set network interface {nic_name}'s accelerated "
+                f"networking into status [{enable}]"
+            ).is_equal_to(enable)
 
     def enabled(self) -> bool:
         azure_platform: AzurePlatform = self._platform  # type: ignore
         network_client = get_network_client(azure_platform)
+        _, primary_nic_name = self._get_nic_names()
+        if not primary_nic_name:
+            raise LisaException(f"fail to find primary nic for vm {self._node.name}")
+        primary_nic = network_client.network_interfaces.get(
+            self._resource_group_name, primary_nic_name
+        )
+        sriov_enabled: bool = primary_nic.enable_accelerated_networking
+        return sriov_enabled
+
+    def _get_nic_names(self) -> Tuple[List[str], str]:
+        """
+        Return names of all nics and the primary nic. Nics may be added or
+        removed on the vm, so they are loaded in each call.
+        """
+        azure_platform: AzurePlatform = self._platform  # type: ignore
         compute_client = get_compute_client(azure_platform)
-        sriov_enabled: bool = False
         vm = compute_client.virtual_machines.get(
             self._resource_group_name, self._node.name
         )
-        found_primary = False
+        nic_names: List[str] = []
+        primary_nic_name = ""
         for nic in vm.network_profile.network_interfaces:
-            if nic.primary:
-                found_primary = True
-                break
-        if not found_primary:
-            raise LisaException(f"fail to find primary nic for vm {self._node.name}")
-        nic_name = nic.id.split("/")[-1]
-        primary_nic = network_client.network_interfaces.get(
-            self._resource_group_name, nic_name
-        )
-        sriov_enabled = primary_nic.enable_accelerated_networking
-        return sriov_enabled
+            # get nic name from nic id
+            # /subscriptions/[subid]/resourceGroups/[rgname]/providers
+            # /Microsoft.Network/networkInterfaces/[nicname]
+            nic_name = nic.id.split("/")[-1]
+            if nic.primary and not primary_nic_name:
+                primary_nic_name = nic_name
+            nic_names.append(nic_name)
+        return nic_names, primary_nic_name
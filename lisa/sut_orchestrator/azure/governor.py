@@ -0,0 +1,177 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from azure.core.pipeline import PipelineRequest, PipelineResponse
+from azure.core.pipeline.policies import HTTPPolicy
+from azure.core.pipeline.transport import HttpRequest, HttpResponse
+
+from lisa.util.logger import Logger
+
+# status codes, which mean Azure throttles requests.
+THROTTLED_STATUS_CODES = [429, 503]
+# headers of remaining requests, which Azure Resource Manager and resource
+# providers return. If any one is lower than the threshold, requests slow down,
+# before they are throttled.
+REMAINING_HEADER_PATTERN = re.compile(r"^x-ms-ratelimit-remaining-", re.I)
+REMAINING_VALUE_PATTERN = re.compile(r"(?:;|^)\s*(\d+)\s*(?=,|$)")
+REMAINING_THRESHOLD = 20
+# the window is decreased once in the interval, so a burst of throttled
+# responses doesn't drop it to the minimum.
+DECREASE_INTERVAL = 1.0
+
+
+def get_retry_after(response: HttpResponse) -> float:
+    """
+    Return seconds to wait from headers of the response, or 0 if it's not set.
+    """
+    headers = {name.lower(): value for name, value in response.headers.items()}
+    for name in ["retry-after-ms", "x-ms-retry-after-ms"]:
+        value = headers.get(name)
+        if value:
+            try:
+                return max(float(value) / 1000, 0)
+            except ValueError:
+                pass
+    value = headers.get("retry-after")
+    if not value:
+        return 0
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_time = parsedate_to_datetime(value)
+        return max(retry_time.timestamp() - time.time(), 0)
+    except Exception:
+        return 0
+
+
+def get_remaining(response: HttpResponse) -> Optional[int]:
+    """
+    Return the lowest count of remaining requests in throttling headers. For
+    example, "x-ms-ratelimit-remaining-subscription-reads: 11999", or
+    "x-ms-ratelimit-remaining-resource: Microsoft.Compute/GetVM3Min;137".
+    """
+    remaining: Optional[int] = None
+    for name, value in response.headers.items():
+        if not REMAINING_HEADER_PATTERN.match(name):
+            continue
+        for matched in REMAINING_VALUE_PATTERN.findall(value):
+            count = int(matched)
+            if remaining is None or count < remaining:
+                remaining = count
+    return remaining
+
+
+class ConcurrencyGovernor:
+    """
+    Limit concurrent requests to Azure by AIMD (additive increase, multiplicative
+    decrease). Each successful response increases the window by 1/window, and each
+    throttled response halves it, and holds all requests until Retry-After passes.
+    It's shared by all clients of a platform.
+    """
+
+    def __init__(
+        self,
+        log: Logger,
+        max_window: int,
+        min_window: int = 1,
+    ) -> None:
+        self._log = log
+        self._min_window = min_window
+        self._max_window = max_window
+        self._window: float = max_window
+        self._running_count = 0
+        self._paused_until: float = 0
+        self._last_decrease: float = 0
+        self._condition = threading.Condition()
+
+    @property
+    def window(self) -> int:
+        """
+        Current count of concurrent requests, which are allowed.
+        """
+        return int(self._window)
+
+    @property
+    def running_count(self) -> int:
+        return self._running_count
+
+    def acquire(self) -> None:
+        with self._condition:
+            while True:
+                delay = self._paused_until - time.monotonic()
+                if delay <= 0 and self._running_count < int(self._window):
+                    break
+                self._condition.wait(timeout=delay if delay > 0 else None)
+            self._running_count += 1
+
+    def release(self, response: Optional[HttpResponse]) -> None:
+        with self._condition:
+            self._running_count -= 1
+            if response is not None:
+                self._adjust(response)
+            self._condition.notify_all()
+
+    def _adjust(self, response: HttpResponse) -> None:
+        # it's called in the lock.
+        if response.status_code in THROTTLED_STATUS_CODES:
+            retry_after = get_retry_after(response)
+            if retry_after:
+                self._paused_until = max(
+                    self._paused_until, time.monotonic() + retry_after
+                )
+            self._decrease(
+                f"throttled by {response.status_code}, retry after {retry_after}s"
+            )
+            return
+
+        remaining = get_remaining(response)
+        if remaining is not None and remaining < REMAINING_THRESHOLD:
+            self._decrease(f"remaining requests: {remaining}")
+        elif response.status_code < 400 and self._window < self._max_window:
+            self._set_window(self._window + 1 / self._window, "")
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < DECREASE_INTERVAL:
+            return
+        self._last_decrease = now
+        self._set_window(self._window / 2, reason)
+
+    def _set_window(self, window: float, reason: str) -> None:
+        window = min(max(window, self._min_window), self._max_window)
+        if int(window) != int(self._window):
+            message = f"concurrency window: {int(self._window)} -> {int(window)}"
+            if reason:
+                message += f", {reason}"
+            self._log.debug(message)
+        self._window = window
+
+
+class GovernorPolicy(HTTPPolicy[HttpRequest, HttpResponse]):
+    """
+    Pipeline policy of a client, which sends requests through the shared governor.
+    It's after the retry policy, so each retry is governed too.
+    """
+
+    def __init__(self, governor: ConcurrencyGovernor) -> None:
+        super().__init__()
+        self._governor = governor
+
+    def send(
+        self, request: PipelineRequest[HttpRequest]
+    ) -> PipelineResponse[HttpRequest, HttpResponse]:
+        self._governor.acquire()
+        response: Optional[PipelineResponse[HttpRequest, HttpResponse]] = None
+        try:
+            response = self.next.send(request)
+        finally:
+            self._governor.release(response.http_response if response else None)
+        return response
@@ -0,0 +1,167 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from lisa import schema, search_space
+
+# increase it, if the table is changed. The old tables are dropped.
+_SCHEMA_VERSION = 1
+
+
+class LocationSku(NamedTuple):
+    vm_size: str
+    capability: schema.NodeSpace
+    estimated_cost: int
+    resource_sku: Optional[Dict[str, Any]] = None
+
+
+def _encode_count_space(space: search_space.CountSpace) -> Any:
+    # numbers are saved as they are, so they can be queried in SQL.
+    if space is None or isinstance(space, int):
+        return space
+    if isinstance(space, search_space.IntRange):
+        return json.dumps(space.to_dict())  # type: ignore
+    return json.dumps([x.to_dict() for x in space])  # type: ignore
+
+
+def _decode_count_space(value: Any) -> search_space.CountSpace:
+    if value is None or isinstance(value, int):
+        return value
+    # decode by search space, so the same ranges are shared by capabilities.
+    decoded: search_space.CountSpace = search_space.decode_count_space(
+        json.loads(value)
+    )
+    return decoded
+
+
+class LocationStore:
+    """
+    Azure vm sizes of all locations in one SQLite file. Capabilities are saved as
+    columns, so they are created without decoding json, and raw skus are read only
+    when they are needed.
+
+    Skus are not filtered by requirements in SQL. The platform loads all skus of a
+    location once, since they are ordered by fallback patterns and reused by all
+    environments, and CapabilityTable filters them by count columns in memory.
+    """
+
+    _count_names = [
+        "node_count",
+        "core_count",
+        "memory_mb",
+        "disk_count",
+        "nic_count",
+        "gpu_count",
+    ]
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._is_created = False
+        self._lock = threading.Lock()
+
+    def get_updated_time(self, location: str) -> Optional[datetime]:
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "select updated_time from locations where location=?", (location,)
+            ).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def load(self, location: str) -> List[LocationSku]:
+        count_columns = ",".join(self._count_names)
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                f"select vm_size, name, {count_columns}, features, estimated_cost "
+                f"from skus where location=? order by rowid",
+                (location,),
+            ).fetchall()
+
+        skus: List[LocationSku] = []
+        for row in rows:
+            vm_size, name, *counts, features, estimated_cost = row
+            node_space = schema.NodeSpace(
+                features=search_space.SetSpace[str](
+                    is_allow_set=True, items=json.loads(features)
+                ),
+                excluded_features=None,
+            )
+            node_space.name = name
+            for count_name, count_value in zip(self._count_names, counts):
+                setattr(node_space, count_name, _decode_count_space(count_value))
+            skus.append(LocationSku(vm_size, node_space, estimated_cost))
+        return skus
+
+    def save(
+        self, location: str, updated_time: datetime, skus: Iterable[LocationSku]
+    ) -> None:
+        rows: List[List[Any]] = []
+        for sku in skus:
+            capability = sku.capability
+            row: List[Any] = [location, sku.vm_size, capability.name]
+            row.extend(
+                _encode_count_space(getattr(capability, x)) for x in self._count_names
+            )
+            row.append(json.dumps(list(capability.features or [])))
+            row.append(sku.estimated_cost)
+            row.append(json.dumps(sku.resource_sku))
+            rows.append(row)
+
+        count_columns = ",".join(self._count_names)
+        placeholders = ",".join("?" * (len(self._count_names) + 6))
+        with closing(self._connect()) as connection:
+            with connection:
+                connection.execute("delete from skus where location=?", (location,))
+                connection.executemany(
+                    f"insert into skus (location, vm_size, name, {count_columns}, "
+                    f"features, estimated_cost, resource_sku) "
+                    f"values ({placeholders})",
+                    rows,
+                )
+                connection.execute(
+                    "insert or replace into locations values (?, ?)",
+                    (location, updated_time.isoformat()),
+                )
+
+    def get_resource_sku(self, location: str, vm_size: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "select resource_sku from skus where location=? and vm_size=?",
+                (location, vm_size),
+            ).fetchone()
+        resource_sku: Optional[Dict[str, Any]] = json.loads(row[0]) if row else None
+        return resource_sku
+
+    def _connect(self) -> sqlite3.Connection:
+        # connect on each call, so it can be used by threads.
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self._path), timeout=60)
+        with self._lock:
+            if not self._is_created:
+                self._create_tables(connection)
+                self._is_created = True
+        return connection
+
+    def _create_tables(self, connection: sqlite3.Connection) -> None:
+        with connection:
+            version = connection.execute("pragma user_version").fetchone()[0]
+            if version != _SCHEMA_VERSION:
+                connection.execute("drop table if exists locations")
+                connection.execute("drop table if exists skus")
+            count_columns = ",".join(self._count_names)
+            connection.execute(
+                "create table if not exists locations "
+                "(location text primary key, updated_time text)"
+            )
+            connection.execute(
+                f"create table if not exists skus (location text, vm_size text, "
+                f"name text, {count_columns}, features text, "
+                f"estimated_cost integer, resource_sku text, "
+                f"primary key (location, vm_size))"
+            )
+            connection.execute(f"pragma user_version={_SCHEMA_VERSION}")
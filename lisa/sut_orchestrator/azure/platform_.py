@@ -2,17 +2,20 @@
 # Licensed under the MIT license.
 
 import copy
+import hashlib
 import json
 import logging
 import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from datetime import datetime
-from functools import lru_cache
+from datetime import datetime, timedelta
+from functools import lru_cache, partial
 from logging import getLogger
 from pathlib import Path
 from types import SimpleNamespace
-from typing import Any, Dict, List, Optional, Tuple, Type, Union
+from typing import Any, Dict, List, Optional, Set, Tuple, Type, Union
 
 from azure.core.exceptions import HttpResponseError
 from azure.identity import DefaultAzureCredential
@@ -56,12 +59,15 @@ from lisa.util import (
 from lisa.util.logger import Logger
 
 from . import features
+from .capability_table import CapabilityTable
 from .common import (
     AZURE,
     AZURE_SHARED_RG_NAME,
+    AzureClients,
     AzureNodeSchema,
     AzureVmMarketplaceSchema,
     AzureVmPurchasePlanSchema,
+    ResolutionCache,
     check_or_create_storage_account,
     get_compute_client,
     get_environment_context,
@@ -71,6 +77,8 @@ from .common import (
     get_storage_account_name,
     wait_operation,
 )
+from .location_store import LocationSku, LocationStore
+from .quota import TOTAL_CORES_NAME, QuotaAdmission
 
 # used by azure
 AZURE_DEPLOYMENT_NAME = "lisa_default_deployment_script"
@@ -99,6 +107,17 @@ LOCATIONS = [
     "uksouth",
 ]
 RESOURCE_GROUP_LOCATION = "westus2"
+# cached vm sizes of locations are refreshed every 5 days.
+LOCATION_CACHE_DAYS = 5
+# validated templates are not validated again in hours, if they have the same
+# template and parameters.
+TEMPLATE_VALIDATION_CACHE_HOURS = 24
+# resolved versions and purchase plans of marketplace images.
+MARKETPLACE_IMAGE_CACHE_HOURS = 6
+# the parameters are different in each deployment, but they don't impact results of
+# validation. Secrets are replaced by whether they are set, so they aren't saved.
+VALIDATION_IGNORED_PARAMETERS = ["resource_group_name"]
+VALIDATION_SECRET_PARAMETERS = ["admin_username", "admin_password", "admin_key_data"]
 
 # names in arm template, they should be changed with template together.
 RESOURCE_ID_PORT_POSTFIX = "-ssh"
@@ -139,7 +158,9 @@ class AzureCapability:
     vm_size: str
     capability: schema.NodeSpace
     estimated_cost: int
-    resource_sku: Dict[str, Any]
+    # The raw data is much larger than others, so it's not loaded from cache. Use
+    # AzurePlatform._get_resource_sku to get it, when it's needed.
+    resource_sku: Optional[Dict[str, Any]] = None
 
 
 @dataclass_json()
@@ -232,6 +253,9 @@ class AzurePlatformSchema:
     deploy: bool = True
     # wait resource deleted or not
     wait_delete: bool = False
+    # use expired vm sizes of locations directly, and refresh them in background.
+    # The refreshed data is used by later preparations.
+    refresh_locations_in_background: bool = False
 
     def __post_init__(self, *args: Any, **kwargs: Any) -> None:
         if self.service_principal_tenant_id:
@@ -257,7 +281,19 @@ class AzurePlatform(Platform):
         super().__init__(runbook=runbook)
         self._environment_counter = 0
         self._eligible_capabilities: Dict[str, List[AzureCapability]] = dict()
+        self._capability_tables: Dict[str, CapabilityTable] = dict()
         self._locations_data_cache: Dict[str, AzureLocation] = dict()
+        self._location_store: Optional[LocationStore] = None
+        # protect locations, which are refreshing or refreshed in background.
+        self._location_lock = threading.Lock()
+        self._refreshing_locations: Set[str] = set()
+        self._refreshed_locations: Dict[str, AzureLocation] = dict()
+        # hashes of validated templates, and the validated time.
+        self._validation_lock = threading.Lock()
+        self._validated_templates: Optional[Dict[str, datetime]] = None
+        self._quota_admission = QuotaAdmission(self._load_usages)
+        self._marketplace_image_cache: Optional[ResolutionCache] = None
+        self._marketplace_image_lock = threading.Lock()
 
     @classmethod
     def type_name(cls) -> str:
@@ -292,6 +328,9 @@ class AzurePlatform(Platform):
 
         is_success: bool = True
 
+        # swap in locations, which are refreshed in background.
+        self._apply_refreshed_locations(log)
+
         if environment.runbook.nodes_requirement:
             is_success = False
             nodes_requirement = environment.runbook.nodes_requirement
@@ -325,6 +364,7 @@ class AzurePlatform(Platform):
                 locations = [existing_location]
             else:
                 locations = LOCATIONS
+            self._load_location_infos(locations, log)
 
             # check eligible locations
             found_or_skipped = False
@@ -389,40 +429,42 @@ class AzurePlatform(Platform):
 
                 estimated_cost: int = 0
                 location_caps = self._get_eligible_vm_sizes(location_name, log)
+                capability_table = self._get_capability_table(location_name, log)
                 for req_index, req in enumerate(nodes_requirement):
-                    for azure_cap in location_caps:
-                        if found_capabilities[req_index]:
-                            # found, so skipped
-                            break
+                    if found_capabilities[req_index]:
+                        # found, so skipped
+                        continue
+                    # the table filters vm sizes by numbers and features firstly,
+                    # and returns matched ones by order of eligible vm sizes.
+                    for cap_index in capability_table.search(req):
+                        azure_cap = location_caps[cap_index]
+                        min_cap = req.generate_min_capability(azure_cap.capability)
+
+                        # apply azure specified values
+                        # they will pass into arm template
+                        node_runbook = min_cap.get_extended_runbook(
+                            AzureNodeSchema, AZURE
+                        )
+                        if node_runbook.location:
+                            assert node_runbook.location == azure_cap.location, (
+                                f"predefined location [{node_runbook.location}] "
+                                f"must be same as "
+                                f"cap location [{azure_cap.location}]"
+                            )
 
-                        check_result = req.check(azure_cap.capability)
-                        if check_result.result:
-                            min_cap = req.generate_min_capability(azure_cap.capability)
+                        # will pass into arm template
+                        node_runbook.location = azure_cap.location
+                        if not node_runbook.vm_size:
+                            node_runbook.vm_size = azure_cap.vm_size
+                        assert isinstance(
+                            min_cap.nic_count, int
+                        ), f"actual: {min_cap.nic_count}"
+                        node_runbook.nic_count = min_cap.nic_count
 
-                            # apply azure specified values
-                            # they will pass into arm template
-                            node_runbook = min_cap.get_extended_runbook(
-                                AzureNodeSchema, AZURE
-                            )
-                            if node_runbook.location:
-                                assert node_runbook.location == azure_cap.location, (
-                                    f"predefined location [{node_runbook.location}] "
-                                    f"must be same as "
-                                    f"cap location [{azure_cap.location}]"
-                                )
-
-                            # will pass into arm template
-                            node_runbook.location = azure_cap.location
-                            if not node_runbook.vm_size:
-                                node_runbook.vm_size = azure_cap.vm_size
-                            assert isinstance(
-                                min_cap.nic_count, int
-                            ), f"actual: {min_cap.nic_count}"
-                            node_runbook.nic_count = min_cap.nic_count
-
-                            estimated_cost += azure_cap.estimated_cost
-
-                            found_capabilities[req_index] = min_cap
+                        estimated_cost += azure_cap.estimated_cost
+
+                        found_capabilities[req_index] = min_cap
+                        break
                     if all(x for x in found_capabilities):
                         break
 
@@ -443,6 +485,11 @@ class AzurePlatform(Platform):
         assert self._rm_client
         assert self._azure_runbook
 
+        if self._azure_runbook.deploy and not self._azure_runbook.dry_run:
+            # wait for quota, instead of failing on deployment. Nothing is created
+            # before it, so the environment can be deployed again later.
+            self._reserve_quota(environment, log)
+
         environment_context = get_environment_context(environment=environment)
         if self._azure_runbook.resource_group_name:
             resource_group_name = self._azure_runbook.resource_group_name
@@ -473,12 +520,13 @@ class AzurePlatform(Platform):
                     resource_group_name, environment, log
                 )
 
+                node_addresses: Dict[str, Tuple[str, str]] = dict()
                 if self._azure_runbook.deploy:
                     self._validate_template(deployment_parameters, log)
-                    self._deploy(location, deployment_parameters, log)
+                    node_addresses = self._deploy(location, deployment_parameters, log)
 
                 # Even skipped deploy, try best to initialize nodes
-                self._initialize_nodes(environment, log)
+                self._initialize_nodes(environment, node_addresses, log)
             except Exception as identifier:
                 self._delete_environment(environment, log)
                 raise identifier
@@ -491,6 +539,7 @@ class AzurePlatform(Platform):
         if not resource_group_name:
             return
         assert self._azure_runbook
+        self._quota_admission.release(environment.name)
 
         if not environment_context.resource_group_is_created:
             log.info(
@@ -666,9 +715,9 @@ class AzurePlatform(Platform):
             os.environ["AZURE_CLIENT_SECRET"] = azure_runbook.service_principal_key
 
         self.credential = DefaultAzureCredential()
-        self._sub_client = SubscriptionClient(self.credential)
-
         self.subscription_id = azure_runbook.subscription_id
+        self.clients = AzureClients(self.credential, self.subscription_id)
+        self._sub_client = self.clients.get(SubscriptionClient)
 
         # suppress warning message by search for different credential types
         azure_identity_logger = getLogger("azure.identity")
@@ -683,9 +732,7 @@ class AzurePlatform(Platform):
             )
         self._log.info(f"connected to subscription: '{subscription.display_name}'")
 
-        self._rm_client = ResourceManagementClient(
-            credential=self.credential, subscription_id=self.subscription_id
-        )
+        self._rm_client = self.clients.get(ResourceManagementClient)
 
     @lru_cache
     def _load_template(self) -> Any:
@@ -703,6 +750,8 @@ class AzurePlatform(Platform):
             try:
                 with open(cached_file_name, "r") as f:
                     loaded_data: Dict[str, Any] = json.load(f)
+                for capability in loaded_data.get("capabilities", []):
+                    capability["capability"].pop("excluded_features", None)
                 loaded_obj = AzureLocation.schema().load(  # type:ignore
                     loaded_data
                 )
@@ -716,21 +765,70 @@ class AzurePlatform(Platform):
                 raise identifier
         return loaded_obj
 
-    def _get_location_info(self, location: str, log: Logger) -> AzureLocation:
-        cached_file_name = constants.CACHE_PATH.joinpath(
-            f"azure_locations_{location}.json"
+    def _get_location_store(self) -> LocationStore:
+        with self._location_lock:
+            if not self._location_store:
+                self._location_store = LocationStore(
+                    constants.CACHE_PATH.joinpath("azure_locations.db")
+                )
+            return self._location_store
+
+    def _load_location_info_from_store(
+        self, location: str, log: Logger
+    ) -> Optional[AzureLocation]:
+        location_data: Optional[AzureLocation] = None
+        location_store = self._get_location_store()
+        updated_time = location_store.get_updated_time(location)
+        if updated_time is None:
+            # migrate from the json cache of previous versions.
+            location_data = self._load_location_info_from_file(
+                cached_file_name=constants.CACHE_PATH.joinpath(
+                    f"azure_locations_{location}.json"
+                ),
+                log=log,
+            )
+            if location_data:
+                self._save_location_info(location_data)
+            return location_data
+
+        location_data = AzureLocation(updated_time=updated_time, location=location)
+        for sku in location_store.load(location):
+            location_data.capabilities.append(
+                AzureCapability(
+                    location=location,
+                    vm_size=sku.vm_size,
+                    capability=sku.capability,
+                    estimated_cost=sku.estimated_cost,
+                )
+            )
+        return location_data
+
+    def _save_location_info(self, location_data: AzureLocation) -> None:
+        self._get_location_store().save(
+            location=location_data.location,
+            updated_time=location_data.updated_time,
+            skus=[
+                LocationSku(
+                    vm_size=x.vm_size,
+                    capability=x.capability,
+                    estimated_cost=x.estimated_cost,
+                    resource_sku=x.resource_sku,
+                )
+                for x in location_data.capabilities
+            ],
         )
+        # raw skus are saved, release them from memory.
+        for azure_capability in location_data.capabilities:
+            azure_capability.resource_sku = None
+
+    def _get_location_info(self, location: str, log: Logger) -> AzureLocation:
         should_refresh: bool = True
         location_data = self._locations_data_cache.get(location, None)
         if not location_data:
-            location_data = self._load_location_info_from_file(
-                cached_file_name=cached_file_name, log=log
-            )
+            location_data = self._load_location_info_from_store(location, log)
 
         if location_data:
-            delta = datetime.now() - location_data.updated_time
-            # refresh cached locations every 5 days.
-            if delta.days < 5:
+            if not self._is_location_info_expired(location_data):
                 should_refresh = False
                 log.debug(
                     f"{location}: cache used: {location_data.updated_time}, "
@@ -741,62 +839,142 @@ class AzurePlatform(Platform):
                     f"{location}: cache timeout: {location_data.updated_time},"
                     f"sku count: {len(location_data.capabilities)}"
                 )
+                if self._azure_runbook.refresh_locations_in_background:
+                    self._refresh_location_in_background(location, log)
+                    should_refresh = False
         else:
             log.debug(f"{location}: no cache found")
         if should_refresh:
-            compute_client = get_compute_client(self)
-
-            log.debug(f"{location}: querying")
-            all_skus: List[AzureCapability] = []
-            paged_skus = compute_client.resource_skus.list(
-                f"location eq '{location}'"
-            ).by_page()
-            for skus in paged_skus:
-                for sku_obj in skus:
-                    try:
-                        if sku_obj.resource_type == "virtualMachines":
-                            if sku_obj.restrictions and any(
-                                restriction.type == "Location"
-                                for restriction in sku_obj.restrictions
-                            ):
-                                # restricted on this location
-                                continue
-                            resource_sku = sku_obj.as_dict()
-                            capability = self._resource_sku_to_capability(
-                                location, sku_obj
-                            )
-
-                            # estimate vm cost for priority
-                            assert isinstance(capability.core_count, int)
-                            assert isinstance(capability.gpu_count, int)
-                            estimated_cost = (
-                                capability.core_count + capability.gpu_count * 100
-                            )
-                            azure_capability = AzureCapability(
-                                location=location,
-                                vm_size=sku_obj.name,
-                                capability=capability,
-                                resource_sku=resource_sku,
-                                estimated_cost=estimated_cost,
-                            )
-                            all_skus.append(azure_capability)
-                    except Exception as identifier:
-                        log.error(f"unknown sku: {sku_obj}")
-                        raise identifier
-            location_data = AzureLocation(location=location, capabilities=all_skus)
-            self._locations_data_cache[location_data.location] = location_data
-            log.debug(f"{location}: saving to disk")
-            with open(cached_file_name, "w") as f:
-                json.dump(location_data.to_dict(), f)  # type: ignore
-            log.debug(
-                f"{location_data.location}: new data, "
-                f"sku: {len(location_data.capabilities)}"
-            )
+            location_data = self._query_location_info(location, log)
 
         assert location_data
         self._locations_data_cache[location] = location_data
         return location_data
 
+    def _is_location_info_expired(self, location_data: AzureLocation) -> bool:
+        delta = datetime.now() - location_data.updated_time
+        return delta.days >= LOCATION_CACHE_DAYS
+
+    def _query_location_info(self, location: str, log: Logger) -> AzureLocation:
+        compute_client = get_compute_client(self)
+
+        log.debug(f"{location}: querying")
+        all_skus: List[AzureCapability] = []
+        paged_skus = compute_client.resource_skus.list(
+            f"location eq '{location}'"
+        ).by_page()
+        for skus in paged_skus:
+            for sku_obj in skus:
+                try:
+                    if sku_obj.resource_type == "virtualMachines":
+                        if sku_obj.restrictions and any(
+                            restriction.type == "Location"
+                            for restriction in sku_obj.restrictions
+                        ):
+                            # restricted on this location
+                            continue
+                        resource_sku = sku_obj.as_dict()
+                        capability = self._resource_sku_to_capability(location, sku_obj)
+
+                        # estimate vm cost for priority
+                        assert isinstance(capability.core_count, int)
+                        assert isinstance(capability.gpu_count, int)
+                        estimated_cost = (
+                            capability.core_count + capability.gpu_count * 100
+                        )
+                        azure_capability = AzureCapability(
+                            location=location,
+                            vm_size=sku_obj.name,
+                            capability=capability,
+                            resource_sku=resource_sku,
+                            estimated_cost=estimated_cost,
+                        )
+                        all_skus.append(azure_capability)
+                except Exception as identifier:
+                    log.error(f"unknown sku: {sku_obj}")
+                    raise identifier
+        location_data = AzureLocation(location=location, capabilities=all_skus)
+        log.debug(f"{location}: saving to disk")
+        self._save_location_info(location_data)
+        log.debug(
+            f"{location_data.location}: new data, "
+            f"sku: {len(location_data.capabilities)}"
+        )
+        return location_data
+
+    def _load_location_infos(self, locations: List[str], log: Logger) -> None:
+        """
+        Load locations concurrently, so expired locations are refreshed together,
+        instead of one by one on checking.
+        """
+        locations = [
+            x
+            for x in locations
+            if x not in self._locations_data_cache
+            or self._is_location_info_expired(self._locations_data_cache[x])
+        ]
+        if len(locations) <= 1:
+            return
+
+        def _load(location: str) -> None:
+            try:
+                self._get_location_info(location, log)
+            except Exception as identifier:
+                # the error is raised again, when the location is checked.
+                log.debug(f"{location}: error on loading: {identifier}")
+
+        with ThreadPoolExecutor(max_workers=len(locations)) as pool:
+            list(pool.map(_load, locations))
+
+    def _refresh_location_in_background(self, location: str, log: Logger) -> None:
+        with self._location_lock:
+            if location in self._refreshing_locations:
+                return
+            self._refreshing_locations.add(location)
+        log.debug(f"{location}: refreshing in background")
+        thread = threading.Thread(
+            target=self._refresh_location,
+            args=(location, log),
+            name=f"azure_location_{location}",
+            daemon=True,
+        )
+        thread.start()
+
+    def _refresh_location(self, location: str, log: Logger) -> None:
+        try:
+            location_data = self._query_location_info(location, log)
+        except Exception as identifier:
+            log.info(f"{location}: error on refreshing in background: {identifier}")
+            with self._location_lock:
+                self._refreshing_locations.discard(location)
+            return
+        with self._location_lock:
+            self._refreshed_locations[location] = location_data
+
+    def _apply_refreshed_locations(self, log: Logger) -> None:
+        """
+        The refreshed locations are swapped in between preparations, so eligible
+        vm sizes and capability tables of a location are always consistent.
+        """
+        with self._location_lock:
+            refreshed_locations = self._refreshed_locations
+            self._refreshed_locations = dict()
+            for location, location_data in refreshed_locations.items():
+                log.debug(f"{location}: use data refreshed in background")
+                self._locations_data_cache[location] = location_data
+                self._eligible_capabilities.pop(location, None)
+                self._capability_tables.pop(location, None)
+                self._refreshing_locations.discard(location)
+
+    def _get_resource_sku(
+        self, location: str, vm_size: str, log: Logger
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Read the raw resource sku from the location cache.
+        """
+        self._get_location_info(location, log)
+        return self._get_location_store().get_resource_sku(location, vm_size)
+
     def _create_deployment_parameters(
         self, resource_group_name: str, environment: Environment, log: Logger
     ) -> Tuple[str, Dict[str, Any]]:
@@ -923,6 +1101,11 @@ class AzurePlatform(Platform):
     def _validate_template(
         self, deployment_parameters: Dict[str, Any], log: Logger
     ) -> None:
+        validation_key = self._get_validation_key(deployment_parameters)
+        if self._is_template_validated(validation_key):
+            log.debug("skipped validating deployment, it's validated recently")
+            return
+
         log.debug("validating deployment")
 
         validate_operation: Any = None
@@ -944,15 +1127,146 @@ class AzurePlatform(Platform):
             raise LisaException("\n".join(error_messages))
 
         assert result is None, f"validate error: {result}"
+        self._save_validated_template(validation_key)
+
+    def _load_usages(self, location: str) -> Dict[str, Tuple[int, int]]:
+        """
+        Return the current value and limit of quotas in the location. The name is
+        total cores, or vm families like standardDSv2Family.
+        """
+        usages: Dict[str, Tuple[int, int]] = dict()
+        try:
+            compute_client = get_compute_client(self)
+            for usage in compute_client.usage.list(location):
+                usages[usage.name.value] = (usage.current_value, usage.limit)
+        except Exception as identifier:
+            # deployments are not admitted by quota, if usages cannot be loaded.
+            self._log.debug(f"{location}: error on loading usages: {identifier}")
+        return usages
+
+    def _reserve_quota(self, environment: Environment, log: Logger) -> None:
+        """
+        Reserve vCPUs of nodes by total cores and vm families. All nodes are in the
+        same location, which is decided on preparing.
+        """
+        assert environment.runbook.nodes_requirement
+        location = ""
+        demands: Dict[str, int] = dict()
+        for node_space in environment.runbook.nodes_requirement:
+            node_runbook = node_space.get_extended_runbook(AzureNodeSchema, AZURE)
+            location = node_runbook.location
+            core_count = self._get_core_count(location, node_runbook.vm_size, log)
+            if not core_count:
+                continue
+            demands[TOTAL_CORES_NAME] = demands.get(TOTAL_CORES_NAME, 0) + core_count
+            resource_sku = self._get_resource_sku(location, node_runbook.vm_size, log)
+            family = resource_sku.get("family") if resource_sku else None
+            if family:
+                demands[family] = demands.get(family, 0) + core_count
+        if location:
+            log.debug(f"reserving quota in {location}: {demands}")
+            self._quota_admission.reserve(environment.name, location, demands)
+
+    def _get_core_count(self, location: str, vm_size: str, log: Logger) -> int:
+        location_info = self._get_location_info(location, log)
+        for azure_capability in location_info.capabilities:
+            if azure_capability.vm_size == vm_size:
+                core_count = azure_capability.capability.core_count
+                if isinstance(core_count, int):
+                    return core_count
+        return 0
+
+    def _get_validation_key(self, deployment_parameters: Dict[str, Any]) -> str:
+        """
+        Hash the template and parameters, names and secrets are excluded, so
+        deployments in same shape have the same key.
+        """
+        properties = deployment_parameters["parameters"].properties
+        parameters: Dict[str, Any] = copy.deepcopy(properties.parameters)
+        for name in VALIDATION_IGNORED_PARAMETERS:
+            parameters.pop(name, None)
+        for name in VALIDATION_SECRET_PARAMETERS:
+            value = parameters.get(name, {}).get("value")
+            parameters[name] = {"value": bool(value)}
+        for node in parameters.get("nodes", {}).get("value", []):
+            node.pop("name", None)
+
+        content = json.dumps(
+            {
+                "subscription_id": self.subscription_id,
+                "template": properties.template,
+                "parameters": parameters,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _get_validated_templates_path(self) -> Path:
+        return constants.CACHE_PATH.joinpath("azure_validated_templates.json")
+
+    def _load_validated_templates(self) -> Dict[str, datetime]:
+        # it's called in the lock.
+        if self._validated_templates is None:
+            self._validated_templates = dict()
+            cached_file_name = self._get_validated_templates_path()
+            if cached_file_name.exists():
+                try:
+                    with open(cached_file_name, "r") as f:
+                        loaded_data: Dict[str, str] = json.load(f)
+                    self._validated_templates = {
+                        key: datetime.fromisoformat(value)
+                        for key, value in loaded_data.items()
+                    }
+                except Exception as identifier:
+                    self._log.debug(
+                        f"error on loading validated templates: {identifier}"
+                    )
+        return self._validated_templates
+
+    def _is_template_validated(self, validation_key: str) -> bool:
+        with self._validation_lock:
+            validated_time = self._load_validated_templates().get(validation_key)
+        if not validated_time:
+            return False
+        delta = datetime.now() - validated_time
+        return delta < timedelta(hours=TEMPLATE_VALIDATION_CACHE_HOURS)
+
+    def _save_validated_template(self, validation_key: str) -> None:
+        with self._validation_lock:
+            validated_templates = self._load_validated_templates()
+            validated_templates[validation_key] = datetime.now()
+            # drop expired ones, so the file doesn't grow.
+            expired_time = datetime.now() - timedelta(
+                hours=TEMPLATE_VALIDATION_CACHE_HOURS
+            )
+            for key in [
+                key
+                for key, value in validated_templates.items()
+                if value < expired_time
+            ]:
+                del validated_templates[key]
+            cached_file_name = self._get_validated_templates_path()
+            cached_file_name.parent.mkdir(parents=True, exist_ok=True)
+            with open(cached_file_name, "w") as f:
+                json.dump(
+                    {
+                        key: value.isoformat()
+                        for key, value in validated_templates.items()
+                    },
+                    f,
+                )
 
     def _deploy(
         self, location: str, deployment_parameters: Dict[str, Any], log: Logger
-    ) -> None:
+    ) -> Dict[str, Tuple[str, str]]:
+        """
+        Return private and public addresses of nodes from outputs of the
+        deployment. It's empty, if the deployment failed with ignorable errors.
+        """
         resource_group_name = deployment_parameters[AZURE_RG_NAME_KEY]
         storage_account_name = get_storage_account_name(self.subscription_id, location)
         check_or_create_storage_account(
-            self.credential,
-            self.subscription_id,
+            self,
             storage_account_name,
             AZURE_SHARED_RG_NAME,
             location,
@@ -962,6 +1276,7 @@ class AzurePlatform(Platform):
         log.info(f"resource group '{resource_group_name}' deployment is in progress...")
         deployment_operation: Any = None
         deployments = self._rm_client.deployments
+        node_addresses: Dict[str, Tuple[str, str]] = dict()
         try:
             deployment_operation = deployments.begin_create_or_update(
                 **deployment_parameters
@@ -969,6 +1284,7 @@ class AzurePlatform(Platform):
             result = wait_operation(deployment_operation)
             if result:
                 raise LisaException(f"deploy failed: {result}")
+            node_addresses = self._get_node_addresses(deployment_operation.result())
         except HttpResponseError as identifier:
             # Some errors happens underlying, so there is no detail errors from API.
             # For example,
@@ -1002,6 +1318,59 @@ class AzurePlatform(Platform):
             else:
                 plugin_manager.hook.azure_deploy_failed(error_message=error_message)
                 raise LisaException(error_message)
+        return node_addresses
+
+    def _get_node_addresses(self, deployment: Any) -> Dict[str, Tuple[str, str]]:
+        """
+        Parse outputs of the arm template, the key is vm name, and the value is
+        private and public IP addresses.
+        """
+        node_addresses: Dict[str, Tuple[str, str]] = dict()
+        outputs = deployment.properties.outputs if deployment.properties else None
+        if outputs and "nodes" in outputs:
+            for node_output in outputs["nodes"]["value"]:
+                node_addresses[node_output["name"]] = (
+                    node_output["private_ip_address"],
+                    node_output["public_ip_address"],
+                )
+        return node_addresses
+
+    def _load_node_addresses(
+        self, environment: Environment, log: Logger
+    ) -> Dict[str, Tuple[str, str]]:
+        """
+        Load addresses of nodes, when they are not returned by deploying. Read
+        outputs of the existing deployment firstly, and list network resources, if
+        the deployment has no outputs. For example, it's failed by provisioning
+        timeout, or it's deployed by an old template.
+        """
+        environment_context = get_environment_context(environment=environment)
+        resource_group_name = environment_context.resource_group_name
+        node_addresses: Dict[str, Tuple[str, str]] = dict()
+        try:
+            deployment = self._rm_client.deployments.get(
+                resource_group_name, AZURE_DEPLOYMENT_NAME
+            )
+            node_addresses = self._get_node_addresses(deployment)
+        except Exception as identifier:
+            log.debug(f"error on getting outputs of deployment: {identifier}")
+        if node_addresses:
+            return node_addresses
+
+        vms_map: Dict[str, VirtualMachine] = self._load_vms(environment, log)
+        nics_map: Dict[str, NetworkInterface] = self._load_nics(environment, log)
+        public_ips_map: Dict[str, PublicIPAddress] = self._load_public_ips(
+            environment, log
+        )
+        for vm_name in vms_map:
+            nic = nics_map.get(vm_name)
+            public_ip = public_ips_map.get(vm_name)
+            if nic and public_ip:
+                node_addresses[vm_name] = (
+                    nic.ip_configurations[0].private_ip_address,
+                    public_ip.ip_address,
+                )
+        return node_addresses
 
     def _parse_detail_errors(self, error: Any) -> List[str]:
         # original message may be a summary, get lowest level details.
@@ -1123,32 +1492,29 @@ class AzurePlatform(Platform):
             )
         return public_ips_map
 
-    def _initialize_nodes(self, environment: Environment, log: Logger) -> None:
+    def _initialize_nodes(
+        self,
+        environment: Environment,
+        node_addresses: Dict[str, Tuple[str, str]],
+        log: Logger,
+    ) -> None:
         node_context_map: Dict[str, Node] = dict()
         for node in environment.nodes.list():
             node_context = get_node_context(node)
             node_context_map[node_context.vm_name] = node
 
-        vms_map: Dict[str, VirtualMachine] = self._load_vms(environment, log)
-        nics_map: Dict[str, NetworkInterface] = self._load_nics(environment, log)
-        public_ips_map: Dict[str, PublicIPAddress] = self._load_public_ips(
-            environment, log
-        )
+        if any(x not in node_addresses for x in node_context_map):
+            node_addresses = self._load_node_addresses(environment, log)
 
         for vm_name, node in node_context_map.items():
             node_context = get_node_context(node)
-            vm = vms_map.get(vm_name, None)
-            if not vm:
+            if vm_name not in node_addresses:
                 raise LisaException(
                     f"cannot find vm: '{vm_name}', make sure deployment is correct."
                 )
-            nic = nics_map[vm_name]
-            public_ip = public_ips_map[vm_name]
-            assert (
-                public_ip.ip_address
-            ), f"public IP address cannot be empty, public_ip object: {public_ip}"
+            address, public_address = node_addresses[vm_name]
+            assert public_address, f"public IP address of '{vm_name}' cannot be empty"
 
-            address = nic.ip_configurations[0].private_ip_address
             if not node.name:
                 node.name = vm_name
 
@@ -1156,7 +1522,7 @@ class AzurePlatform(Platform):
             node.set_connection_info(
                 address=address,
                 port=22,
-                public_address=public_ip.ip_address,
+                public_address=public_address,
                 public_port=22,
                 username=node_context.username,
                 password=node_context.password,
@@ -1175,7 +1541,9 @@ class AzurePlatform(Platform):
             nic_count=0,
             gpu_count=0,
             features=search_space.SetSpace[str](is_allow_set=True),
-            excluded_features=search_space.SetSpace[str](is_allow_set=False),
+            # excluded features are ignored in capability, leave it None to save
+            # memory of thousands of vm sizes.
+            excluded_features=None,
         )
         node_space.name = f"{location}_{resource_sku.name}"
         node_space.features = search_space.SetSpace[str](is_allow_set=True)
@@ -1245,23 +1613,52 @@ class AzurePlatform(Platform):
             self._eligible_capabilities[location] = location_capabilities
         return self._eligible_capabilities[location]
 
+    def _get_capability_table(self, location: str, log: Logger) -> CapabilityTable:
+        capability_table = self._capability_tables.get(location)
+        if capability_table is None:
+            location_capabilities = self._get_eligible_vm_sizes(location, log)
+            capability_table = CapabilityTable(
+                [x.capability for x in location_capabilities]
+            )
+            self._capability_tables[location] = capability_table
+        return capability_table
+
+    def _get_marketplace_image_cache(self) -> ResolutionCache:
+        with self._marketplace_image_lock:
+            if not self._marketplace_image_cache:
+                self._marketplace_image_cache = ResolutionCache(
+                    constants.CACHE_PATH.joinpath("azure_marketplace_images.json"),
+                    ttl=timedelta(hours=MARKETPLACE_IMAGE_CACHE_HOURS),
+                )
+            return self._marketplace_image_cache
+
     def _parse_marketplace_image(
         self, location: str, marketplace: AzureVmMarketplaceSchema
     ) -> AzureVmMarketplaceSchema:
-        compute_client = get_compute_client(self)
         new_marketplace = copy.copy(marketplace)
         if marketplace.version.lower() == "latest":
             # latest doesn't work, it needs a specified version.
-            versioned_images = compute_client.virtual_machine_images.list(
-                location=location,
-                publisher_name=marketplace.publisher,
-                offer=marketplace.offer,
-                skus=marketplace.sku,
+            new_marketplace.version = self._get_marketplace_image_cache().get(
+                f"version/{self.subscription_id}/{location}/"
+                f"{marketplace.publisher}/{marketplace.offer}/{marketplace.sku}",
+                partial(self._get_latest_image_version, location, marketplace),
             )
-            # any one should be the same to get purchase plan
-            new_marketplace.version = versioned_images[-1].name
         return new_marketplace
 
+    def _get_latest_image_version(
+        self, location: str, marketplace: AzureVmMarketplaceSchema
+    ) -> str:
+        compute_client = get_compute_client(self)
+        versioned_images = compute_client.virtual_machine_images.list(
+            location=location,
+            publisher_name=marketplace.publisher,
+            offer=marketplace.offer,
+            skus=marketplace.sku,
+        )
+        # any one should be the same to get purchase plan
+        version: str = versioned_images[-1].name
+        return version
+
     def _process_marketplace_image_plan(
         self, location: str, marketplace: AzureVmMarketplaceSchema
     ) -> Optional[PurchasePlan]:
@@ -1269,6 +1666,22 @@ class AzurePlatform(Platform):
         this method to fill plan, if a VM needs it. If don't fill it, the deployment
         will be failed.
 
+        The plan is cached with the image, so terms are checked once. Terms are
+        accepted per subscription, so it's in the key.
+        """
+        plan_data: Optional[Dict[str, str]] = self._get_marketplace_image_cache().get(
+            f"plan/{self.subscription_id}/{location}/{marketplace.publisher}/"
+            f"{marketplace.offer}/{marketplace.sku}/{marketplace.version}",
+            partial(self._resolve_marketplace_image_plan, location, marketplace),
+        )
+        if plan_data is None:
+            return None
+        return AzureVmPurchasePlanSchema(**plan_data)
+
+    def _resolve_marketplace_image_plan(
+        self, location: str, marketplace: AzureVmMarketplaceSchema
+    ) -> Optional[Dict[str, str]]:
+        """
         1. Get image_info to check if there is a plan.
         2. If there is a plan, it may need to check and accept terms.
         """
@@ -1280,7 +1693,7 @@ class AzurePlatform(Platform):
             skus=marketplace.sku,
             version=marketplace.version,
         )
-        plan: Optional[AzureVmPurchasePlanSchema] = None
+        plan: Optional[Dict[str, str]] = None
         if image_info.plan:
             # if there is a plan, it may need to accept term.
             marketplace_client = get_marketplace_ordering_client(self)
@@ -1307,9 +1720,9 @@ class AzurePlatform(Platform):
                     plan_id=image_info.plan.name,
                     parameters=term,
                 )
-            plan = AzureVmPurchasePlanSchema(
-                name=image_info.plan.name,
-                product=image_info.plan.product,
-                publisher=image_info.plan.publisher,
-            )
+            plan = {
+                "name": image_info.plan.name,
+                "product": image_info.plan.product,
+                "publisher": image_info.plan.publisher,
+            }
         return plan
@@ -0,0 +1,74 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import threading
+from typing import Callable, Dict, List, Tuple
+
+from lisa.platform_ import WaitMoreResourceError
+from lisa.util import SkippedException
+
+# the name of regional quota of total vCPUs in usage API.
+TOTAL_CORES_NAME = "cores"
+
+
+class QuotaAdmission:
+    """
+    Admit deployments by vCPU quota of locations. Usages are loaded once for each
+    location, and vCPUs of admitted deployments are reserved, until they are
+    deleted. So deployments, which exceed quota, wait until others are deleted,
+    instead of failing in Azure.
+    """
+
+    def __init__(
+        self, load_usages: Callable[[str], Dict[str, Tuple[int, int]]]
+    ) -> None:
+        # it returns current value and limit by quota name of a location.
+        self._load_usages = load_usages
+        self._usages: Dict[str, Dict[str, Tuple[int, int]]] = dict()
+        # key is the name of reservation, value is location and demands.
+        self._reservations: Dict[str, Tuple[str, Dict[str, int]]] = dict()
+        self._lock = threading.Lock()
+
+    def reserve(self, name: str, location: str, demands: Dict[str, int]) -> None:
+        """
+        Reserve vCPUs by quota names. It raises WaitMoreResourceError, if the quota
+        is used up for now, and SkippedException, if the limit is less than demands.
+        """
+        with self._lock:
+            usages = self._usages.get(location)
+            if usages is None:
+                usages = self._load_usages(location)
+                self._usages[location] = usages
+
+            reserved: Dict[str, int] = dict()
+            for reserved_location, reserved_demands in self._reservations.values():
+                if reserved_location == location:
+                    for quota_name, count in reserved_demands.items():
+                        reserved[quota_name] = reserved.get(quota_name, 0) + count
+
+            insufficient: List[str] = []
+            for quota_name, count in demands.items():
+                if quota_name not in usages:
+                    # unknown quota isn't limited.
+                    continue
+                current, limit = usages[quota_name]
+                if count > limit:
+                    raise SkippedException(
+                        f"quota '{quota_name}' in '{location}' is not enough, "
+                        f"required: {count}, limit: {limit}"
+                    )
+                if current + reserved.get(quota_name, 0) + count > limit:
+                    insufficient.append(
+                        f"{quota_name} (required: {count}, used: {current}, "
+                        f"reserved: {reserved.get(quota_name, 0)}, limit: {limit})"
+                    )
+            if insufficient:
+                raise WaitMoreResourceError(
+                    f"quota in '{location}' is used by other deployments: "
+                    f"{', '.join(insufficient)}"
+                )
+            self._reservations[name] = (location, demands)
+
+    def release(self, name: str) -> None:
+        with self._lock:
+            self._reservations.pop(name, None)
@@ -0,0 +1,190 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import threading
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from unittest.case import TestCase
+
+import requests
+from azure.mgmt.compute import ComputeManagementClient  # type: ignore
+from azure.mgmt.network import NetworkManagementClient  # type: ignore
+
+from lisa import schema
+from lisa.node import Node, Nodes
+from lisa.util import LisaException
+
+from .. import features
+
+
+class MockOperation:
+    def __init__(self, nic: Any, events: List[str]) -> None:
+        self._nic = nic
+        self._events = events
+
+    def wait(self) -> None:
+        self._events.append(f"wait {self._nic.name}")
+
+    def result(self) -> Any:
+        return self._nic
+
+
+class MockNetworkInterfaces:
+    def __init__(self, nic_names: List[str]) -> None:
+        self.events: List[str] = []
+        self.broken_nic_name = ""
+        # all nics are got at the same time, it's broken if they are updated one
+        # by one.
+        self._barrier = threading.Barrier(len(nic_names), timeout=5)
+
+    def get(self, resource_group_name: str, nic_name: str) -> Any:
+        self._barrier.wait()
+        if nic_name == self.broken_nic_name:
+            raise LisaException(f"failed to get {nic_name}")
+        return SimpleNamespace(name=nic_name, enable_accelerated_networking=False)
+
+    def begin_create_or_update(
+        self, resource_group_name: str, nic_name: str, nic: Any
+    ) -> MockOperation:
+        self.events.append(f"begin {nic_name}")
+        return MockOperation(nic, self.events)
+
+
+class SriovTestCase(TestCase):
+    def setUp(self) -> None:
+        self._nic_names = ["nic0", "nic1", "nic2"]
+        self._network_interfaces = MockNetworkInterfaces(self._nic_names)
+        vm = SimpleNamespace(
+            network_profile=SimpleNamespace(
+                network_interfaces=[
+                    SimpleNamespace(id=f"/networkInterfaces/{name}", primary=index == 0)
+                    for index, name in enumerate(self._nic_names)
+                ]
+            )
+        )
+        clients: Dict[Any, Any] = {
+            ComputeManagementClient: SimpleNamespace(
+                virtual_machines=SimpleNamespace(get=lambda *args: vm)
+            ),
+            NetworkManagementClient: SimpleNamespace(
+                network_interfaces=self._network_interfaces
+            ),
+        }
+        platform = SimpleNamespace(clients=SimpleNamespace(get=clients.get))
+        node = Node.create(
+            index=-1,
+            runbook=schema.LocalNode(capability=schema.Capability()),
+            logger_name="sriov",
+        )
+        self._sriov = features.Sriov(node, platform)  # type: ignore
+        self._sriov.initialize()
+
+    def test_nics_updated_together(self) -> None:
+        self._sriov.enable()
+        events = self._network_interfaces.events
+        # all updates are started, before waiting any of them.
+        self.assertListEqual(
+            [f"begin {name}" for name in self._nic_names], sorted(events[:3])
+        )
+        self.assertListEqual([f"wait {name}" for name in self._nic_names], events[3:])
+
+    def test_started_updates_waited_on_error(self) -> None:
+        self._network_interfaces.broken_nic_name = "nic1"
+        with self.assertRaises(LisaException):
+            self._sriov.enable()
+        events = self._network_interfaces.events
+        self.assertListEqual(["begin nic0", "begin nic2"], sorted(events[:2]))
+        self.assertListEqual(["wait nic0", "wait nic2"], events[2:])
+
+
+class SerialConsoleTestCase(TestCase):
+    def setUp(self) -> None:
+        log_dir = TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        self._blob = b""
+        self._creation_time = "created at 1"
+        # the range header of requests, it's empty if the whole blob is requested.
+        self._ranges: List[str] = []
+        self.addCleanup(setattr, requests, "get", requests.get)
+        requests.get = self._get  # type: ignore
+
+        diagnostic_data = SimpleNamespace(
+            console_screenshot_blob_uri="screenshot_uri",
+            serial_console_log_blob_uri="log_uri",
+        )
+        clients: Dict[Any, Any] = {
+            ComputeManagementClient: SimpleNamespace(
+                virtual_machines=SimpleNamespace(
+                    retrieve_boot_diagnostics_data=lambda **kwargs: diagnostic_data
+                )
+            ),
+        }
+        platform = SimpleNamespace(clients=SimpleNamespace(get=clients.get))
+        node = Nodes().from_existing(
+            schema.LocalNode(capability=schema.Capability()),
+            "serial_console",
+            base_log_path=Path(log_dir.name),
+        )
+        self._serial_console = features.SerialConsole(node, platform)  # type: ignore
+        self._serial_console.initialize()
+
+    def _get(self, uri: str, headers: Optional[Dict[str, str]] = None) -> Any:
+        if uri == "screenshot_uri":
+            return SimpleNamespace(status_code=200, content=b"", headers={})
+        response_headers = {features.BLOB_CREATION_TIME_HEADER: self._creation_time}
+        range_header = headers["Range"] if headers else ""
+        self._ranges.append(range_header)
+        if not range_header:
+            return SimpleNamespace(
+                status_code=200, content=self._blob, headers=response_headers
+            )
+        offset = int(range_header[len("bytes=") : -len("-")])
+        if offset >= len(self._blob):
+            # the error response has no properties of the blob.
+            return SimpleNamespace(
+                status_code=416,
+                content=b"",
+                headers={"Content-Range": f"bytes */{len(self._blob)}"},
+            )
+        return SimpleNamespace(
+            status_code=206, content=self._blob[offset:], headers=response_headers
+        )
+
+    def test_new_content_downloaded(self) -> None:
+        self._blob = b"line 1\n"
+        self.assertEqual("line 1\n", self._serial_console.get_console_log())
+        self._blob += b"line 2\n"
+        self.assertEqual(
+            "line 1\nline 2\n", self._serial_console.get_console_log(force_run=True)
+        )
+        self.assertListEqual(["", "bytes=7-"], self._ranges)
+
+    def test_no_new_content(self) -> None:
+        self._blob = b"line 1\n"
+        self._serial_console.get_console_log()
+        self.assertEqual(
+            "line 1\n", self._serial_console.get_console_log(force_run=True)
+        )
+        self.assertListEqual(["", "bytes=7-"], self._ranges)
+
+    def test_shorter_log_downloaded_again(self) -> None:
+        self._blob = b"line 1\nline 2\n"
+        self._serial_console.get_console_log()
+        self._blob = b"new 1\n"
+        self.assertEqual(
+            "new 1\n", self._serial_console.get_console_log(force_run=True)
+        )
+        self.assertListEqual(["", "bytes=14-", ""], self._ranges)
+
+    def test_recreated_log_downloaded_again(self) -> None:
+        self._blob = b"line 1\n"
+        self._serial_console.get_console_log()
+        # the recreated log is longer, so the range request succeeds.
+        self._blob = b"new 1\nnew 2\n"
+        self._creation_time = "created at 2"
+        self.assertEqual(
+            "new 1\nnew 2\n", self._serial_console.get_console_log(force_run=True)
+        )
+        self.assertListEqual(["", "bytes=7-", ""], self._ranges)
@@ -0,0 +1,125 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from unittest.case import TestCase
+
+from azure.core.pipeline import Pipeline
+from azure.core.pipeline.transport import HttpRequest, HttpResponse, HttpTransport
+
+from lisa.util.logger import get_logger
+
+from ..governor import ConcurrencyGovernor, GovernorPolicy, get_remaining
+
+
+class FakeResponse(HttpResponse):
+    def __init__(
+        self, request: HttpRequest, status_code: int, headers: Dict[str, str]
+    ) -> None:
+        super().__init__(request, None)
+        self.status_code = status_code
+        self.headers = headers
+
+    def body(self) -> bytes:
+        return b""
+
+
+class FakeTransport(HttpTransport[HttpRequest, HttpResponse]):
+    """
+    Return responses in order, and record the max count of concurrent requests.
+    """
+
+    def __init__(self, responses: Optional[List[Any]] = None, delay: float = 0) -> None:
+        self._responses = responses or []
+        self._delay = delay
+        self._lock = threading.Lock()
+        self._running_count = 0
+        self.max_running_count = 0
+
+    def send(self, request: HttpRequest, **kwargs: Any) -> HttpResponse:
+        with self._lock:
+            self._running_count += 1
+            self.max_running_count = max(self.max_running_count, self._running_count)
+            status_code, headers = (
+                self._responses.pop(0) if self._responses else (200, {})
+            )
+        time.sleep(self._delay)
+        with self._lock:
+            self._running_count -= 1
+        return FakeResponse(request, status_code, headers)
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+
+class GovernorTestCase(TestCase):
+    def setUp(self) -> None:
+        self._log = get_logger("test", "governor")
+
+    def test_concurrency_limited(self) -> None:
+        governor = ConcurrencyGovernor(log=self._log, max_window=2)
+        transport = FakeTransport(delay=0.05)
+        pipeline = Pipeline(transport=transport, policies=[GovernorPolicy(governor)])
+
+        threads = [
+            threading.Thread(
+                target=pipeline.run, args=(HttpRequest("GET", "https://fake"),)
+            )
+            for _ in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(2, transport.max_running_count)
+        self.assertEqual(0, governor.running_count)
+
+    def test_throttled_slow_down(self) -> None:
+        # the window is halved, and requests wait for retry after.
+        governor = ConcurrencyGovernor(log=self._log, max_window=8)
+        transport = FakeTransport(responses=[(429, {"Retry-After": "0.3"})])
+        pipeline = Pipeline(transport=transport, policies=[GovernorPolicy(governor)])
+
+        response = pipeline.run(HttpRequest("GET", "https://fake"))
+        self.assertEqual(429, response.http_response.status_code)
+        self.assertEqual(4, governor.window)
+
+        started = time.monotonic()
+        pipeline.run(HttpRequest("GET", "https://fake"))
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+        # additive increase on successful responses.
+        for _ in range(4):
+            pipeline.run(HttpRequest("GET", "https://fake"))
+        self.assertEqual(5, governor.window)
+
+    def test_low_remaining_slow_down(self) -> None:
+        governor = ConcurrencyGovernor(log=self._log, max_window=8)
+        transport = FakeTransport(
+            responses=[
+                (200, {"x-ms-ratelimit-remaining-subscription-reads": "11999"}),
+                (
+                    200,
+                    {
+                        "x-ms-ratelimit-remaining-resource": (
+                            "Microsoft.Compute/GetVM3Min;12,"
+                            "Microsoft.Compute/GetVM30Min;1179"
+                        )
+                    },
+                ),
+            ]
+        )
+        pipeline = Pipeline(transport=transport, policies=[GovernorPolicy(governor)])
+        pipeline.run(HttpRequest("GET", "https://fake"))
+        self.assertEqual(8, governor.window)
+        response = pipeline.run(HttpRequest("GET", "https://fake"))
+        self.assertEqual(12, get_remaining(response.http_response))
+        self.assertEqual(4, governor.window)
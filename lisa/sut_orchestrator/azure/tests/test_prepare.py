@@ -1,24 +1,44 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import shutil
+import threading
+from datetime import datetime, timedelta
 from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
 from typing import Any, Dict, List, Optional
 from unittest.case import TestCase
 
+from azure.identity import DefaultAzureCredential
+from azure.mgmt.compute import ComputeManagementClient  # type: ignore
 from azure.mgmt.compute.models import ResourceSku  # type: ignore
+from azure.mgmt.network import NetworkManagementClient  # type: ignore
 
 from lisa import schema, search_space
 from lisa.environment import Environment
+from lisa.platform_ import WaitMoreResourceError
 from lisa.util import LisaException, SkippedException, constants
 from lisa.util.logger import get_logger
 
-from .. import common, platform_
+from .. import common, features, platform_, quota
 
 
 class AzurePrepareTestCase(TestCase):
+    _cache_dir: "TemporaryDirectory[str]"
+
     @classmethod
     def setUpClass(cls) -> None:
-        constants.CACHE_PATH = Path(__file__).parent
+        # the location cache is migrated from test data, so keep the test folder
+        # clean.
+        cls._cache_dir = TemporaryDirectory()
+        constants.CACHE_PATH = Path(cls._cache_dir.name)
+        for data_file in Path(__file__).parent.glob("azure_locations_*.json"):
+            shutil.copy(data_file, constants.CACHE_PATH)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._cache_dir.cleanup()
 
     def setUp(self) -> None:
         self._log = get_logger("test", "azure")
@@ -70,6 +90,261 @@ class AzurePrepareTestCase(TestCase):
         self.assertEqual(search_space.IntRange(min=0, max=32), node.disk_count)
         self.assertEqual(4, node.gpu_count)
 
+    def test_resource_sku_loaded_lazily(self) -> None:
+        location_info = self._platform._get_location_info("westus2", self._log)
+        self.assertTrue(all(x.resource_sku is None for x in location_info.capabilities))
+        resource_sku = self._platform._get_resource_sku(
+            "westus2", "Standard_M208ms_v2", self._log
+        )
+        assert resource_sku
+        self.assertEqual("Standard_M208ms_v2", resource_sku["name"])
+
+    def test_location_store(self) -> None:
+        # the migrated cache is loaded with the same capabilities.
+        expected = self._platform._get_location_info("westus2", self._log)
+        platform = platform_.AzurePlatform(schema.Platform())
+        platform._azure_runbook = platform_.AzurePlatformSchema()
+        loaded = platform._load_location_info_from_store("westus2", self._log)
+        assert loaded
+        self.assertEqual(expected.updated_time, loaded.updated_time)
+        self.assertListEqual(
+            [(x.vm_size, x.estimated_cost) for x in expected.capabilities],
+            [(x.vm_size, x.estimated_cost) for x in loaded.capabilities],
+        )
+        for expected_capability, loaded_capability in zip(
+            expected.capabilities, loaded.capabilities
+        ):
+            self.assertEqual(
+                expected_capability.capability, loaded_capability.capability
+            )
+        # the same ranges are shared by loaded capabilities.
+        disk_counts = [x.capability.disk_count for x in loaded.capabilities]
+        self.assertIsInstance(disk_counts[0], search_space.IntRange)
+        self.assertIs(
+            disk_counts[0],
+            search_space.decode_count_space(disk_counts[0].to_dict()),  # type: ignore
+        )
+
+    def test_locations_refreshed_concurrently(self) -> None:
+        # each query waits others, so it fails, if they are queried one by one.
+        barrier = threading.Barrier(2, timeout=10)
+
+        def _query(location: str, log: Any) -> platform_.AzureLocation:
+            barrier.wait()
+            return platform_.AzureLocation(location=location)
+
+        for location in ["eastus", "uksouth"]:
+            self._platform._get_location_info(location, self._log)
+            self._platform._locations_data_cache[location].updated_time = datetime.min
+        self._platform._query_location_info = _query  # type: ignore
+        self._platform._load_location_infos(["eastus", "uksouth"], self._log)
+        for location in ["eastus", "uksouth"]:
+            self.assertListEqual(
+                [], self._platform._locations_data_cache[location].capabilities
+            )
+
+    def test_locations_refreshed_in_background(self) -> None:
+        # the stale data is used, until the refreshed data is swapped in.
+        refreshed = platform_.AzureLocation(location="westus2")
+        queried = threading.Event()
+
+        def _query(location: str, log: Any) -> platform_.AzureLocation:
+            queried.set()
+            return refreshed
+
+        self._platform._azure_runbook.refresh_locations_in_background = True
+        self._platform._query_location_info = _query  # type: ignore
+        stale = self._platform._get_location_info("westus2", self._log)
+        stale.updated_time = datetime.min
+        self.assertIs(stale, self._platform._get_location_info("westus2", self._log))
+        self.assertTrue(queried.wait(10))
+        for thread in threading.enumerate():
+            if thread.name == "azure_location_westus2":
+                thread.join()
+        self.assertIs(stale, self._platform._get_location_info("westus2", self._log))
+        self.assertTrue(self._platform._get_eligible_vm_sizes("westus2", self._log))
+
+        self._platform._apply_refreshed_locations(self._log)
+        self.assertIs(
+            refreshed, self._platform._get_location_info("westus2", self._log)
+        )
+        self.assertListEqual(
+            [], self._platform._get_eligible_vm_sizes("westus2", self._log)
+        )
+
+    def test_node_addresses_from_outputs(self) -> None:
+        # the template outputs addresses of each node.
+        template = self._platform._load_template()
+        node_output = template["outputs"]["nodes"]["copy"]["input"]
+        self.assertSetEqual(
+            {"name", "private_ip_address", "public_ip_address"}, set(node_output)
+        )
+        deployment = SimpleNamespace(
+            properties=SimpleNamespace(
+                outputs={
+                    "nodes": {
+                        "type": "Array",
+                        "value": [
+                            {
+                                "name": "node-0",
+                                "private_ip_address": "10.0.0.4",
+                                "public_ip_address": "40.1.2.3",
+                            },
+                        ],
+                    }
+                }
+            )
+        )
+        self.assertDictEqual(
+            {"node-0": ("10.0.0.4", "40.1.2.3")},
+            self._platform._get_node_addresses(deployment),
+        )
+        deployment.properties.outputs = None
+        self.assertDictEqual({}, self._platform._get_node_addresses(deployment))
+
+    def test_validated_template_cached(self) -> None:
+        # names and secrets don't change the key, but the shape does.
+        self._platform.subscription_id = "00000000-0000-0000-0000-000000000000"
+
+        def _create_parameters(
+            resource_group_name: str, password: str, vm_size: str
+        ) -> Dict[str, Any]:
+            parameters = {
+                "resource_group_name": resource_group_name,
+                "admin_password": password,
+                "nodes": [{"name": resource_group_name, "vm_size": vm_size}],
+            }
+            return {
+                "parameters": SimpleNamespace(
+                    properties=SimpleNamespace(
+                        template={"resources": []},
+                        parameters={k: {"value": v} for k, v in parameters.items()},
+                    )
+                )
+            }
+
+        deployment_parameters = _create_parameters("rg_0", "secret0", "Standard_A2")
+        key = self._platform._get_validation_key(deployment_parameters)
+        self.assertEqual(
+            key,
+            self._platform._get_validation_key(
+                _create_parameters("rg_1", "secret1", "Standard_A2")
+            ),
+        )
+        self.assertNotEqual(
+            key,
+            self._platform._get_validation_key(
+                _create_parameters("rg_0", "secret0", "Standard_A4")
+            ),
+        )
+
+        self.assertFalse(self._platform._is_template_validated(key))
+        self._platform._save_validated_template(key)
+        # validated, so no client is needed to validate it again.
+        self._platform._validate_template(deployment_parameters, self._log)
+
+        platform = platform_.AzurePlatform(schema.Platform())
+        self.assertTrue(platform._is_template_validated(key))
+        validated_templates = platform._load_validated_templates()
+        validated_templates[key] = datetime.now() - timedelta(
+            hours=platform_.TEMPLATE_VALIDATION_CACHE_HOURS
+        )
+        self.assertFalse(platform._is_template_validated(key))
+
+    def test_quota_reserved(self) -> None:
+        # environments wait, when quota is reserved by others.
+        usages = {"cores": (10, 20), "standardDSv2Family": (0, 24)}
+        self._platform._quota_admission = quota.QuotaAdmission(lambda _: usages)
+        env = self.load_environment(node_req_count=2)
+        env.name = "env_0"
+        for index in range(2):
+            self.set_node_runbook(env, index, "eastus2", "Standard_DS2_v2")
+        self._platform._reserve_quota(env, self._log)
+
+        env_1 = self.load_environment(node_req_count=1)
+        env_1.name = "env_1"
+        self.set_node_runbook(env_1, 0, "eastus2", "Standard_DS15_v2")
+        with self.assertRaises(WaitMoreResourceError):
+            self._platform._reserve_quota(env_1, self._log)
+        self._platform._quota_admission.release("env_0")
+        with self.assertRaises(WaitMoreResourceError):
+            # 10 cores are used by others.
+            self._platform._reserve_quota(env_1, self._log)
+
+        env_2 = self.load_environment(node_req_count=1)
+        env_2.name = "env_2"
+        self.set_node_runbook(env_2, 0, "eastus2", "Standard_NV48s_v3")
+        usages["standardNVSv3Family"] = (0, 24)
+        with self.assertRaises(SkippedException):
+            self._platform._reserve_quota(env_2, self._log)
+
+    def test_marketplace_image_cached(self) -> None:
+        # concurrent resolutions of the same image are collapsed into one call.
+        resolved_versions: List[str] = []
+        barrier = threading.Barrier(4)
+        self._platform.subscription_id = "subscription_0"
+
+        def _get_latest_image_version(location: str, marketplace: Any) -> str:
+            resolved_versions.append(location)
+            return "1.0.0"
+
+        self._platform._get_latest_image_version = (  # type: ignore
+            _get_latest_image_version
+        )
+        marketplace = common.AzureVmMarketplaceSchema(
+            publisher="fake", offer="fake", sku="cached", version="latest"
+        )
+
+        def _parse() -> None:
+            barrier.wait()
+            parsed = self._platform._parse_marketplace_image("eastus2", marketplace)
+            self.assertEqual("1.0.0", parsed.version)
+
+        threads = [threading.Thread(target=_parse) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(["eastus2"], resolved_versions)
+
+        resolved_plans: List[str] = []
+
+        def _resolve_plan(location: str, marketplace: Any) -> Optional[Any]:
+            resolved_plans.append(self._platform.subscription_id)
+            return {"name": "plan", "product": "product", "publisher": "fake"}
+
+        self._platform._resolve_marketplace_image_plan = _resolve_plan  # type: ignore
+        parsed = self._platform._parse_marketplace_image("eastus2", marketplace)
+        for _ in range(2):
+            plan = self._platform._process_marketplace_image_plan("eastus2", parsed)
+            assert plan
+            self.assertEqual("product", plan.product)
+        # terms are accepted per subscription, so it's resolved again.
+        self._platform.subscription_id = "subscription_1"
+        self._platform._process_marketplace_image_plan("eastus2", parsed)
+        self.assertListEqual(["subscription_0", "subscription_1"], resolved_plans)
+
+        # the cache is persisted, and expired after the ttl.
+        cache_path = constants.CACHE_PATH.joinpath("azure_marketplace_images.json")
+        cache = common.ResolutionCache(cache_path, ttl=timedelta(hours=1))
+        version_key = "version/subscription_0/eastus2/fake/fake/cached"
+        self.assertEqual("1.0.0", cache.get(version_key, list))
+        cache = common.ResolutionCache(cache_path, ttl=timedelta())
+        self.assertEqual([], cache.get(version_key, list))
+
+    def test_clients_shared(self) -> None:
+        clients = common.AzureClients(
+            credential=DefaultAzureCredential(),
+            subscription_id="00000000-0000-0000-0000-000000000000",
+        )
+        compute_client = clients.get(ComputeManagementClient)
+        self.assertIs(compute_client, clients.get(ComputeManagementClient))
+        network_client = clients.get(NetworkManagementClient)
+        self.assertIs(
+            compute_client._client._pipeline._transport,
+            network_client._client._pipeline._transport,
+        )
+
     def test_not_eligible_dropped(self) -> None:
         # if a location is not eligible, it should be dropped.
         # if a vm size is not eligible, it should be dropped.
@@ -267,6 +542,43 @@ class AzurePrepareTestCase(TestCase):
             environment=env,
         )
 
+    def test_capability_table_search(self) -> None:
+        # the table returns the same vm sizes as checking one by one.
+        requirements = [
+            schema.NodeSpace(),
+            schema.NodeSpace(nic_count=3),
+            schema.NodeSpace(core_count=search_space.IntRange(min=8, max=16)),
+            schema.NodeSpace(
+                core_count=4,
+                memory_mb=search_space.IntRange(min=4096),
+                features=search_space.SetSpace[str](
+                    is_allow_set=True, items=[features.Sriov.name()]
+                ),
+            ),
+            schema.NodeSpace(
+                excluded_features=search_space.SetSpace[str](
+                    is_allow_set=False, items=[features.Sriov.name()]
+                )
+            ),
+            schema.NodeSpace(
+                features=search_space.SetSpace[str](
+                    is_allow_set=True, items=["not_exists"]
+                )
+            ),
+        ]
+        location_caps = self._platform._get_eligible_vm_sizes("westus2", self._log)
+        table = self._platform._get_capability_table("westus2", self._log)
+        self.assertEqual(len(location_caps), len(table))
+        for requirement in requirements:
+            expected = [
+                index
+                for index, x in enumerate(location_caps)
+                if requirement.check(x.capability).result
+            ]
+            self.assertListEqual(
+                expected, list(table.search(requirement)), str(requirement)
+            )
+
     def verify_exists_vm_size(
         self, location: str, vm_size: str, expect_exists: bool
     ) -> Optional[platform_.AzureCapability]:
@@ -25,6 +25,13 @@ class Waagent(Tool):
         self._command = "waagent"
 
     def get_version(self) -> str:
+        output = self.node.facts.get().waagent
+        if output is None:
+            output = self._run_version()
+        found_version = find_patterns_in_lines(output, [self.__version_pattern])
+        return found_version[0][0] if found_version[0] else ""
+
+    def _run_version(self) -> str:
         result = self.run("-version")
         if result.exit_code != 0:
             self._command = "/usr/sbin/waagent"
@@ -35,8 +42,7 @@ class Waagent(Tool):
         if result.exit_code != 0:
             self._command = "python3 /usr/sbin/waagent"
             result = self.run("-version")
-        found_version = find_patterns_in_lines(result.stdout, [self.__version_pattern])
-        return found_version[0][0] if found_version[0] else ""
+        return result.stdout
 
 
 class VmGeneration(Tool):
@@ -52,6 +58,9 @@ class VmGeneration(Tool):
         return True
 
     def get_generation(self) -> str:
+        generation = self.node.facts.get().vm_generation
+        if generation:
+            return generation
         cmd_result = self.run()
         if cmd_result.exit_code == 0:
             generation = "2"
@@ -32,8 +32,10 @@ class ReadyPlatform(Platform):
         return is_success
 
     def _deploy_environment(self, environment: Environment, log: Logger) -> None:
-        # do nothing for deploy
-        pass
+        # nodes are predefined, and not changed between runs. So the discovered
+        # info is persisted, and reused if the node isn't rebooted or upgraded.
+        for node in environment.nodes.list():
+            node.facts.is_persisted = True
 
     def _delete_environment(self, environment: Environment, log: Logger) -> None:
         # ready platform doesn't support delete environment
@@ -15,6 +15,7 @@ from lisa.search_space import (
     SetSpace,
     check,
     generate_min_capability,
+    match,
 )
 from lisa.tests.test_search_space import SearchSpaceTestCase
 from lisa.testsuite import DEFAULT_REQUIREMENT, TestCaseRequirement, simple_requirement
@@ -42,6 +43,12 @@ class UtTestCaseRequirement(TestCaseRequirement, RequirementMixin):
 
         return result
 
+    def match(self, capability: Any) -> bool:
+        assert isinstance(
+            capability, UtTestCaseRequirement
+        ), f"actual: {type(capability)}"
+        return match(self.environment, capability.environment)
+
     def _generate_min_capability(self, capability: Any) -> Any:
         assert isinstance(
             capability, UtTestCaseRequirement
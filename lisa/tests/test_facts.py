@@ -0,0 +1,87 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import subprocess
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.case import TestCase
+
+from lisa import schema
+from lisa.node import Node
+from lisa.operating_system import OperatingSystem
+from lisa.util import constants
+from lisa.util.shell import LocalShell
+
+HOST_KEY_FINGERPRINT = "0123456789abcdef0123456789abcdef"
+
+
+class FactsTestCase(TestCase):
+    def setUp(self) -> None:
+        self._node = self._create_node()
+
+    def _create_node(self) -> Node:
+        return Node.create(
+            index=-1,
+            runbook=schema.LocalNode(capability=schema.Capability()),
+            logger_name="facts",
+        )
+
+    def _create_persisted_node(self) -> Node:
+        node = self._create_node()
+        shell = LocalShell()
+        # the snapshot is persisted for nodes with host key only.
+        shell.host_key_fingerprint = HOST_KEY_FINGERPRINT
+        node._shell = shell
+        node.facts.is_persisted = True
+        return node
+
+    def test_facts_collected_once(self) -> None:
+        facts = self._node.facts.get()
+        expected = subprocess.run(
+            ["uname", "-vrio"], stdout=subprocess.PIPE, universal_newlines=True
+        ).stdout.strip()
+        self.assertEqual(expected, facts.uname)
+        self.assertIn(facts.vm_generation, ["1", "2"])
+        self.assertIs(facts, self._node.facts.get())
+
+    def test_facts_refresh(self) -> None:
+        facts = self._node.facts.get()
+        refreshed = self._node.facts.refresh()
+        self.assertIsNot(facts, refreshed)
+        self.assertEqual(facts.uname, refreshed.uname)
+
+        self._node.facts.invalidate()
+        self.assertIsNot(refreshed, self._node.facts.get())
+
+    def test_facts_snapshot(self) -> None:
+        # the cache path and the detected type of the fake host key are global, so
+        # restore them for other tests.
+        if hasattr(constants, "CACHE_PATH"):
+            self.addCleanup(setattr, constants, "CACHE_PATH", constants.CACHE_PATH)
+        else:
+            self.addCleanup(delattr, constants, "CACHE_PATH")
+        detected_types = getattr(OperatingSystem, "_OperatingSystem__detected_types")
+        self.addCleanup(detected_types.pop, HOST_KEY_FINGERPRINT, None)
+        with TemporaryDirectory() as temp_dir:
+            constants.CACHE_PATH = Path(temp_dir)
+            node = self._create_persisted_node()
+            node.initialize()
+            facts = node.facts.get()
+            if not facts.boot_id or not facts.os_release_mtime:
+                self.skipTest("boot id or /etc/os-release is not available")
+            snapshot_files = list(Path(temp_dir).joinpath("nodes").glob("*.json"))
+            self.assertEqual(1, len(snapshot_files))
+
+            loaded_node = self._create_persisted_node()
+            snapshot = loaded_node.facts.load_snapshot()
+            assert snapshot
+            self.assertEqual(node.os.__class__.__name__, snapshot.os_type)
+            self.assertDictEqual(node.tools.probed_commands, snapshot.probed_commands)
+            self.assertEqual(facts, loaded_node.facts.get())
+
+            # the node is rebooted, so the snapshot is outdated.
+            data = json.loads(snapshot_files[0].read_text())
+            data["facts"]["boot_id"] = "rebooted"
+            snapshot_files[0].write_text(json.dumps(data))
+            self.assertIsNone(self._create_persisted_node().facts.load_snapshot())
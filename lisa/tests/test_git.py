@@ -0,0 +1,129 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import subprocess
+from pathlib import Path, PurePath
+from tempfile import TemporaryDirectory
+from typing import Any, List
+from unittest.case import TestCase
+
+from lisa import schema
+from lisa.node import LocalNode, Node
+from lisa.tools import Git
+from lisa.util import constants
+
+
+class RemoteLikeNode(LocalNode):
+    # it runs locally, but clones from bundles like a remote node.
+    @property
+    def is_remote(self) -> bool:
+        return True
+
+    @classmethod
+    def type_name(cls) -> str:
+        return "remote_like"
+
+
+def _run_git(cwd: Path, *args: str) -> str:
+    result = subprocess.run(
+        ["git", "-c", "user.name=lisa", "-c", "user.email=lisa@lisa", *args],
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    return result.stdout.strip()
+
+
+class GitTestCase(TestCase):
+    def setUp(self) -> None:
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self._temp_path = Path(temp_dir.name)
+        # the cache path is set on lisa starting, it may not be set in tests.
+        if hasattr(constants, "CACHE_PATH"):
+            self.addCleanup(setattr, constants, "CACHE_PATH", constants.CACHE_PATH)
+        else:
+            self.addCleanup(delattr, constants, "CACHE_PATH")
+        constants.CACHE_PATH = self._temp_path / "cache"
+
+        self._url = str(self._temp_path / "source")
+        Path(self._url).mkdir()
+        _run_git(Path(self._url), "init", "-q")
+        (Path(self._url) / "README").write_text("lisa")
+        _run_git(Path(self._url), "add", "README")
+        _run_git(Path(self._url), "commit", "-q", "-m", "init")
+        _run_git(Path(self._url), "branch", "dev")
+
+        self._cwd = self._temp_path / "code"
+        self._cwd.mkdir()
+        self._commands: List[List[str]] = []
+
+    def _create_git(self, node: Node) -> Git:
+        git = Git(node)
+        original_run_on_controller = git._run_on_controller
+
+        def _run_on_controller(command: List[str], *args: Any, **kwargs: Any) -> str:
+            self._commands.append(command)
+            return original_run_on_controller(command, *args, **kwargs)
+
+        git._run_on_controller = _run_on_controller  # type: ignore
+        return git
+
+    def _assert_cloned(self, dir_name: str) -> None:
+        code_path = self._cwd / dir_name
+        self.assertEqual("lisa", (code_path / "README").read_text())
+        self.assertEqual(self._url, _run_git(code_path, "remote", "get-url", "origin"))
+
+    def test_first_clone_creates_mirror(self) -> None:
+        node = Node.create(
+            index=-1,
+            runbook=schema.LocalNode(capability=schema.Capability()),
+            logger_name="git",
+        )
+        git = self._create_git(node)
+        git.clone(self._url, self._cwd, branch="dev", dir_name="first")
+        self._assert_cloned("first")
+        self.assertEqual(["git", "clone", "--mirror"], self._commands[0][:3])
+        self.assertEqual(1, len(list((constants.CACHE_PATH / "git").iterdir())))
+        self.assertEqual(
+            "dev", _run_git(self._cwd / "first", "rev-parse", "--abbrev-ref", "HEAD")
+        )
+
+    def test_second_clone_uses_bundle(self) -> None:
+        node = RemoteLikeNode(
+            runbook=schema.LocalNode(capability=schema.Capability()),
+            index=-1,
+            logger_name="git",
+            base_log_path=None,
+        )
+        node._working_path = self._temp_path / "working"
+        git = self._create_git(node)
+        git.clone(self._url, PurePath(self._cwd), branch="dev", dir_name="first")
+        self._assert_cloned("first")
+        bundles = list(constants.CACHE_PATH.glob("git/bundles/*.bundle"))
+        self.assertEqual(1, len(bundles))
+        self.assertIn(["git", "bundle", "create"], [x[:3] for x in self._commands])
+
+        # the mirror is fetched once in a run, and the bundle is reused.
+        self._commands.clear()
+        git.clone(self._url, PurePath(self._cwd), branch="dev", dir_name="second")
+        self._assert_cloned("second")
+        self.assertListEqual([["git", "rev-parse", "dev", "HEAD"]], self._commands)
+        self.assertListEqual(
+            bundles, list(constants.CACHE_PATH.glob("git/bundles/*.bundle"))
+        )
+
+    def test_failed_mirror_falls_back(self) -> None:
+        node = Node.create(
+            index=-1,
+            runbook=schema.LocalNode(capability=schema.Capability()),
+            logger_name="git",
+        )
+        # the mirror cannot be created, because the cache path is a file.
+        constants.CACHE_PATH.write_text("")
+        git = self._create_git(node)
+        git.clone(self._url, self._cwd, dir_name="direct")
+        self._assert_cloned("direct")
+        self.assertListEqual([], self._commands)
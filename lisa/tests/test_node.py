@@ -0,0 +1,61 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from time import sleep
+from typing import Any
+from unittest.case import TestCase
+
+from lisa import schema
+from lisa.node import Nodes
+from lisa.util import LisaException
+from lisa.util.perf_timer import create_timer
+from lisa.util.shell import LocalShell
+
+CONNECT_DELAY = 1
+
+
+class MockShell(LocalShell):
+    def __init__(self, is_failed: bool = False) -> None:
+        super().__init__()
+        self._is_failed = is_failed
+
+    def _initialize(self, *args: Any, **kwargs: Any) -> None:
+        # it's like connecting to a remote node.
+        sleep(CONNECT_DELAY)
+        if self._is_failed:
+            raise LisaException("mock connection failed")
+        super()._initialize(*args, **kwargs)
+
+
+class NodesTestCase(TestCase):
+    def _create_nodes(self, count: int, failed_index: int = -1) -> Nodes:
+        nodes = Nodes()
+        for index in range(count):
+            node = nodes.from_existing(
+                schema.LocalNode(capability=schema.Capability()), "nodes"
+            )
+            node._shell = MockShell(is_failed=index == failed_index)
+        return nodes
+
+    def test_initialize_concurrently(self) -> None:
+        count = 4
+        nodes = self._create_nodes(count)
+        timer = create_timer()
+        nodes.initialize()
+        # it's more than the sum of delays, if nodes are initialized one by one.
+        self.assertLess(timer.elapsed(), CONNECT_DELAY * count)
+        for node in nodes.list():
+            self.assertTrue(node.is_connected)
+            self.assertIsNotNone(node.os)
+
+    def test_initialize_errors_aggregated(self) -> None:
+        nodes = self._create_nodes(3, failed_index=1)
+        with self.assertRaises(LisaException) as cm:
+            nodes.initialize()
+        message = str(cm.exception)
+        self.assertIn("1 of 3 nodes", message)
+        self.assertIn("node[1]", message)
+        self.assertIn("mock connection failed", message)
+        # other nodes are initialized still.
+        self.assertIsNotNone(nodes[0].os)
+        self.assertIsNotNone(nodes[2].os)
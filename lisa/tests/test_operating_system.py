@@ -0,0 +1,216 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import re
+import threading
+from time import sleep
+from typing import List, Optional, Union
+from unittest.case import TestCase
+
+from lisa import schema
+from lisa.node import Node
+from lisa.operating_system import OperatingSystem, Posix
+from lisa.util import LisaException
+
+
+class MockPackagePosix(Posix):
+    def __init__(self, node: Node) -> None:
+        super().__init__(node)
+        self.invocations: List[List[str]] = []
+        self.initialized_count = 0
+        self.hold = threading.Event()
+        self.hold.set()
+        self.metadata_age: Optional[int] = None
+
+    def _initialize_package_installation(self) -> None:
+        self.initialized_count += 1
+
+    def _get_package_metadata_age(self) -> Optional[int]:
+        return self.metadata_age
+
+    def _save_package_metadata_time(self) -> None:
+        self.metadata_age = 0
+
+    def _install_packages(
+        self, packages: Union[List[str]], signed: bool = True
+    ) -> None:
+        self.invocations.append(list(packages))
+        self.hold.wait(5)
+        if "bad" in packages:
+            raise LisaException(f"failed to install {packages}")
+        if "missing" in packages and not self.initialized_count:
+            raise LisaException("Unable to locate package missing")
+
+
+class PackageInstallationTestCase(TestCase):
+    def setUp(self) -> None:
+        node = Node.create(
+            index=-1,
+            runbook=schema.LocalNode(capability=schema.Capability()),
+            logger_name="os",
+        )
+        self._os = MockPackagePosix(node)
+        self._os._package_missing_patterns = [re.compile("Unable to locate package")]
+
+    def test_installed_packages_skipped(self) -> None:
+        self._os.install_packages(["git", "make"])
+        self._os.install_packages("git")
+        self._os.install_packages(["make", "gcc"])
+        self.assertListEqual([["git", "make"], ["gcc"]], self._os.invocations)
+        self.assertEqual(1, self._os.initialized_count)
+
+    def test_queued_requests_merged(self) -> None:
+        self._os.hold.clear()
+        threads: List[threading.Thread] = []
+        for package in ["first", "second", "third", "fourth"]:
+            thread = threading.Thread(target=self._os.install_packages, args=(package,))
+            threads.append(thread)
+            thread.start()
+            if package == "first":
+                # make sure the first one is installing, others are queued.
+                while not self._os.invocations:
+                    sleep(0.01)
+        while len(self._os._package_requests) < 3:
+            sleep(0.01)
+        self._os.hold.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(2, len(self._os.invocations))
+        self.assertListEqual(["first"], self._os.invocations[0])
+        self.assertListEqual(
+            ["fourth", "second", "third"], sorted(self._os.invocations[1])
+        )
+
+    def test_failed_request_raised_to_requester(self) -> None:
+        self._os.hold.clear()
+        errors: List[str] = []
+
+        def _install(package: str) -> None:
+            try:
+                self._os.install_packages(package)
+            except LisaException:
+                errors.append(package)
+
+        threads: List[threading.Thread] = []
+        for package in ["first", "bad", "good"]:
+            thread = threading.Thread(target=_install, args=(package,))
+            threads.append(thread)
+            thread.start()
+            if package == "first":
+                while not self._os.invocations:
+                    sleep(0.01)
+        while len(self._os._package_requests) < 2:
+            sleep(0.01)
+        self._os.hold.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertListEqual(["bad"], errors)
+        self.assertIn("good", self._os._installed_packages)
+
+    def test_prefetch_ignores_errors(self) -> None:
+        self._os.prefetch_packages(["git", "bad"])
+        self._os.install_packages("git")
+        self.assertListEqual([["git", "bad"], ["git"]], self._os.invocations)
+
+    def test_fresh_metadata_not_refreshed(self) -> None:
+        self._os.metadata_age = 60
+        self._os.install_packages("git")
+        self.assertEqual(0, self._os.initialized_count)
+
+    def test_metadata_ttl_from_runbook(self) -> None:
+        # it's refreshed in each run, if the TTL is set to 0.
+        self._os._node.runbook.package_metadata_ttl = 0
+        self._os.metadata_age = 60
+        self._os.install_packages("git")
+        self.assertEqual(1, self._os.initialized_count)
+
+    def test_stale_metadata_refreshed(self) -> None:
+        self._os.metadata_age = self._os.package_metadata_ttl + 1
+        self._os.install_packages("git")
+        self.assertEqual(1, self._os.initialized_count)
+        self.assertEqual(0, self._os.metadata_age)
+
+    def test_missing_package_refresh_and_retry(self) -> None:
+        self._os.metadata_age = 60
+        self._os.install_packages("missing")
+        self.assertEqual(1, self._os.initialized_count)
+        self.assertListEqual([["missing"], ["missing"]], self._os.invocations)
+        self.assertIn("missing", self._os._installed_packages)
+
+    def test_missing_package_not_retried_after_refresh(self) -> None:
+        self._os.install_packages("git")
+        self._os.initialized_count = 0
+        with self.assertRaises(LisaException):
+            self._os.install_packages("missing")
+        self.assertListEqual([["git"], ["missing"]], self._os.invocations)
+
+
+class DetectStringTestCase(TestCase):
+    def test_output_without_new_line(self) -> None:
+        node = Node.create(
+            index=-1,
+            runbook=schema.LocalNode(capability=schema.Capability()),
+            logger_name="os",
+        )
+        node.initialize()
+        detect_commands_name = "_OperatingSystem__detect_commands"
+        self.addCleanup(
+            setattr,
+            OperatingSystem,
+            detect_commands_name,
+            getattr(OperatingSystem, detect_commands_name),
+        )
+        # the os release has no new line at the end.
+        setattr(
+            OperatingSystem,
+            detect_commands_name,
+            [("os_release", "printf 'ID=fake'"), ("uname", "echo FakeBSD")],
+        )
+        detected = list(OperatingSystem._get_detect_string(node))
+        self.assertIn("fake", detected)
+        self.assertIn("FakeBSD", detected)
+
+    def test_all_sources_split(self) -> None:
+        node = Node.create(
+            index=-1,
+            runbook=schema.LocalNode(capability=schema.Capability()),
+            logger_name="os",
+        )
+        node.initialize()
+        detect_commands_name = "_OperatingSystem__detect_commands"
+        detect_commands = getattr(OperatingSystem, detect_commands_name)
+        self.addCleanup(setattr, OperatingSystem, detect_commands_name, detect_commands)
+        outputs = {
+            "lsb_release": "Description:\tLsbName \nRelease:\t1",
+            "os_release": "NAME=OsName\nID=osid",
+            "redhat_release": "RedhatName release 7 (Bracket)",
+            "uname": "UnameName",
+            "issue": "IssueName 10",
+            "release": "DISTRIB_ID=ReleaseName",
+            "lsb-release": "DISTRIB_ID=LsbReleaseName",
+            "suse_release": "SUSE Linux",
+        }
+        # each source has its own output, so new sources must be added here.
+        self.assertListEqual(list(outputs), [x[0] for x in detect_commands])
+        setattr(
+            OperatingSystem,
+            detect_commands_name,
+            [(name, f"printf '{output}'") for name, output in outputs.items()],
+        )
+        self.assertListEqual(
+            [
+                "LsbName",
+                "OsName",
+                "osid",
+                "RedhatName",
+                "Bracket",
+                "UnameName",
+                "IssueName",
+                "ReleaseName",
+                "LsbReleaseName",
+                "SUSE",
+            ],
+            list(OperatingSystem._get_detect_string(node)),
+        )
@@ -36,6 +36,9 @@ class MockPlatformSchema:
     deploy_success: bool = True
     deployed_status: EnvironmentStatus = EnvironmentStatus.Deployed
     wait_more_resource_error: bool = False
+    # environments more than it cannot be deployed at the same time, like quota.
+    # 0 means no limit.
+    max_deployed_count: int = 0
 
 
 class MockPlatform(Platform):
@@ -85,6 +88,11 @@ class MockPlatform(Platform):
     def _deploy_environment(self, environment: Environment, log: Logger) -> None:
         if self._mock_runbook.wait_more_resource_error:
             raise WaitMoreResourceError("wait more resource")
+        deployed_count = len(self.test_data.deployed_envs) - len(
+            self.test_data.deleted_envs
+        )
+        if 0 < self._mock_runbook.max_deployed_count <= deployed_count:
+            raise WaitMoreResourceError("wait more resource to be released")
         if not self._mock_runbook.deploy_success:
             raise LisaException("mock deploy failed")
         if self._mock_runbook.return_prepared and environment.runbook.nodes_requirement:
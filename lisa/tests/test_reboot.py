@@ -0,0 +1,106 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from datetime import datetime, timedelta
+from typing import Any, List
+from unittest.case import TestCase
+
+from lisa import schema
+from lisa.node import Node
+from lisa.tools import Date, Reboot, Who
+from lisa.util import LisaException
+from lisa.util.process import ExecutableResult
+
+
+class MockWho(Who):
+    def _initialize(self, *args: Any, **kwargs: Any) -> None:
+        # boot times are returned by order, and the last one is returned after.
+        self.boot_times: List[datetime] = []
+
+    def last_boot(self, no_error_log: bool = True) -> datetime:
+        if len(self.boot_times) > 1:
+            return self.boot_times.pop(0)
+        return self.boot_times[0]
+
+
+class MockDate(Date):
+    def current(self, no_error_log: bool = True) -> datetime:
+        return datetime.now()
+
+
+class RebootTestCase(TestCase):
+    def setUp(self) -> None:
+        self._node = Node.create(
+            index=-1,
+            runbook=schema.LocalNode(capability=schema.Capability()),
+            logger_name="reboot",
+        )
+        # boot ids are returned by order, and the last one is returned after.
+        self._boot_ids: List[str] = []
+        self._read_boot_ids: List[str] = []
+        self._reboot_count = 0
+        self._node.execute = self._execute  # type: ignore
+        self._node.close = lambda: None  # type: ignore
+        self._reboot = Reboot(self._node)
+        self._reboot.initialize()
+        self._reboot.retry_delay = 0.01
+        self._reboot.max_retry_delay = 0.01
+        self._reboot.run = self._run  # type: ignore
+
+    def _execute(self, cmd: str, **kwargs: Any) -> ExecutableResult:
+        if cmd == "cat /proc/sys/kernel/random/boot_id":
+            if len(self._boot_ids) > 1:
+                boot_id = self._boot_ids.pop(0)
+            else:
+                boot_id = self._boot_ids[0] if self._boot_ids else ""
+            self._read_boot_ids.append(boot_id)
+            # an empty boot id means it fails to read.
+            return ExecutableResult(
+                stdout=boot_id, stderr="", exit_code=0 if boot_id else 1, elapsed=0
+            )
+        return ExecutableResult(stdout="", stderr="", exit_code=1, elapsed=0)
+
+    def _run(self, *args: Any, **kwargs: Any) -> ExecutableResult:
+        self._reboot_count += 1
+        return ExecutableResult(stdout="", stderr="", exit_code=0, elapsed=0)
+
+    def test_facts_invalidated(self) -> None:
+        # facts are invalidated, when the node is rebooted by the tool.
+        self._node.facts._facts = object()  # type: ignore
+        self._boot_ids = ["old", "new"]
+        self._reboot.reboot()
+        self.assertEqual(1, self._reboot_count)
+        self.assertIsNone(self._node.facts._facts)
+
+    def test_wait_new_boot_id(self) -> None:
+        # the empty boot id is read on shutting down, so it waits still.
+        self._boot_ids = ["old", "old", "", "new"]
+        self._reboot.reboot()
+        self.assertEqual(1, self._reboot_count)
+        self.assertListEqual(["old", "old", "", "new"], self._read_boot_ids)
+
+    def test_timeout(self) -> None:
+        self._boot_ids = ["old"]
+        self._reboot.time_out = 1
+        with self.assertRaises(LisaException) as cm:
+            self._reboot.reboot()
+        self.assertIn("may not perform reboot", str(cm.exception))
+
+        self._boot_ids = ["old", ""]
+        with self.assertRaises(LisaException) as cm:
+            self._reboot.reboot()
+        self.assertIn("may stuck on reboot", str(cm.exception))
+
+    def test_reboot_by_boot_time(self) -> None:
+        # no boot id, so the reboot is detected by the boot time.
+        who = MockWho(self._node)
+        who.initialize()
+        last_boot_time = datetime.now() - timedelta(minutes=2)
+        who.boot_times = [last_boot_time, last_boot_time, datetime.now()]
+        self._node.tools._cache["who"] = who
+        date = MockDate(self._node)
+        date.initialize()
+        self._node.tools._cache["date"] = date
+        self._reboot.reboot()
+        self.assertEqual(1, self._reboot_count)
+        self.assertEqual(1, len(who.boot_times))
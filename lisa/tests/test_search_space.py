@@ -12,10 +12,15 @@ from lisa.search_space import (
     RequirementMixin,
     ResultReason,
     SetSpace,
+    _Memo,
     check,
     check_countspace,
+    decode_count_space,
     generate_min_capability,
     generate_min_capability_countspace,
+    get_key,
+    match,
+    match_countspace,
 )
 from lisa.util import LisaException
 from lisa.util.logger import get_logger
@@ -184,6 +189,60 @@ class SearchSpaceTestCase(unittest.TestCase):
             IntRange(min=5, max=5, max_inclusive=False)
         self.assertIn("shouldn't be equal to", str(cm.exception))
 
+    def test_int_range_shared(self) -> None:
+        first = decode_count_space({"min": 1, "max": 5})
+        self.assertIs(first, decode_count_space({"min": 1, "max": 5}))
+        self.assertIs(first, decode_count_space([{"min": 1, "max": 5}])[0])
+        self.assertIsNot(first, decode_count_space({"min": 1, "max": 6}))
+
+    def test_memo_keys(self) -> None:
+        self.assertEqual(
+            get_key(SetSpace(is_allow_set=True, items=["aa", "bb"])),
+            get_key(SetSpace(is_allow_set=True, items=["bb", "aa", "bb"])),
+        )
+        self.assertNotEqual(
+            get_key(SetSpace(is_allow_set=True, items=["aa"])),
+            get_key(SetSpace(is_allow_set=False, items=["aa"])),
+        )
+        self.assertEqual(
+            get_key([IntRange(min=1), IntRange(max=5)]),
+            get_key([IntRange(min=1), IntRange(max=5)]),
+        )
+        self.assertIsNone(get_key(MockItem()))
+
+    def test_memo_mutation(self) -> None:
+        requirement = SetSpace(is_allow_set=True, items=["aa"])
+        capability = SetSpace(is_allow_set=True, items=["aa", "bb"])
+        requirement.generate_min_capability(capability)
+        # the changed requirement has a new key, so it's generated again.
+        requirement.add("cc")
+        with self.assertRaises(LisaException):
+            requirement.generate_min_capability(capability)
+
+        # the memoized results are not affected by changes of returned ones.
+        min_capability = SetSpace(
+            is_allow_set=True, items=["aa"]
+        ).generate_min_capability(capability)
+        min_capability.add("changed")
+        self.assertNotIn(
+            "changed",
+            SetSpace(is_allow_set=True, items=["aa"]).generate_min_capability(
+                capability
+            ),
+        )
+
+    def test_memo_bounded(self) -> None:
+        memo = _Memo(max_size=2)
+        memo.set("a", 1)
+        memo.set("b", 2)
+        self.assertEqual(1, memo.get("a"))
+        memo.set("c", 3)
+        # b is the least recently used one.
+        self.assertEqual(2, len(memo))
+        self.assertNotEqual(2, memo.get("b"))
+        self.assertEqual(1, memo.get("a"))
+        self.assertEqual(3, memo.get("c"))
+
     def _verify_matrix(
         self,
         expected_meet: List[List[bool]],
@@ -204,6 +263,11 @@ class SearchSpaceTestCase(unittest.TestCase):
                         requirement.check(capability),
                         extra_msg=extra_msg,
                     )
+                    self.assertEqual(
+                        expected_meet[r_index][c_index],
+                        requirement.match(capability),
+                        extra_msg,
+                    )
 
                     if expected_meet[r_index][c_index]:
                         actual_min = requirement.generate_min_capability(capability)
@@ -227,6 +291,11 @@ class SearchSpaceTestCase(unittest.TestCase):
                         check_countspace(requirement, capability),  # type:ignore
                         extra_msg=extra_msg,
                     )
+                    self.assertEqual(
+                        expected_meet[r_index][c_index],
+                        match_countspace(requirement, capability),  # type:ignore
+                        extra_msg,
+                    )
                     if expected_meet[r_index][c_index]:
                         actual_min = generate_min_capability_countspace(
                             requirement, capability  # type:ignore
@@ -242,6 +311,11 @@ class SearchSpaceTestCase(unittest.TestCase):
                         check(requirement, capability),  # type:ignore
                         extra_msg=extra_msg,
                     )
+                    self.assertEqual(
+                        expected_meet[r_index][c_index],
+                        match(requirement, capability),  # type:ignore
+                        extra_msg,
+                    )
 
                     if expected_meet[r_index][c_index]:
                         actual_min = generate_min_capability(
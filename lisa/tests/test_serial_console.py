@@ -0,0 +1,77 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import re
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, List, Optional, Tuple
+from unittest.case import TestCase
+
+from lisa import schema
+from lisa.features import SerialConsole
+from lisa.features.serial_console import NAME_SERIAL_CONSOLE_LOG
+from lisa.node import Nodes
+from lisa.util import LisaException
+
+VERSION_PATTERN = re.compile(r"version: (\d+)[\n\r]", re.M)
+
+
+class MockSerialConsole(SerialConsole):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.log = b""
+        self.offsets: List[int] = []
+
+    def _get_console_log_from(
+        self, saved_path: Optional[Path], offset: int
+    ) -> Tuple[int, bytes]:
+        self.offsets.append(offset)
+        if offset > len(self.log):
+            return 0, self.log
+        return offset, self.log[offset:]
+
+
+class SerialConsoleTestCase(TestCase):
+    def setUp(self) -> None:
+        self._log_dir = TemporaryDirectory()
+        nodes = Nodes()
+        self._node = nodes.from_existing(
+            schema.LocalNode(capability=schema.Capability()),
+            "nodes",
+            base_log_path=Path(self._log_dir.name),
+        )
+        self._serial_console = MockSerialConsole(self._node, None)
+        self._serial_console.initialize()
+
+    def tearDown(self) -> None:
+        self._log_dir.cleanup()
+
+    def test_log_fetched_incrementally(self) -> None:
+        serial_console = self._serial_console
+        serial_console.log = b"booting\nversion: 1\nlog"
+        serial_console.check_panic(saved_path=None)
+        self.assertEqual("1", serial_console.get_matched_str(VERSION_PATTERN))
+        # no new content is downloaded, if there is a match.
+        self.assertEqual([0], serial_console.offsets)
+
+        serial_console.log += b"in: \nKernel panic - not syncing: fatal\nversion: 2\n"
+        serial_console.invalidate_cache()
+        self.assertEqual("2", serial_console.get_matched_str(VERSION_PATTERN))
+        with self.assertRaises(LisaException):
+            serial_console.check_panic(saved_path=None)
+        with self.assertRaises(LisaException):
+            serial_console.check_panic(saved_path=None, force_run=True)
+        self.assertEqual(
+            [0, len(b"booting\nversion: 1\nlog"), len(serial_console.log)],
+            serial_console.offsets,
+        )
+        with open(self._node.local_log_path / NAME_SERIAL_CONSOLE_LOG, "rb") as f:
+            self.assertEqual(serial_console.log, f.read())
+
+        # the log is recreated, so it's scanned again.
+        serial_console.log = b"version: 3\n"
+        serial_console.invalidate_cache()
+        self.assertEqual("3", serial_console.get_matched_str(VERSION_PATTERN))
+        serial_console.check_panic(saved_path=None)
+        with open(self._node.local_log_path / NAME_SERIAL_CONSOLE_LOG, "rb") as f:
+            self.assertEqual(serial_console.log, f.read())
@@ -0,0 +1,192 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import threading
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import sleep
+from typing import Any, List, Type
+from unittest.case import TestCase
+
+from lisa import schema
+from lisa.executable import Tool
+from lisa.node import Node
+from lisa.util import LisaException, constants
+
+# installed tool names by order
+installed: List[str] = []
+installed_lock = threading.Lock()
+# independent tools wait each other, it's broken if they are installed serially.
+branch_barrier = threading.Barrier(2, timeout=5)
+
+
+class MockTool(Tool):
+    @property
+    def command(self) -> str:
+        return self.name
+
+    @property
+    def can_install(self) -> bool:
+        return True
+
+    @classmethod
+    def create(cls, node: Node) -> Tool:
+        # skip the os detection on node
+        return cls(node)
+
+    def _check_exists(self) -> bool:
+        return False
+
+    def _install(self) -> bool:
+        with installed_lock:
+            installed.append(self.name)
+        return True
+
+
+class MockBranchA(MockTool):
+    def _install(self) -> bool:
+        branch_barrier.wait()
+        return super()._install()
+
+
+class MockBranchB(MockBranchA):
+    pass
+
+
+class MockRoot(MockTool):
+    @property
+    def dependencies(self) -> List[Type[Tool]]:
+        return [MockBranchA, MockBranchB]
+
+
+class MockSlow(MockTool):
+    def _install(self) -> bool:
+        sleep(0.5)
+        return super()._install()
+
+
+class MockCircleA(MockTool):
+    @property
+    def dependencies(self) -> List[Type[Tool]]:
+        return [MockCircleB]
+
+
+class MockCircleB(MockTool):
+    @property
+    def dependencies(self) -> List[Type[Tool]]:
+        return [MockCircleA]
+
+
+class MockProbedSh(Tool):
+    @property
+    def command(self) -> str:
+        return "sh"
+
+    @property
+    def can_install(self) -> bool:
+        return False
+
+
+class MockProbedMissing(MockProbedSh):
+    @property
+    def command(self) -> str:
+        return "lisa_not_existing_command"
+
+    @property
+    def can_install(self) -> bool:
+        return True
+
+    def _install(self) -> bool:
+        with installed_lock:
+            installed.append(self.name)
+        return True
+
+
+class MockProbedBroken(MockProbedSh):
+    @property
+    def command(self) -> str:
+        # a broken tool doesn't fail probing of other tools.
+        raise LisaException("broken command")
+
+
+class ToolsTestCase(TestCase):
+    def setUp(self) -> None:
+        installed.clear()
+        branch_barrier.reset()
+        self._node = Node.create(
+            index=-1,
+            runbook=schema.LocalNode(capability=schema.Capability()),
+            logger_name="tools",
+        )
+
+    def test_install_branches_concurrently(self) -> None:
+        self._node.tools[MockRoot]
+        self.assertListEqual(["mockbrancha", "mockbranchb"], sorted(installed[:2]))
+        self.assertEqual("mockroot", installed[2])
+
+    def test_resolve_installed_once(self) -> None:
+        self._node.tools.resolve([MockRoot, MockBranchA])
+        self._node.tools[MockBranchA]
+        self.assertEqual(3, len(installed))
+
+    def test_concurrent_requests_install_once(self) -> None:
+        threads: List[threading.Thread] = []
+        results: List[Any] = []
+        for _ in range(4):
+            thread = threading.Thread(
+                target=lambda: results.append(self._node.tools[MockSlow])
+            )
+            threads.append(thread)
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertListEqual(["mockslow"], installed)
+        self.assertEqual(4, len(results))
+        self.assertTrue(all(x is results[0] for x in results))
+
+    def test_circle_dependency(self) -> None:
+        with self.assertRaises(LisaException) as cm:
+            self._node.tools.resolve([MockCircleA])
+        self.assertIn("circle dependency", str(cm.exception))
+
+    def test_probe_tools_at_once(self) -> None:
+        # the probe runs when the node is initialized.
+        self._node.initialize()
+        # all tools are probed already, so there is no round trip to check them.
+        shell = self._node._shell
+        self._node._shell = None
+        try:
+            self.assertTrue(self._node.tools[MockProbedSh].exists)
+            self._node.tools[MockProbedMissing]
+        finally:
+            self._node._shell = shell
+        self.assertListEqual(["mockprobedmissing"], installed)
+
+    def test_missing_in_snapshot_checked_again(self) -> None:
+        # sh may be installed after the snapshot is saved, so it's checked again.
+        self._node.tools.load_probed_commands(
+            {"sh": False, "lisa_not_existing_command": True}
+        )
+        self.assertDictEqual(
+            {"lisa_not_existing_command": True}, self._node.tools.probed_commands
+        )
+        self.assertTrue(self._node.tools[MockProbedSh].exists)
+
+    def test_build_cache(self) -> None:
+        if hasattr(constants, "CACHE_PATH"):
+            self.addCleanup(setattr, constants, "CACHE_PATH", constants.CACHE_PATH)
+        else:
+            self.addCleanup(delattr, constants, "CACHE_PATH")
+        with TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            constants.CACHE_PATH = temp_path / "cache"
+            build_path = temp_path / "build"
+            build_path.mkdir()
+            build_path.joinpath("mocktool").write_text("built")
+            tool = MockTool(self._node)
+
+            target_path = temp_path / "target"
+            self.assertFalse(tool.restore_build_cache(["mocktool"], target_path, False))
+            tool.save_build_cache(["mocktool"], build_path, False)
+            self.assertTrue(tool.restore_build_cache(["mocktool"], target_path, False))
+            self.assertEqual("built", target_path.joinpath("mocktool").read_text())
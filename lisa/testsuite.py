@@ -161,9 +161,18 @@ class TestResult:
     ) -> bool:
         requirement = self.runtime_data.metadata.requirement
         assert requirement.environment
-        check_result = requirement.environment.check(environment.capability)
+        # match is called firstly, reasons are built only if they are saved.
+        is_matched = requirement.environment.match(environment.capability)
+        if is_matched:
+            check_result = search_space.ResultReason()
+        elif save_reason:
+            check_result = search_space.check(
+                requirement.environment, environment.capability
+            )
+        else:
+            return False
         if (
-            check_result.result
+            is_matched
             and requirement.os_type
             and environment.status == EnvironmentStatus.Connected
         ):
@@ -176,10 +185,10 @@ class TestResult:
                 node_os_capability = search_space.SetSpace[Type[OperatingSystem]](
                     is_allow_set=True, items=type(node.os).__mro__
                 )
-                check_result.merge(
-                    requirement.os_type.check(node_os_capability), "os_type"
-                )
-                if not check_result.result:
+                if not requirement.os_type.match(node_os_capability):
+                    check_result.merge(
+                        requirement.os_type.check(node_os_capability), "os_type"
+                    )
                     break
         if save_reason:
             if self.check_results:
@@ -3,10 +3,32 @@
 
 import pathlib
 import re
+import shutil
+import subprocess
+import threading
+from typing import Dict, List, Set
 
 from lisa.executable import Tool
 from lisa.operating_system import Posix
-from lisa.util import LisaException, get_matched_str
+from lisa.util import LisaException, constants, get_matched_str
+
+# mirrors are shared by all nodes of a run, so they are protected by locks per
+# mirror path. A mirror and its bundles use the same lock.
+_mirror_locks_lock = threading.Lock()
+_mirror_locks: Dict[str, threading.Lock] = dict()
+# mirrors are fetched once in a run.
+_refreshed_mirrors: Set[str] = set()
+# it's long enough to mirror big repos, like the Linux kernel.
+MIRROR_TIMEOUT = 3600
+
+
+def _get_mirror_lock(mirror_path: pathlib.Path) -> threading.Lock:
+    with _mirror_locks_lock:
+        lock = _mirror_locks.get(str(mirror_path))
+        if lock is None:
+            lock = threading.Lock()
+            _mirror_locks[str(mirror_path)] = lock
+    return lock
 
 
 class Git(Tool):
@@ -33,6 +55,20 @@ class Git(Tool):
     def clone(
         self, url: str, cwd: pathlib.PurePath, branch: str = "", dir_name: str = ""
     ) -> None:
+        """
+        The repo is mirrored on the controller under runtime/cache/git, and fetched
+        once in a run. Local nodes clone from the mirror, and remote nodes clone
+        from a bundle of the branch, which is copied from the controller. If the
+        mirror cannot be used, the repo is cloned from the url directly.
+        """
+        try:
+            self._clone_from_mirror(url, cwd, branch, dir_name)
+            return
+        except Exception as identifier:
+            self._log.debug(
+                f"cannot clone from mirror, clone from '{url}' directly: {identifier}"
+            )
+
         cmd = f"clone {url} {dir_name}"
         # git print to stderr for normal info, so set no_error_log to True.
         result = self.run(cmd, cwd=cwd, no_error_log=True)
@@ -60,3 +96,131 @@ class Git(Tool):
                 f"Fail to checkout branch."
                 f" It may caused by branch {branch} not exist or temp network issue."
             )
+
+    def _clone_from_mirror(
+        self, url: str, cwd: pathlib.PurePath, branch: str, dir_name: str
+    ) -> None:
+        if not shutil.which("git"):
+            raise LisaException("git is not found on the controller")
+        if not dir_name:
+            dir_name = url.rstrip("/").split("/")[-1]
+            if dir_name.endswith(".git"):
+                dir_name = dir_name[: -len(".git")]
+
+        mirror_path = self._update_mirror(url)
+        if self.node.is_remote:
+            bundle_path = self._create_bundle(mirror_path, branch)
+            node_bundle_path = self.get_tool_path().joinpath(bundle_path.name)
+            self.node.shell.copy(bundle_path, node_bundle_path)
+            branch_parameter = f"-b {branch} " if branch else ""
+            source = node_bundle_path
+        else:
+            # it's on the controller, so the mirror is cloned locally.
+            branch_parameter = ""
+            source = mirror_path
+
+        result = self.run(
+            f"clone {branch_parameter}{source} {dir_name}",
+            force_run=True,
+            cwd=cwd,
+            no_error_log=True,
+        )
+        if result.exit_code != 0:
+            raise LisaException(f"failed to clone from {source}: {result.stdout}")
+        code_path = cwd / dir_name
+        # git clone succeeds without checkout, if HEAD of the source refers to a
+        # missing ref. Remove it, so it can be cloned from the url again.
+        result = self.run(
+            "rev-parse --verify HEAD",
+            force_run=True,
+            cwd=code_path,
+            no_info_log=True,
+            no_error_log=True,
+        )
+        if result.exit_code != 0:
+            self.node.shell.remove(code_path, recursive=True)
+            raise LisaException(f"nothing is checked out from {source}")
+        self.run(
+            f"remote set-url origin {url}",
+            force_run=True,
+            cwd=code_path,
+            no_info_log=True,
+        )
+        if branch and not self.node.is_remote:
+            self.checkout(branch, cwd=code_path)
+
+    def _update_mirror(self, url: str) -> pathlib.Path:
+        mirror_path = constants.CACHE_PATH.joinpath(
+            "git", constants.NORMALIZE_PATTERN.sub("_", url)
+        )
+        with _get_mirror_lock(mirror_path):
+            if str(mirror_path) in _refreshed_mirrors:
+                return mirror_path
+            if mirror_path.exists():
+                self._log.debug(f"fetching mirror of '{url}'")
+                self._run_on_controller(
+                    ["git", "fetch", "--prune", "origin"], mirror_path
+                )
+            else:
+                self._log.debug(f"creating mirror of '{url}'")
+                mirror_path.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    self._run_on_controller(
+                        ["git", "clone", "--mirror", url, mirror_path.name],
+                        mirror_path.parent,
+                    )
+                except LisaException as identifier:
+                    # remove the partial mirror, so it's created again next time.
+                    shutil.rmtree(mirror_path, ignore_errors=True)
+                    raise identifier
+            _refreshed_mirrors.add(str(mirror_path))
+        return mirror_path
+
+    def _create_bundle(self, mirror_path: pathlib.Path, branch: str) -> pathlib.Path:
+        """
+        A bundle has the given branch and HEAD only, it's much smaller than the
+        whole repo. HEAD is always bundled, so it can be cloned with or without the
+        branch. The bundle is named by refs and commits, so it's reused until they
+        are updated.
+        """
+        refs = [branch, "HEAD"] if branch else ["HEAD"]
+        commit_ids = self._run_on_controller(
+            ["git", "rev-parse", *refs], mirror_path
+        ).split()
+        bundle_name = "_".join(
+            [mirror_path.name]
+            + [constants.NORMALIZE_PATTERN.sub("_", x) for x in refs]
+            + [x[:12] for x in commit_ids]
+        )
+        bundle_path = mirror_path.parent.joinpath("bundles", f"{bundle_name}.bundle")
+        with _get_mirror_lock(mirror_path):
+            if not bundle_path.exists():
+                bundle_path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = bundle_path.with_suffix(".tmp")
+                self._run_on_controller(
+                    ["git", "bundle", "create", str(temp_path), *refs], mirror_path
+                )
+                temp_path.replace(bundle_path)
+        return bundle_path
+
+    def _run_on_controller(
+        self, command: List[str], cwd: pathlib.Path, timeout: int = MIRROR_TIMEOUT
+    ) -> str:
+        try:
+            result = subprocess.run(
+                command,
+                cwd=cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+                timeout=timeout,
+            )
+        except subprocess.TimeoutExpired:
+            raise LisaException(
+                f"timeout on running {command} on controller in {timeout} seconds"
+            )
+        if result.returncode != 0:
+            raise LisaException(
+                f"failed on running {command} on controller: {result.stderr}"
+            )
+        return result.stdout.strip()
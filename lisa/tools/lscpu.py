@@ -27,8 +27,10 @@ class Lscpu(Tool):
         return True
 
     def get_core_count(self, force_run: bool = False) -> int:
-        result = self.run(force_run=force_run)
-        matched = self.__vcpu_sockets.findall(result.stdout)
+        output = None if force_run else self.node.facts.get().lscpu
+        if output is None:
+            output = self.run(force_run=force_run).stdout
+        matched = self.__vcpu_sockets.findall(output)
         assert_that(
             len(matched),
             f"cpu count should have exact one line, but got {matched}",
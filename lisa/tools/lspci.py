@@ -66,16 +66,23 @@ class Lspci(Tool):
 
     def get_device_list(self, force_run: bool = False) -> List[PciDevice]:
         if (not self._pci_devices) or force_run:
-            result = self.run("-m", force_run=force_run, shell=True)
-            if result.exit_code != 0:
-                result = self.run("-m", force_run=force_run, shell=True, sudo=True)
-                if result.exit_code != 0:
-                    raise LisaException(
-                        f"get unexpected non-zero exit code {result.exit_code} "
-                        f"when run {self.command} -m."
-                    )
-            for pci_raw in result.stdout.splitlines():
+            output = None if force_run else self.node.facts.get().lspci
+            if output is None:
+                output = self._run_lspci(force_run)
+            self._pci_devices = []
+            for pci_raw in output.splitlines():
                 pci_device = PciDevice(pci_raw)
                 self._pci_devices.append(pci_device)
 
         return self._pci_devices
+
+    def _run_lspci(self, force_run: bool) -> str:
+        result = self.run("-m", force_run=force_run, shell=True)
+        if result.exit_code != 0:
+            result = self.run("-m", force_run=force_run, shell=True, sudo=True)
+            if result.exit_code != 0:
+                raise LisaException(
+                    f"get unexpected non-zero exit code {result.exit_code} "
+                    f"when run {self.command} -m."
+                )
+        return result.stdout
@@ -1,4 +1,5 @@
 import re
+from pathlib import PurePosixPath
 from typing import Any, List
 
 from lisa.base_tools.wget import Wget
@@ -149,11 +150,25 @@ class Lsvmbus(Tool):
         return _exists
 
     def _install_from_src(self) -> None:
+        # lsvmbus is a script, so the downloaded file doesn't depend on platform.
+        tool_path = self.get_tool_path()
+        if self.restore_build_cache(["lsvmbus"], tool_path, platform_dependent=False):
+            self.node.execute(
+                f"mkdir -p $HOME/.local/bin && "
+                f"cp {tool_path.joinpath('lsvmbus')} $HOME/.local/bin/",
+                shell=True,
+            )
+            self._command = "$HOME/.local/bin/lsvmbus"
+            return
+
         wget_tool = self.node.tools[Wget]
         file_path = wget_tool.get(
             self._lsvmbus_repo, "$HOME/.local/bin", executable=True
         )
         self._command = file_path
+        self.save_build_cache(
+            ["lsvmbus"], PurePosixPath(file_path).parent, platform_dependent=False
+        )
 
     def install(self) -> bool:
         package_name = ""
@@ -187,17 +202,24 @@ class Lsvmbus(Tool):
         self, force_run: bool = False
     ) -> List[VmBusDevice]:
         if (not self._vmbus_devices) or force_run:
-            result = self.run("-vv", force_run=force_run, shell=True)
-            if result.exit_code != 0:
-                result = self.run("-vv", force_run=force_run, shell=True, sudo=True)
-                if result.exit_code != 0:
-                    raise LisaException(
-                        f"get unexpected non-zero exit code {result.exit_code} "
-                        f"when run {self.command} -vv."
-                    )
-            raw_list = re.finditer(PATTERN_VMBUS_DEVICE, result.stdout)
+            output = None if force_run else self.node.facts.get().lsvmbus
+            if output is None or self.__pattern_not_found.match(output):
+                output = self._run_lsvmbus(force_run)
+            self._vmbus_devices = []
+            raw_list = re.finditer(PATTERN_VMBUS_DEVICE, output)
             for vmbus_raw in raw_list:
                 vmbus_device = VmBusDevice(vmbus_raw.group())
                 self._vmbus_devices.append(vmbus_device)
 
         return self._vmbus_devices
+
+    def _run_lsvmbus(self, force_run: bool) -> str:
+        result = self.run("-vv", force_run=force_run, shell=True)
+        if result.exit_code != 0:
+            result = self.run("-vv", force_run=force_run, shell=True, sudo=True)
+            if result.exit_code != 0:
+                raise LisaException(
+                    f"get unexpected non-zero exit code {result.exit_code} "
+                    f"when run {self.command} -vv."
+                )
+        return result.stdout
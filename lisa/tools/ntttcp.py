@@ -25,6 +25,21 @@ class Ntttcp(Tool):
     def can_install(self) -> bool:
         return True
 
+    def install(self) -> bool:
+        # The built binary is cached on the controller. If it's built on the same
+        # platform already, copy it instead of installing dependencies to build.
+        tool_path = self.get_tool_path()
+        self.node.shell.mkdir(tool_path, exist_ok=True)
+        if self.restore_build_cache([self.command], tool_path):
+            self.node.execute(
+                f"install -m 755 {tool_path.joinpath(self.command)} /usr/local/bin/",
+                sudo=True,
+            )
+            if self._check_exists():
+                return True
+            self._log.debug("cached binary doesn't work, build it again.")
+        return super().install()
+
     def _install(self) -> bool:
         tool_path = self.get_tool_path()
         self.node.shell.mkdir(tool_path, exist_ok=True)
@@ -33,6 +48,7 @@ class Ntttcp(Tool):
         make = self.node.tools[Make]
         code_path = tool_path.joinpath("ntttcp-for-linux/src")
         make.make_and_install(cwd=code_path)
+        self.save_build_cache([self.command], code_path)
         return self._check_exists()
 
     def help(self) -> ExecutableResult:
@@ -9,7 +9,7 @@ from typing import Any
 from lisa.executable import Tool
 from lisa.features import SerialConsole
 from lisa.util import LisaException
-from lisa.util.perf_timer import create_timer
+from lisa.util.perf_timer import Timer, create_timer
 
 from .date import Date
 from .uptime import Uptime
@@ -20,6 +20,9 @@ class Reboot(Tool):
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
         # timeout to wait
         self.time_out: int = 300
+        # first and max seconds to wait between reconnecting
+        self.retry_delay: float = 1
+        self.max_retry_delay: float = 16
         self._command = "/sbin/reboot"
 
     @property
@@ -48,6 +51,87 @@ class Reboot(Tool):
             raise identifier
 
     def reboot(self) -> None:
+        try:
+            self._reboot()
+        finally:
+            # kernel and devices may be changed after reboot, so all reboot paths
+            # invalidate facts.
+            self.node.facts.invalidate()
+
+    def _reboot(self) -> None:
+        timer = create_timer()
+        last_boot_id = self._get_boot_id()
+        if not last_boot_id:
+            # boot id is supported by Linux only, detect by boot time on others.
+            self._reboot_by_boot_time()
+            return
+
+        self._log.debug(f"rebooting with boot id: {last_boot_id}")
+        self._start_reboot()
+
+        # The reboot is detected by the change of boot id. The shell waits the SSH
+        # port is ready on connecting, and it retries with exponential backoff, so
+        # it doesn't hammer the rebooting node.
+        connected: bool = False
+        delay = self.retry_delay
+        current_boot_id = last_boot_id
+        # the boot id may be empty, if it's read on shutting down.
+        while (
+            current_boot_id in ["", last_boot_id]
+            and timer.elapsed(False) < self.time_out
+        ):
+            sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+            try:
+                self.node.close()
+                current_boot_id = self._get_boot_id()
+            except Exception as identifier:
+                # error is ignorable, as ssh may be closed suddenly.
+                self._log.debug(f"ignorable ssh exception: {identifier}")
+                continue
+            if current_boot_id:
+                connected = True
+                self._log.debug(f"reconnected with boot id: {current_boot_id}")
+        self._check_timeout(timer, connected)
+        self._log.debug(f"rebooted in {timer}")
+
+    def _get_boot_id(self) -> str:
+        result = self.node.execute(
+            "cat /proc/sys/kernel/random/boot_id", no_error_log=True
+        )
+        if result.exit_code != 0:
+            return ""
+        return result.stdout.strip()
+
+    def _start_reboot(self) -> None:
+        # Get reboot execution path
+        # Not all distros have the same reboot execution path
+        command_result = self.node.execute(
+            "command -v reboot", shell=True, sudo=True, no_info_log=True
+        )
+        if command_result.exit_code == 0:
+            self._command = command_result.stdout
+        try:
+            # Reboot is not reliable, and sometime stucks,
+            # like SUSE sles-15-sp1-sapcal gen1 2020.10.23.
+            # In this case, use timeout to prevent hanging.
+            self.run(force_run=True, sudo=True, timeout=10)
+        except Exception as identifier:
+            # it doesn't matter to exceptions here. The system may reboot fast
+            self._log.debug(f"ignorable exception on rebooting: {identifier}")
+
+    def _check_timeout(self, timer: Timer, connected: bool) -> None:
+        if timer.elapsed() > self.time_out:
+            if connected:
+                raise LisaException(
+                    "timeout to wait reboot, the node may not perform reboot."
+                )
+            else:
+                raise LisaException(
+                    "timeout to wait reboot, the node may stuck on reboot command."
+                )
+
+    def _reboot_by_boot_time(self) -> None:
         who = self.node.tools[Who]
         timer = create_timer()
 
@@ -76,24 +160,11 @@ class Reboot(Tool):
             sleep(wait_seconds)
             current_delta = date.current().replace(tzinfo=None) - current_boot_time
 
-        # Get reboot execution path
-        # Not all distros have the same reboot execution path
-        command_result = self.node.execute(
-            "command -v reboot", shell=True, sudo=True, no_info_log=True
-        )
-        if command_result.exit_code == 0:
-            self._command = command_result.stdout
         self._log.debug(f"rebooting with boot time: {last_boot_time}")
-        try:
-            # Reboot is not reliable, and sometime stucks,
-            # like SUSE sles-15-sp1-sapcal gen1 2020.10.23.
-            # In this case, use timeout to prevent hanging.
-            self.run(force_run=True, sudo=True, timeout=10)
-        except Exception as identifier:
-            # it doesn't matter to exceptions here. The system may reboot fast
-            self._log.debug(f"ignorable exception on rebooting: {identifier}")
+        self._start_reboot()
 
         connected: bool = False
+        delay = self.retry_delay
         while (
             last_boot_time == current_boot_time and timer.elapsed(False) < self.time_out
         ):
@@ -105,12 +176,7 @@ class Reboot(Tool):
                 # error is ignorable, as ssh may be closed suddenly.
                 self._log.debug(f"ignorable ssh exception: {identifier}")
             self._log.debug(f"reconnected with uptime: {current_boot_time}")
-        if timer.elapsed() > self.time_out:
-            if connected:
-                raise LisaException(
-                    "timeout to wait reboot, the node may not perform reboot."
-                )
-            else:
-                raise LisaException(
-                    "timeout to wait reboot, the node may stuck on reboot command."
-                )
+            if last_boot_time == current_boot_time:
+                sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+        self._check_timeout(timer, connected)
@@ -6,6 +6,7 @@ import os
 import shutil
 import socket
 import sys
+from hashlib import sha256
 from logging import getLogger
 from pathlib import Path, PurePath
 from time import sleep
@@ -140,7 +141,7 @@ class WindowsShellType(object):
 
 # retry strategy is the same as spurplus.connect_with_retries.
 @retry(Exception, tries=3, delay=1, logger=None)
-def try_connect(connection_info: ConnectionInfo) -> Any:
+def try_connect(connection_info: ConnectionInfo) -> Tuple[Any, str]:
     # spur always run a posix command and will fail on Windows.
     # So try with paramiko firstly.
     paramiko_client = paramiko.SSHClient()
@@ -154,6 +155,11 @@ def try_connect(connection_info: ConnectionInfo) -> Any:
         key_filename=connection_info.private_key_file,
         banner_timeout=10,
     )
+    # the fingerprint identifies the host, even if its address is changed.
+    transport = paramiko_client.get_transport()
+    assert transport
+    host_key = transport.get_remote_server_key()
+    host_key_fingerprint = sha256(host_key.asbytes()).hexdigest()
     stdin, stdout, _ = paramiko_client.exec_command("cmd\n")
     # Flush commands and prevent more writes
     stdin.flush()
@@ -171,7 +177,7 @@ def try_connect(connection_info: ConnectionInfo) -> Any:
     stdin.channel.shutdown_write()
     paramiko_client.close()
 
-    return stdout
+    return stdout, host_key_fingerprint
 
 
 # paramiko stuck on get command output of 'fortinet' VM, and spur hide timeout of
@@ -188,6 +194,7 @@ class SshShell(InitializableMixin):
     def __init__(self, connection_info: ConnectionInfo) -> None:
         super().__init__()
         self.is_remote = True
+        self.host_key_fingerprint = ""
         self._connection_info = connection_info
         self._inner_shell: Optional[spur.SshShell] = None
         self._is_connected: bool = False
@@ -206,7 +213,7 @@ class SshShell(InitializableMixin):
                 f"error code: {tcp_error_code}"
             )
         try:
-            stdout = try_connect(self._connection_info)
+            stdout, self.host_key_fingerprint = try_connect(self._connection_info)
         except Exception as identifier:
             raise LisaException(
                 f"failed to connect SSH "
@@ -394,6 +401,18 @@ class SshShell(InitializableMixin):
             consistent=self.is_posix,
         )
 
+    def copy_back(self, node_path: PurePath, local_path: PurePath) -> None:
+        self.initialize()
+        assert self._inner_shell
+        node_path_str = self._purepath_to_str(node_path)
+        local_path_str = self._purepath_to_str(local_path)
+        self._inner_shell.get(
+            node_path_str,
+            local_path_str,
+            create_directories=True,
+            consistent=True,
+        )
+
     def _purepath_to_str(
         self, path: Union[Path, PurePath, str]
     ) -> Union[Path, PurePath, str]:
@@ -409,6 +428,8 @@ class LocalShell(InitializableMixin):
     def __init__(self) -> None:
         super().__init__()
         self.is_remote = False
+        # local host doesn't have host key.
+        self.host_key_fingerprint = ""
         self._inner_shell = spur.LocalShell()
 
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
@@ -498,5 +519,11 @@ class LocalShell(InitializableMixin):
         assert isinstance(node_path, Path), f"actual: {type(node_path)}"
         shutil.copy(local_path, node_path)
 
+    def copy_back(self, node_path: PurePath, local_path: PurePath) -> None:
+        assert isinstance(node_path, Path), f"actual: {type(node_path)}"
+        assert isinstance(local_path, Path), f"actual: {type(local_path)}"
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(node_path, local_path)
+
 
 Shell = Union[LocalShell, SshShell]